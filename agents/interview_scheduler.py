@@ -3,6 +3,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from utils.database_manager import DatabaseManager
 from config import Config
+from utils.logger import metrics
 
 class InterviewSchedulerAgent:
     def __init__(self, db_manager: DatabaseManager):
@@ -28,7 +29,7 @@ class InterviewSchedulerAgent:
             msg = MIMEMultipart()
             msg['From'] = email_config['sender_email']
             msg['To'] = candidate['email']
-            msg['Subject'] = f"Interview Invitation - {candidate['match_scores']}"
+            msg['Subject'] = f"Interview Invitation - {candidate['match_score']:.0%} match"
             
             # Email body
             body = f"""
@@ -36,7 +37,7 @@ class InterviewSchedulerAgent:
 
             Congratulations! Based on your impressive profile, we would like to invite you for an interview.
 
-            Match Score: {candidate['match_scores']}
+            Match Score: {candidate['match_score']:.2%}
             
             Please confirm your availability for the interview.
 
@@ -48,7 +49,7 @@ class InterviewSchedulerAgent:
             
             # Send email
             try:
-                with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
+                with metrics.timer('send_email'), smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
                     server.starttls()
                     server.login(email_config['sender_email'], email_config['sender_password'])
                     server.send_message(msg)
@@ -1,5 +1,7 @@
 from utils.ollama_interface import OllamaInterface
 from utils.database_manager import DatabaseManager
+from utils.migrations import normalize_skill
+from skills_taxonomy import load_skill_extractor
 from config import Config
 
 class JobDescriptionAgent:
@@ -12,6 +14,7 @@ class JobDescriptionAgent:
         """
         self.ollama = ollama_interface
         self.db = db_manager
+        self.skill_extractor = load_skill_extractor()
 
     def process_job_description(self, raw_job_description: str) -> int:
         """
@@ -23,12 +26,21 @@ class JobDescriptionAgent:
         # Summarize job description
         summary = self.ollama.summarize_job_description(raw_job_description)
         
+        # Taxonomy skills named in the text complement the skills the model listed
+        required_skills = summary.get('required_skills') or []
+        required_skills = [required_skills] if isinstance(required_skills, str) else list(required_skills)
+        listed = {normalize_skill(skill) for skill in required_skills}
+        required_skills.extend(
+            match.name for match in self.skill_extractor.extract(raw_job_description)
+            if match.skill_id not in listed
+        )
+        
         # Prepare job data for storage
         job_data = {
             'title': summary.get('title', ''),
             'company': summary.get('company', ''),
             'summary': summary.get('summary', ''),
-            'required_skills': summary.get('required_skills', []),
+            'required_skills': required_skills,
             'experience_level': summary.get('experience_level', ''),
             'raw_jd': raw_job_description
         }
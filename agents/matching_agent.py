@@ -1,18 +1,31 @@
 from models.embedding_model import EmbeddingModel
+from models.match_scoring import MultiFactorScorer, FEATURES
+from models.cascade_ranker import CascadeRanker, CascadeResult
 from utils.database_manager import DatabaseManager
+from utils.ollama_interface import OllamaInterface
+from utils.top_k import TopKSelector
 from config import Config
 
 class MatchingAgent:
-    def __init__(self, embedding_model: EmbeddingModel, db_manager: DatabaseManager):
+    def __init__(self, embedding_model: EmbeddingModel, db_manager: DatabaseManager,
+                 ollama_interface: OllamaInterface = None, cross_encoder=None):
         """
         Initialize Matching Agent
         
         :param embedding_model: Embedding model for similarity calculation
         :param db_manager: Database manager for storing match results
+        :param ollama_interface: LLM that judges the best re-ranked candidates (no LLM pass if omitted)
+        :param cross_encoder: Cross-encoder for re-ranking (``CROSS_ENCODER_MODEL``, loaded on first use, if omitted)
         """
         self.embedding_model = embedding_model
         self.db = db_manager
+        self.ollama = ollama_interface
+        self.cross_encoder = cross_encoder
         self.match_threshold = Config.MATCH_THRESHOLD
+        
+        # Candidate features are loaded on the first match and extended with newer candidates
+        self.scorer = MultiFactorScorer(embedding_model)
+        self.ranker = None
 
     def calculate_candidate_match(self, job_id: int, candidate_id: int) -> float:
         """
@@ -22,50 +35,59 @@ class MatchingAgent:
         :param candidate_id: ID of the candidate
         :return: Match score
         """
-        # Retrieve job description and candidate details
-        job_query = "SELECT * FROM job_descriptions WHERE id = ?"
-        candidate_query = "SELECT * FROM candidates WHERE id = ?"
-        
-        job = self.db.cursor.execute(job_query, (job_id,)).fetchone()
-        candidate = self.db.cursor.execute(candidate_query, (candidate_id,)).fetchone()
-        
-        if not job or not candidate:
+        _, scores, _ = self.scorer.score(self.db.conn, job_id, [candidate_id])
+        if not len(scores):
             return 0.0
         
-        # Compare job requirements with candidate profile
-        job_text = f"{job[1]} {job[3]} {job[4]}"  # Title, summary, skills
-        candidate_text = f"{candidate[1]} {candidate[4]} {candidate[5]}"  # Name, skills, experience
-        
-        # Calculate similarity
-        match_score = self.embedding_model.calculate_similarity(job_text, candidate_text)
-        
         # Store match result
+        match_score = float(scores[0])
         self.db.insert_job_match(job_id, candidate_id, match_score)
         
         return match_score
 
-    def shortlist_candidates(self, job_id: int) -> list:
+    def shortlist_candidates(self, job_id: int, top_k: int = None, required_skills: list = None) -> list:
         """
         Shortlist candidates for a specific job
         
         :param job_id: ID of the job description
-        :return: List of shortlisted candidates
+        :param top_k: Keep only the best ``top_k`` matches (all matches above the threshold if omitted)
+        :param required_skills: Only score candidates that have all of these skills
+        :return: List of shortlisted candidates, best first, with the score of every factor
         """
-        # Retrieve candidates
-        candidate_query = "SELECT id FROM candidates"
-        candidates = self.db.cursor.execute(candidate_query).fetchall()
+        # Indexed skill intersection, so only qualifying candidates are scored
+        candidate_ids = self.db.candidates_with_skills(required_skills) if required_skills else None
         
-        # Calculate matches
-        matches = []
-        for (candidate_id,) in candidates:
-            match_score = self.calculate_candidate_match(job_id, candidate_id)
-            if match_score >= self.match_threshold:
-                matches.append({
-                    'candidate_id': candidate_id,
-                    'match_score': match_score
-                })
+        # Every candidate is scored at once over the feature matrix
+        ids, scores, factors = self.scorer.score(self.db.conn, job_id, candidate_ids)
+        self.db.insert_job_matches(job_id, ids, scores)
         
-        # Sort matches by score
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
+        # Keep matches above the threshold in a bounded selector of row numbers
+        matches = TopKSelector(top_k, threshold=self.match_threshold)
+        matches.push_scores(scores, range(len(ids)))
         
-        return matches
\ No newline at end of file
+        return [
+            {
+                'candidate_id': int(ids[row]),
+                'match_score': float(scores[row]),
+                'factors': dict(zip(FEATURES, factors[row].tolist()))
+            }
+            for row in matches.results()
+        ]
+
+    def rerank_candidates(self, job_id: int, top_n: int = Config.CASCADE_RETRIEVE_N,
+                          llm_top_m: int = Config.CASCADE_LLM_TOP_M, candidate_ids: list = None) -> CascadeResult:
+        """
+        Rank a job's candidates through the cascade: vector score, cross-encoder, then a budgeted LLM pass
+        
+        Nothing is written to the database.
+        
+        :param job_id: ID of the job description
+        :param top_n: Candidates re-scored by the cross-encoder
+        :param llm_top_m: Best re-ranked candidates the LLM may judge
+        :param candidate_ids: Only rank these candidates (all if omitted)
+        :return: The top ``top_n`` candidates, best first, with every stage's score, and each stage's latency
+        """
+        # The cross-encoder is only loaded once re-ranking is asked for
+        if self.ranker is None:
+            self.ranker = CascadeRanker(self.scorer, self.cross_encoder, self.ollama)
+        return self.ranker.rank(self.db.conn, job_id, candidate_ids, retrieve_n=top_n, llm_top_m=llm_top_m)
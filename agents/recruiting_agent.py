@@ -1,24 +1,16 @@
 import os
 import re
-import PyPDF2
-import warnings
-
-# Suppress warnings about python-docx
-warnings.filterwarnings("ignore", category=UserWarning)
-
-try:
-    import python_docx as docx
-except ImportError:
-    try:
-        import docx
-    except ImportError:
-        docx = None
-
-import pandas as pd
-from typing import Dict, Any, List
+import json
+from typing import TYPE_CHECKING, Dict, Any, List
 from models.embedding_model import EmbeddingModel
 from utils.database_manager import DatabaseManager
-from utils.logger import JobScreeningLogger
+from utils.logger import JobScreeningLogger, PER_ITEM, metrics
+from utils.dataset_cache import load_dataset
+from utils.extraction_pool import ExtractionPool
+from skills_taxonomy import load_skill_extractor
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class RecruitingAgent:
     def __init__(self, embedding_model: EmbeddingModel, db_manager: DatabaseManager):
@@ -32,69 +24,39 @@ class RecruitingAgent:
         self.db = db_manager
         self.logger = JobScreeningLogger()
         
-        # Load dataset
+        # Resumes are parsed in sandboxed worker processes, started on the first resume
+        self.extractor = ExtractionPool()
+        
+        # Taxonomy skills are found in one pass over the text
+        self.skill_extractor = load_skill_extractor()
+        
+        # Dataset is loaded lazily on first access (see ``dataset``)
         self.dataset_path = os.path.join(os.path.dirname(__file__), 'dataset.csv')
-        try:
-            # Try reading the file with different encodings and delimiters
-            try:
-                self.dataset = pd.read_csv(self.dataset_path, encoding='utf-8')
-            except:
-                try:
-                    self.dataset = pd.read_csv(self.dataset_path, encoding='latin-1')
-                except:
-                    self.dataset = pd.read_csv(self.dataset_path, encoding='ISO-8859-1')
-            
-            # If no columns, treat the entire file as a single job description
-            if len(self.dataset.columns) <= 1:
-                with open(self.dataset_path, 'r', encoding='utf-8') as f:
-                    job_description = f.read()
-                self.dataset = pd.DataFrame({
-                    'job_description': [job_description]
-                })
+
+    @property
+    def dataset(self) -> 'pd.DataFrame':
+        """
+        Job description dataset, parsed once and shared by every agent and worker process
         
+        :return: Dataset DataFrame (empty if it cannot be loaded)
+        """
+        try:
+            return load_dataset(self.dataset_path)
         except Exception as e:
-            self.logger.log_error('RecruitingAgent.init', f"Failed to load dataset: {e}")
-            self.dataset = pd.DataFrame()
+            self.logger.log_error('RecruitingAgent.dataset', f"Failed to load dataset: {e}")
+            import pandas as pd
+            return pd.DataFrame()
 
     def extract_text_from_resume(self, resume_path: str) -> str:
         """
-        Extract text from resume file
+        Extract text from resume file; files that fail, time out or exceed a limit are quarantined
         
         :param resume_path: Path to the resume file
-        :return: Extracted text from the resume
+        :return: Extracted text from the resume ('' if extraction failed)
         """
         try:
-            # Extract text based on file extension
-            file_extension = os.path.splitext(resume_path)[1].lower()
-            
-            if file_extension == '.pdf':
-                # PDF text extraction
-                with open(resume_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    text = ' '.join(page.extract_text() for page in pdf_reader.pages)
-            
-            elif file_extension in ['.docx', '.doc']:
-                # Check if docx is available
-                if docx is None:
-                    self.logger.log_error('RecruitingAgent.extract_text_from_resume', 'python-docx library not installed')
-                    return ''
-                
-                # Word document text extraction
-                doc = docx.Document(resume_path)
-                text = ''
-                for para in doc.paragraphs:
-                    text += para.text + '\n'
-                for table in doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            text += cell.text + '\n'
-            
-            else:
-                # Plain text or unsupported format
-                with open(resume_path, 'r', encoding='utf-8') as file:
-                    text = file.read()
-            
-            return text
+            # Extract text based on file extension, timed by the extraction pool
+            return self.extractor.extract(resume_path)
         
         except Exception as e:
             self.logger.log_error('RecruitingAgent.extract_text_from_resume', e)
@@ -172,14 +134,30 @@ class RecruitingAgent:
         # Extract resume text
         resume_text = self.extract_text_from_resume(resume_path)
         
-        # Extract experiences and education
-        experiences = self._extract_experience(resume_text)
-        education = self._extract_education(resume_text)
+        # Resubmitted or templated CVs are linked to the candidate first seen with them
+        signature = self.db.minhasher.signature(resume_text) if resume_text else None
+        canonical = None
+        if signature is not None:
+            canonical_id = self.db.find_near_duplicate(signature)
+            canonical = self.db.get_candidate(canonical_id) if canonical_id is not None else None
+        
+        if canonical:
+            # Reuse the canonical candidate's parsed profile instead of extracting it again
+            experiences = json.loads(canonical['experience'] or '[]')
+            education = json.loads(canonical['education'] or '[]')
+            skills = json.loads(canonical['skills'] or '[]')
+            metrics.increment('near_duplicates')
+            self.logger.logger.info(f"{resume_path} is a near-duplicate of candidate {canonical['id']}", extra=PER_ITEM)
+        else:
+            # Extract experiences and education
+            experiences = self._extract_experience(resume_text)
+            education = self._extract_education(resume_text)
+            skills = [match.name for match in self.skill_extractor.extract(resume_text)]
         
         # Log extraction details
         self.logger.log_candidate_extraction(
             candidate_id=hash(email),  # Use email hash as temporary ID
-            skills=[exp.get('role', '') for exp in experiences],
+            skills=skills,
             experience=[exp.get('company', '') for exp in experiences]
         )
         
@@ -187,9 +165,13 @@ class RecruitingAgent:
         candidate_id = self.db.store_candidate({
             'name': candidate_name,
             'email': email,
+            'resume_path': resume_path,
             'resume_text': resume_text,
+            'skills': skills,
             'experiences': experiences,
-            'education': education
+            'education': education,
+            'canonical_candidate_id': canonical['id'] if canonical else None,
+            'minhash': signature
         })
         
         return candidate_id
\ No newline at end of file
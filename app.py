@@ -5,6 +5,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 import os
 import logging
+from config import Config
+from utils.database_manager import DatabaseManager
 
 # Configure logging
 logging.basicConfig(
@@ -16,45 +18,36 @@ logging.basicConfig(
     ]
 )
 
-def load_candidate_matches():
-    """Load candidate matches from SQLite database"""
-    match_db_path = r'C:\Users\megha\Downloads\hack\database\match.db'
-    
-    logging.info(f"Attempting to load database from: {match_db_path}")
+def load_candidate_matches(db_path=Config.DATABASE_PATH, job_id=None, limit=100):
+    """Load the best candidate matches from the screening database"""
+    logging.info(f"Attempting to load database from: {db_path}")
     
     # Validate database file exists and is accessible
     try:
-        if not os.path.exists(match_db_path):
-            logging.error(f"Database file not found: {match_db_path}")
-            raise FileNotFoundError(f"Database file not found: {match_db_path}")
+        if not os.path.exists(db_path):
+            logging.error(f"Database file not found: {db_path}")
+            raise FileNotFoundError(f"Database file not found: {db_path}")
         
         # Check file permissions and size
-        file_stats = os.stat(match_db_path)
+        file_stats = os.stat(db_path)
         logging.info(f"Database file size: {file_stats.st_size} bytes")
         
         if file_stats.st_size == 0:
             logging.error("Database file is empty")
             raise ValueError("Database file is empty")
         
-        # Attempt to connect and validate database
-        conn = sqlite3.connect(match_db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        cursor = conn.cursor()
-        
-        # Check table existence
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='candidate_matches'")
-        if not cursor.fetchone():
-            logging.error("No 'candidate_matches' table found in the database")
-            raise ValueError("No 'candidate_matches' table found in the database")
-        
-        # Fetch and validate data
-        df = pd.read_sql_query("SELECT * FROM candidate_matches", conn)
+        # Opening through DatabaseManager upgrades older databases to the current schema
+        db = DatabaseManager(db_path)
+        try:
+            df = pd.DataFrame(db.get_top_matches(job_id, limit))
+        finally:
+            db.close()
         
         if df.empty:
             logging.warning("No candidate matches found in the database")
             raise ValueError("No candidate matches found in the database")
         
         logging.info(f"Successfully loaded {len(df)} candidate matches")
-        conn.close()
         return df
     
     except sqlite3.Error as e:
@@ -64,6 +57,35 @@ def load_candidate_matches():
         logging.error(f"Unexpected error loading database: {e}")
         raise RuntimeError(f"Unexpected error loading database: {e}")
 
+def load_exported_matches(export_dir=Config.EXPORT_DIR, job_id=None, limit=100):
+    """Load the best candidate matches from the latest Parquet export of each job"""
+    from utils.results_export import read_results
+    
+    columns = ['candidate_name', 'match_score', 'resume_path', 'job_id', 'job_title', 'status', 'run_date']
+    df = read_results(export_dir, job_id=job_id, columns=columns).to_pandas()
+    if df.empty:
+        raise ValueError("No candidate matches found in the export")
+    
+    # Each export adds a snapshot partition; keep the newest one per job
+    df = df[df['run_date'] == df.groupby('job_id')['run_date'].transform('max')]
+    df = df.rename(columns={'resume_path': 'cv_path'}).drop(columns='run_date')
+    logging.info(f"Loaded {len(df)} candidate matches from the export in {export_dir}")
+    return df.nlargest(limit, 'match_score').reset_index(drop=True)
+
+def load_matched_jobs(db_path=Config.DATABASE_PATH):
+    """Job descriptions that have at least one candidate match"""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute(
+            "SELECT id, title FROM job_descriptions WHERE id IN (SELECT DISTINCT job_id FROM job_matches) ORDER BY id"
+        ).fetchall())
+    except sqlite3.Error:
+        return {}
+    finally:
+        conn.close()
+
 def display_candidate_details(candidate_name, cv_path):
     """Display detailed candidate information"""
     st.subheader(f"Candidate: {candidate_name}")
@@ -92,10 +114,24 @@ def main():
     
     # Add debug information
     st.sidebar.header("Debug Information")
-    st.sidebar.text(f"Database Path: {os.path.abspath(r'C:\Users\megha\Downloads\hack\database\match.db')}")
+    st.sidebar.text(f"Database Path: {os.path.abspath(Config.DATABASE_PATH)}")
+    
+    # Filters
+    jobs = load_matched_jobs()
+    job_id = st.sidebar.selectbox(
+        "Job Description",
+        [None] + list(jobs),
+        format_func=lambda job: 'All jobs' if job is None else f"{job}: {jobs[job]}"
+    )
+    limit = st.sidebar.slider("Top matches shown", 10, 1000, 100)
+    use_export = os.path.isdir(os.path.join(Config.EXPORT_DIR, 'job_matches')) and \
+        st.sidebar.checkbox("Read from Parquet export", help="Exported with python -m utils.results_export")
     
     try:
-        candidates_df = load_candidate_matches()
+        if use_export:
+            candidates_df = load_exported_matches(job_id=job_id, limit=limit)
+        else:
+            candidates_df = load_candidate_matches(job_id=job_id, limit=limit)
         
         # Top row with key metrics
         col1, col2, col3 = st.columns(3)
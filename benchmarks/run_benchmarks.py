@@ -0,0 +1,334 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config
+from models.embedding_model import EmbeddingModel, STUB_MODEL_NAME
+from models.cascade_ranker import load_cross_encoder
+from models.encoding_scheduler import EncodingScheduler
+from models.quantization import make_vector_index, PQ_TRAINING_SAMPLE
+from models.vector_index import VectorIndex
+from utils.database_manager import DatabaseManager
+from utils.logger import metrics
+from agents.recruiting_agent import RecruitingAgent
+from agents.matching_agent import MatchingAgent
+from benchmarks.synthetic_corpus import generate_corpus, load_templates, generate_resume
+import main as screening
+
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'history.json')
+BENCHMARKS = ['main_screening', 'recruiting_ingestion', 'db_bulk_writes', 'shortlist_candidates', 'cascade_rerank',
+              'dashboard_queries', 'concurrent_encoding', 'vector_quantization']
+RECALL_K = 10
+
+
+class BenchmarkContext:
+    def __init__(self, work_dir: str, num_resumes: int, num_jobs: int, embedding_model: EmbeddingModel):
+        """
+        Shared state handed to every benchmark
+
+        :param work_dir: Scratch folder for the corpus and databases
+        :param num_resumes: Number of synthetic resumes
+        :param num_jobs: Number of synthetic job descriptions
+        :param embedding_model: Embedding model shared by all benchmarks
+        """
+        self.work_dir = work_dir
+        self.num_resumes = num_resumes
+        self.num_jobs = num_jobs
+        self.embedding_model = embedding_model
+        self.match_db_path = os.path.join(work_dir, 'match.db')
+        self.db_path = os.path.join(work_dir, 'benchmark.db')
+        self.job_id = None
+        # Accuracy figures a benchmark wants reported next to its timings
+        self.quality: Dict[str, Dict[str, Any]] = {}
+
+        paths = generate_corpus(work_dir, num_resumes, num_jobs)
+        self.cvs_directory = paths['cvs_directory']
+        self.job_description_path = paths['job_description_path']
+        self.resume_files = sorted(os.listdir(self.cvs_directory))
+
+
+def bench_main_screening(ctx: BenchmarkContext) -> int:
+    """End-to-end main.py screening of the whole CV folder"""
+    screening.screen_candidates(ctx.cvs_directory, ctx.job_description_path, ctx.match_db_path,
+                                embedding_model=ctx.embedding_model)
+    return len(ctx.resume_files)
+
+
+def bench_recruiting_ingestion(ctx: BenchmarkContext) -> int:
+    """RecruitingAgent extraction and storage of every resume"""
+    db = DatabaseManager(os.path.join(ctx.work_dir, 'ingestion.db'))
+    agent = RecruitingAgent(ctx.embedding_model, db)
+    try:
+        for resume_file in ctx.resume_files:
+            name = os.path.splitext(resume_file)[0]
+            agent.process_candidate_resume(os.path.join(ctx.cvs_directory, resume_file), name, f"{name}@example.com")
+    finally:
+        db.conn.close()
+    return len(ctx.resume_files)
+
+
+def bench_db_bulk_writes(ctx: BenchmarkContext) -> int:
+    """Bulk candidate, job description and job match inserts"""
+    rng = random.Random(7)
+    templates = load_templates()
+    db = DatabaseManager(ctx.db_path)
+    try:
+        for template in templates[:ctx.num_jobs]:
+            ctx.job_id = db.insert_job_description({
+                'title': template['title'],
+                'summary': ' '.join(template['responsibilities']),
+                'required_skills': template['qualifications'],
+                'raw_jd': template['description']
+            })
+        for _ in range(ctx.num_resumes):
+            resume = generate_resume(rng.choice(templates), rng)
+            candidate_id = db.insert_candidate({
+                'name': resume['name'],
+                'email': resume['email'],
+                'skills': resume['skills'],
+                'experience': resume['experience']
+            })
+            db.insert_job_match(ctx.job_id, candidate_id, rng.random())
+    finally:
+        db.conn.close()
+    return ctx.num_resumes
+
+
+def bench_shortlist_candidates(ctx: BenchmarkContext) -> int:
+    """MatchingAgent.shortlist_candidates over every stored candidate"""
+    db = DatabaseManager(ctx.db_path)
+    try:
+        MatchingAgent(ctx.embedding_model, db).shortlist_candidates(ctx.job_id)
+    finally:
+        db.conn.close()
+    return ctx.num_resumes
+
+
+def bench_cascade_rerank(ctx: BenchmarkContext) -> int:
+    """MatchingAgent.rerank_candidates: vector top-N re-scored by the cross-encoder (no LLM pass)"""
+    # The offline run gets the offline cross-encoder too
+    cross_encoder = load_cross_encoder(
+        STUB_MODEL_NAME if ctx.embedding_model.model_name == STUB_MODEL_NAME else Config.CROSS_ENCODER_MODEL
+    )
+    db = DatabaseManager(ctx.db_path)
+    try:
+        result = MatchingAgent(ctx.embedding_model, db, cross_encoder=cross_encoder).rerank_candidates(ctx.job_id)
+    finally:
+        db.conn.close()
+    ctx.quality['cascade_rerank'] = {
+        f'{stage}_ms': round(seconds * 1000, 2) for stage, seconds in result.stage_seconds.items()
+    }
+    return len(result.candidates)
+
+
+def bench_dashboard_queries(ctx: BenchmarkContext) -> int:
+    """The queries behind the Streamlit dashboard and interview scheduler"""
+    db = DatabaseManager(ctx.match_db_path)
+    try:
+        pd.DataFrame(db.get_top_matches())
+    finally:
+        db.conn.close()
+
+    db = DatabaseManager(ctx.db_path)
+    try:
+        shortlisted = db.get_shortlisted_candidates(ctx.job_id, threshold=0.0)
+    finally:
+        db.conn.close()
+    return len(shortlisted)
+
+
+def bench_concurrent_encoding(ctx: BenchmarkContext) -> int:
+    """16 threads each encoding single texts through the micro-batching scheduler"""
+    rng = random.Random(11)
+    templates = load_templates()
+    texts = [generate_resume(rng.choice(templates), rng)['text'] for _ in range(min(ctx.num_resumes, 5000))]
+
+    scheduler = EncodingScheduler(ctx.embedding_model, Config.ENCODER_MAX_BATCH, Config.ENCODER_MAX_WAIT_MS)
+    try:
+        with ThreadPoolExecutor(16) as executor:
+            list(executor.map(scheduler.encode_text, texts))
+    finally:
+        scheduler.close()
+    return len(texts)
+
+
+def bench_vector_quantization(ctx: BenchmarkContext) -> int:
+    """Exact, int8 and product-quantized candidate search, with recall@k against exact search"""
+    rng = random.Random(13)
+    templates = load_templates()
+    resumes = [generate_resume(rng.choice(templates), rng)['text'] for _ in range(ctx.num_resumes)]
+    queries = [template['description'] for template in templates[:ctx.num_jobs]] + resumes[:50]
+
+    vectors = ctx.embedding_model.encode_batch(resumes)
+    query_vectors = ctx.embedding_model.encode_batch(queries)
+    ids = np.arange(1, len(resumes) + 1)
+
+    exact = VectorIndex()
+    exact.add(ids, vectors)
+    with metrics.timer('search_exact', items=len(queries)):
+        truth = [{i for i, _ in exact.search(query, RECALL_K)} for query in query_vectors]
+
+    quality = {'k': RECALL_K, 'float32_mb': round((exact.ids.nbytes + exact.vectors.nbytes) / 1e6, 2)}
+    for method in ('int8', 'pq'):
+        with metrics.timer(f'build_{method}', items=len(ids)):
+            # Train on the whole corpus when it is smaller than a full training sample, so PQ is measured
+            index = make_vector_index(method, rerank_vectors=lambda wanted: vectors[wanted - 1],
+                                      rerank_factor=Config.RERANK_FACTOR, pq_subspaces=Config.PQ_SUBSPACES,
+                                      pq_training_sample=min(len(ids), PQ_TRAINING_SAMPLE))
+            index.add(ids, vectors)
+        quality[f'{method}_mb'] = round(index.nbytes / 1e6, 2)
+
+        for rerank in (False, True):
+            stage = f"search_{method}{'_rerank' if rerank else ''}"
+            with metrics.timer(stage, items=len(queries)):
+                found = [{i for i, _ in index.search(query, RECALL_K, rerank=rerank)} for query in query_vectors]
+            quality[f'recall_{stage[len("search_"):]}'] = round(
+                float(np.mean([len(hits & expected) / len(expected) for hits, expected in zip(found, truth)])), 4
+            )
+
+    ctx.quality['vector_quantization'] = quality
+    return len(queries) * 5
+
+
+def run_benchmark(name: str, func: Callable[[BenchmarkContext], int], ctx: BenchmarkContext) -> Dict[str, Any]:
+    """
+    Run one benchmark and collect its timings
+
+    :param name: Benchmark name
+    :param func: Benchmark function returning the number of items processed
+    :param ctx: Shared benchmark context
+    :return: Result record
+    """
+    metrics.reset()
+    start = time.perf_counter()
+    result = {'name': name, 'status': 'ok'}
+    try:
+        items = func(ctx)
+    except Exception as e:
+        items = 0
+        result.update(status='error', error=f"{type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - start
+
+    result.update(
+        seconds=round(elapsed, 4),
+        items=items,
+        items_per_second=round(items / elapsed, 2) if elapsed and items else None,
+        stages=metrics.summary()['stages']
+    )
+    if name in ctx.quality:
+        result['quality'] = ctx.quality.pop(name)
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(__file__), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare_with_history(run: Dict[str, Any], history: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Compare a run against the most recent comparable run in the history
+
+    :param run: Current run record
+    :param history: Previous run records
+    :param tolerance: Allowed slowdown ratio before flagging a regression (0.1 = 10%)
+    :return: Report lines
+    """
+    previous = next((
+        entry for entry in reversed(history)
+        if entry['scale'] == run['scale'] and entry['model'] == run['model']
+    ), None)
+    if previous is None:
+        return ["No previous run at this scale/model to compare against"]
+
+    baseline = {result['name']: result for result in previous['results']}
+    report = [f"Compared with {previous['timestamp']} ({previous['commit']}):"]
+    for result in run['results']:
+        before = baseline.get(result['name'])
+        if not before or before['status'] != 'ok' or result['status'] != 'ok' or not before['seconds']:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        flag = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+        report.append(f"  {result['name']:<22} {before['seconds']:>10.3f}s -> {result['seconds']:>10.3f}s  x{ratio:.2f}  {flag}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the job screening pipeline on a synthetic corpus")
+    parser.add_argument('--resumes', type=int, default=1000, help="Corpus size (1k-100k)")
+    parser.add_argument('--jobs', type=int, default=20)
+    parser.add_argument('--model', default=Config.EMBEDDING_MODEL,
+                        help=f"Embedding model name, or '{STUB_MODEL_NAME}' for an offline run")
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="Comma-separated benchmarks to run")
+    parser.add_argument('--work-dir', help="Keep the corpus and databases in this folder")
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    embedding_model = EmbeddingModel(args.model)
+    selected = [name for name in BENCHMARKS if name in args.only.split(',')]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = args.work_dir or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+
+        print(f"Generating corpus of {args.resumes} resumes in {work_dir}")
+        ctx = BenchmarkContext(work_dir, args.resumes, args.jobs, embedding_model)
+
+        results = []
+        for name in selected:
+            # Shortlisting and dashboard queries read what the bulk write benchmark stored
+            if name in ('shortlist_candidates', 'cascade_rerank', 'dashboard_queries') and ctx.job_id is None:
+                bench_db_bulk_writes(ctx)
+            if name == 'dashboard_queries' and not os.path.exists(ctx.match_db_path):
+                bench_main_screening(ctx)
+
+            result = run_benchmark(name, globals()[f'bench_{name}'], ctx)
+            results.append(result)
+            print(f"{name:<22} {result['status']:<6} {result['seconds']:>10.3f}s  {result['items_per_second'] or '-'} items/s"
+                  + (f"  {result['error']}" if result['status'] != 'ok' else ''))
+            if 'quality' in result:
+                print('    ' + '  '.join(f"{key}={value}" for key, value in result['quality'].items()))
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'scale': {'resumes': args.resumes, 'jobs': args.jobs},
+        'model': args.model,
+        'python': platform.python_version(),
+        'results': results
+    }
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+
+    for line in compare_with_history(run, history, args.tolerance):
+        print(line)
+
+    history.append(run)
+    with open(args.history, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"Results appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
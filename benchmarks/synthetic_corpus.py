@@ -0,0 +1,213 @@
+import os
+import csv
+import random
+import argparse
+from typing import Dict, List
+
+import pandas as pd
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), '..', 'agents', 'dataset.csv')
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Liam', 'Olivia', 'Noah', 'Emma', 'Wei', 'Mei', 'Carlos', 'Sofia',
+               'Amir', 'Leila', 'Kofi', 'Ama', 'Ivan', 'Anya', 'Kenji', 'Yuki', 'Rahul', 'Sneha']
+LAST_NAMES = ['Sharma', 'Patel', 'Smith', 'Johnson', 'Chen', 'Wang', 'Garcia', 'Rodriguez', 'Haddad',
+              'Karimi', 'Mensah', 'Owusu', 'Petrov', 'Ivanova', 'Tanaka', 'Sato', 'Nair', 'Iyer']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Stark Industries', 'Wayne Tech',
+             'Hooli', 'Pied Piper', 'Cyberdyne', 'Soylent Systems']
+UNIVERSITIES = ['State University', 'Institute of Technology', 'National University', 'City College']
+FORMATS = ('txt', 'pdf', 'docx')
+
+
+def load_templates(dataset_path: str = DATASET_PATH) -> List[Dict[str, List[str]]]:
+    """
+    Split each job description in the dataset into reusable sentence pools
+
+    :param dataset_path: CSV with 'Job Title' and 'Job Description' columns
+    :return: One template per job with title, responsibilities and qualifications
+    """
+    try:
+        dataset = pd.read_csv(dataset_path, encoding='utf-8')
+    except UnicodeDecodeError:
+        dataset = pd.read_csv(dataset_path, encoding='latin-1')
+
+    templates = []
+    for _, row in dataset.dropna(subset=['Job Title', 'Job Description']).iterrows():
+        lines = [line.strip() for line in str(row['Job Description']).splitlines() if line.strip()]
+        responsibilities, qualifications, section = [], [], None
+        for line in lines:
+            lowered = line.lower().rstrip(':')
+            if lowered in ('responsibilities', 'key responsibilities'):
+                section = responsibilities
+            elif lowered in ('qualifications', 'requirements'):
+                section = qualifications
+            elif section is not None:
+                section.append(line.rstrip('.'))
+
+        templates.append({
+            'title': str(row['Job Title']).strip(),
+            'description': str(row['Job Description']),
+            'responsibilities': responsibilities or lines[1:],
+            'qualifications': qualifications or lines[1:]
+        })
+
+    return templates
+
+
+def generate_resume(template: Dict[str, List[str]], rng: random.Random) -> Dict[str, str]:
+    """
+    Build one synthetic resume loosely based on a job template
+
+    :param template: Template returned by ``load_templates``
+    :param rng: Random generator (seeded for reproducible corpora)
+    :return: Dictionary with candidate name, email, resume text, skills and experience
+    """
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    start_year = rng.randint(2005, 2020)
+    end_year = min(2025, start_year + rng.randint(1, 6))
+
+    duties = rng.sample(template['responsibilities'], k=min(len(template['responsibilities']), rng.randint(2, 5)))
+    skills = rng.sample(template['qualifications'], k=min(len(template['qualifications']), rng.randint(2, 4)))
+
+    lines = [
+        name,
+        f"{name.split()[0].lower()}.{name.split()[1].lower()}@example.com",
+        '',
+        'Summary',
+        f"{template['title']} with {end_year - start_year} years of experience.",
+        '',
+        'Experience',
+        f"{template['title'].split()[0]} at {rng.choice(COMPANIES)} from {start_year} - {end_year}",
+        *[f"- {duty}." for duty in duties],
+        '',
+        'Skills',
+        *[f"- {skill}." for skill in skills],
+        '',
+        'Education',
+        f"Bachelor degree from {rng.choice(UNIVERSITIES)} in Computer Science"
+    ]
+
+    return {
+        'name': name,
+        'email': lines[1],
+        'text': '\n'.join(lines),
+        'skills': skills,
+        'experience': duties
+    }
+
+
+def _write_pdf(path: str, lines: List[str]):
+    """Write a single-page text PDF without any PDF library"""
+
+    def escape(line: str) -> str:
+        line = line.encode('latin-1', 'replace').decode('latin-1')
+        return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    content = 'BT /F1 10 Tf 14 TL 50 760 Td\n' + ''.join(f'({escape(line)}) Tj T*\n' for line in lines[:50]) + 'ET'
+    content_bytes = content.encode('latin-1')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n' % len(content_bytes) + content_bytes + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'
+    ]
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+
+    xref_offset = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def write_resume(path: str, text: str):
+    """
+    Write resume text as .txt, .pdf or .docx depending on the extension
+
+    :param path: Destination file
+    :param text: Resume text
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.pdf':
+        _write_pdf(path, text.splitlines())
+    elif extension == '.docx':
+        if docx is None:
+            raise ImportError("python-docx is required to write .docx resumes")
+        document = docx.Document()
+        for line in text.splitlines():
+            document.add_paragraph(line)
+        document.save(path)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def generate_corpus(output_dir: str, num_resumes: int = 1000, num_jobs: int = 20,
+                    formats=FORMATS, seed: int = 42) -> Dict[str, str]:
+    """
+    Generate a synthetic screening corpus on disk
+
+    :param output_dir: Folder to create the corpus in
+    :param num_resumes: Number of resumes to generate
+    :param num_jobs: Number of job descriptions in the generated CSV
+    :param formats: Resume file formats to cycle through
+    :param seed: Random seed
+    :return: Paths of the CV folder and job description CSV
+    """
+    rng = random.Random(seed)
+    templates = load_templates()
+    if docx is None:
+        formats = tuple(fmt for fmt in formats if fmt != 'docx')
+
+    cvs_dir = os.path.join(output_dir, 'CVs')
+    os.makedirs(cvs_dir, exist_ok=True)
+
+    for index in range(num_resumes):
+        resume = generate_resume(rng.choice(templates), rng)
+        extension = formats[index % len(formats)]
+        write_resume(os.path.join(cvs_dir, f"C{index:06d}.{extension}"), resume['text'])
+
+    job_description_path = os.path.join(output_dir, 'job_description.csv')
+    with open(job_description_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Job Title', 'Job Description'])
+        for index in range(num_jobs):
+            template = templates[index % len(templates)]
+            writer.writerow([template['title'], template['description']])
+
+    return {
+        'cvs_directory': cvs_dir,
+        'job_description_path': job_description_path
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic resume and job description corpus")
+    parser.add_argument('output_dir')
+    parser.add_argument('--resumes', type=int, default=1000)
+    parser.add_argument('--jobs', type=int, default=20)
+    parser.add_argument('--formats', default=','.join(FORMATS), help="Comma-separated subset of txt,pdf,docx")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.output_dir, args.resumes, args.jobs, tuple(args.formats.split(',')), args.seed)
+    print(f"Generated {args.resumes} resumes in {paths['cvs_directory']}")
+    print(f"Generated {args.jobs} job descriptions in {paths['job_description_path']}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -12,12 +12,92 @@ class Config:
 
     # Database configuration
     DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'job_screening.db')
+    MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', '5000'))  # Rows rewritten per schema upgrade transaction
+
+    # Flask serving app
+    FLASK_HOST = os.getenv('FLASK_HOST', '127.0.0.1')
+    FLASK_PORT = int(os.getenv('FLASK_PORT', '5000'))
+    SERVING_POOL_SIZE = int(os.getenv('SERVING_POOL_SIZE', '4'))  # Pooled SQLite connections
+    SERVING_CACHE_SIZE = int(os.getenv('SERVING_CACHE_SIZE', '256'))  # Cached rendered responses
+    CANDIDATES_PER_PAGE = 25
+    SEARCH_PREFILTER_LIMIT = int(os.getenv('SEARCH_PREFILTER_LIMIT', '1000'))  # FTS hits scored by the vector stage
+    MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+
+    # Micro-batching of concurrent encode requests
+    ENCODER_MAX_BATCH = int(os.getenv('ENCODER_MAX_BATCH', '32'))
+    ENCODER_MAX_WAIT_MS = float(os.getenv('ENCODER_MAX_WAIT_MS', '5'))
+
+    # Parsed dataset snapshots shared between processes
+    CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.dirname(__file__), 'database', 'cache'))
+    # Memory-mapped snapshots of stored embeddings for millisecond full loads; empty disables them
+    EMBEDDING_SNAPSHOT_DIR = os.getenv('EMBEDDING_SNAPSHOT_DIR', os.path.join(CACHE_DIR, 'embeddings')) or None
+
+    # Sharded screening (main.py --workers)
+    SCREENING_WORKERS = int(os.getenv('SCREENING_WORKERS', '1'))  # 1 keeps screening in-process
+    RUN_CHECKPOINT_FILES = int(os.getenv('RUN_CHECKPOINT_FILES', '500'))  # CVs per screening run checkpoint
+    RUN_CHECKPOINT_SECONDS = float(os.getenv('RUN_CHECKPOINT_SECONDS', '60'))  # Or seconds, whichever comes first
+    TORCH_THREADS_PER_WORKER = int(os.getenv('TORCH_THREADS_PER_WORKER', '0')) or None  # Default: cores / workers
+
+    # Resume extraction sandbox: every file is parsed in a worker process under these limits
+    EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '2'))
+    EXTRACTION_TIMEOUT = float(os.getenv('EXTRACTION_TIMEOUT', '30'))  # Seconds per file
+    EXTRACTION_MAX_MEMORY_MB = int(os.getenv('EXTRACTION_MAX_MEMORY_MB', '512')) or None  # Growth allowed per worker
+    EXTRACTION_MAX_PAGES = int(os.getenv('EXTRACTION_MAX_PAGES', '50')) or None  # Longer PDFs are rejected
+    QUARANTINE_DIR = os.getenv('QUARANTINE_DIR', os.path.join(os.path.dirname(__file__), 'database', 'quarantine'))
+    QUARANTINE_MAX_FILES = int(os.getenv('QUARANTINE_MAX_FILES', '1000')) or None  # Oldest files are deleted beyond this
 
     # Matching threshold
     MATCH_THRESHOLD = 0.8  # 80% match required
 
+    # Weights of the multi-factor match score (normalized to sum to 1)
+    MATCH_WEIGHT_EMBEDDING = float(os.getenv('MATCH_WEIGHT_EMBEDDING', '0.5'))  # Profile/job embedding similarity
+    MATCH_WEIGHT_SKILLS = float(os.getenv('MATCH_WEIGHT_SKILLS', '0.3'))  # Share of required skills the candidate has
+    MATCH_WEIGHT_EXPERIENCE = float(os.getenv('MATCH_WEIGHT_EXPERIENCE', '0.1'))  # Years against the required level
+    MATCH_WEIGHT_EDUCATION = float(os.getenv('MATCH_WEIGHT_EDUCATION', '0.1'))  # Degree against the one asked for
+
+    # Cascade re-ranking (MatchingAgent.rerank_candidates): vector top-N, cross-encoder, then a budgeted LLM top-M
+    CASCADE_RETRIEVE_N = int(os.getenv('CASCADE_RETRIEVE_N', '100'))  # Candidates re-scored by the cross-encoder
+    CROSS_ENCODER_MODEL = os.getenv('CROSS_ENCODER_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')  # 'hashing-stub' runs offline
+    CROSS_ENCODER_BATCH = int(os.getenv('CROSS_ENCODER_BATCH', '32'))  # Pairs per forward pass
+    CASCADE_LLM_TOP_M = int(os.getenv('CASCADE_LLM_TOP_M', '5'))  # Candidates the LLM may judge (0 skips it)
+    CASCADE_LLM_SECONDS = float(os.getenv('CASCADE_LLM_SECONDS', '60'))  # Time budget of the LLM pass per job
+    CASCADE_LLM_TOKENS = int(os.getenv('CASCADE_LLM_TOKENS', '8000'))  # Token budget of the LLM pass per job
+
+    # Resume text is stored compressed in its own table: 'zstd' (needs zstandard, else zlib) or 'zlib'
+    RESUME_TEXT_CODEC = os.getenv('RESUME_TEXT_CODEC', 'zstd')
+
+    # Near-duplicate resumes (MinHash estimate of shingle Jaccard similarity)
+    DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', '0.85'))
+
+    # Skills taxonomy: JSON with 'hierarchy' and 'synonyms' (the built-in taxonomy if unset)
+    SKILLS_TAXONOMY_PATH = os.getenv('SKILLS_TAXONOMY_PATH') or None
+
     # Embedding model configuration
-    EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')  # 'hashing-stub' runs fully offline
+    EMBEDDING_DTYPE = os.getenv('EMBEDDING_DTYPE', 'float32')  # Stored vectors: float32, float16 or int8
+    # Resident model served by python -m models.embedding_server; empty disables the server
+    EMBEDDING_SOCKET = os.getenv('EMBEDDING_SOCKET', os.path.join(os.path.dirname(__file__), 'database', 'embeddings.sock')) or None
+    EMBEDDING_SERVER_TIMEOUT = float(os.getenv('EMBEDDING_SERVER_TIMEOUT', '30'))  # Seconds to wait for a reply
+    # Background re-embedding under a new model (python -m models.embedding_versions)
+    REEMBED_BATCH_SIZE = int(os.getenv('REEMBED_BATCH_SIZE', '256'))  # Texts embedded and committed together
+    REEMBED_RATE = float(os.getenv('REEMBED_RATE', '50'))  # Texts per second at most; 0 does not throttle
+
+    # In-memory candidate index: 'none' (exact float32), 'int8' (scalar) or 'pq' (product quantization)
+    VECTOR_QUANTIZATION = os.getenv('VECTOR_QUANTIZATION', 'none')
+    RERANK_FACTOR = int(os.getenv('RERANK_FACTOR', '10'))  # Quantized shortlist re-scored exactly, as a multiple of k
+    PQ_SUBSPACES = int(os.getenv('PQ_SUBSPACES', '48'))  # Bytes per vector with product quantization
+
+    # Logging configuration
+    LOG_JSON = os.getenv('LOG_JSON', 'false').lower() == 'true'
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))  # Fraction of per-item records kept
+    LOG_MAX_PER_SECOND = float(os.getenv('LOG_MAX_PER_SECOND', '0')) or None
+
+    # Parquet export of screening results (python -m utils.results_export)
+    EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(__file__), 'database', 'exports'))
+    EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', '65536'))  # Rows per record batch / row group
+
+    # Pipeline metrics export (.prom for Prometheus text format, anything else for JSON)
+    METRICS_PATH = os.getenv('METRICS_PATH', os.path.join(os.path.dirname(__file__), 'logs', 'screening_metrics.json'))
 
     # API Key configuration
     API_KEY = os.getenv("Bearer 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")
\ No newline at end of file
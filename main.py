@@ -1,182 +1,229 @@
 import os
 import sys
+import argparse
 import logging
-import pandas as pd
-import sqlite3
+import numpy as np
 from config import Config
 from utils.database_manager import DatabaseManager
+from utils.jd_loader import iter_job_descriptions
+from utils.sharded_screening import list_cv_files, screen_sharded, score_cv
+from utils.screening_runs import ScreeningRun, RUNNING, SCORED, DUPLICATE, REJECTED
+from utils.extraction_pool import ExtractionPool
+from utils.near_duplicates import NearDuplicateDetector
 from utils.ollama_interface import OllamaInterface
 from models.embedding_model import EmbeddingModel
+from models.embedding_versions import active_model_version
 from agents.job_description_agent import JobDescriptionAgent
 from agents.recruiting_agent import RecruitingAgent
 from agents.matching_agent import MatchingAgent
 from agents.interview_scheduler import InterviewSchedulerAgent
-from utils.logger import JobScreeningLogger
+from utils.logger import JobScreeningLogger, setup_logging, PER_ITEM, metrics
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('job_screening.log')
-    ]
+# Configure logging (file writes happen on a background listener thread)
+setup_logging(
+    json_lines=Config.LOG_JSON,
+    sample_rate=Config.LOG_SAMPLE_RATE,
+    max_per_second=Config.LOG_MAX_PER_SECOND
 )
-logger = logging.getLogger(__name__)
+logger = logging.getLogger('job_screening_system.main')
 
-def calculate_match_score(cv_text, job_description_text, embedding_model):
+def screen_candidates(cvs_directory, job_description_path, db_path=Config.DATABASE_PATH, embedding_model=None, top_n=3,
+                      workers=None, torch_threads=None, min_score=None, duplicate_threshold=Config.DUPLICATE_THRESHOLD,
+                      resume_run_id=None):
     """
-    Calculate match score between CV and job description using embedding similarity
+    Score every CV in a folder against a job description and store the top matches
     
-    :param cv_text: Text from the CV
-    :param job_description_text: Text from the job description
-    :param embedding_model: Embedding model for text comparison
-    :return: Match score (0-1)
+    Progress is checkpointed in the database as a screening run, and the
+    shortlist is published in one transaction once every CV is done.
+    
+    :param cvs_directory: Folder containing .txt/.pdf/.docx CVs
+    :param job_description_path: CSV with a 'Job Description' column
+    :param db_path: Screening database the job and its top matches are stored in
+    :param embedding_model: Preloaded embedding model (created if omitted)
+    :param top_n: Number of top candidates to keep
+    :param workers: Worker processes to shard the CVs across (1 screens in-process)
+    :param torch_threads: Torch threads per worker (defaults to cores / workers)
+    :param min_score: Drop candidates scoring below this
+    :param duplicate_threshold: Near-duplicate CVs above this similarity are not scored again but
+        listed under their canonical CV (0 or None scores every CV)
+    :param resume_run_id: Continue this interrupted run from its last checkpoint; the folder, job
+        description and scoring settings are taken from the run
+    :return: Top candidates sorted by match score
     """
-    # Use the built-in calculate_similarity method
-    similarity = embedding_model.calculate_similarity(cv_text, job_description_text)
+    top_candidates = []
+    run = None
+    # CVs are parsed in sandboxed worker processes with a timeout, memory cap and page limit
+    extractor = ExtractionPool()
     
-    return similarity
-
-def main():
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    db = DatabaseManager(db_path)
     try:
         logger.info("Starting Job Screening Process")
         
-        # Directories and paths
-        cvs_directory = r'C:\Users\megha\Downloads\hack\database\CVs1'
-        job_description_path = r'C:\Users\megha\Downloads\hack\database\job_description.csv'
-        match_db_path = r'C:\Users\megha\Downloads\hack\database\match.db'
-        
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(match_db_path), exist_ok=True)
-        
-        # Initialize embedding model
-        logger.info("Initializing embedding model")
-        embedding_model = EmbeddingModel()
-        
-        # Read job description with multiple encoding attempts
-        encodings = ['utf-8', 'latin-1', 'windows-1252', 'iso-8859-1']
-        job_description_df = None
-        
-        for encoding in encodings:
-            try:
-                job_description_df = pd.read_csv(job_description_path, encoding=encoding)
-                logger.info(f"Successfully read job description with {encoding} encoding")
-                break
-            except UnicodeDecodeError:
-                logger.warning(f"Failed to read job description with {encoding} encoding")
-        
-        if job_description_df is None or job_description_df.empty:
-            logger.error("Could not read job description CSV with any encoding")
-            return
-        
-        # Use the first row's job description (now using the correct column name)
-        job_description_text = job_description_df.iloc[0]['Job Description']
-        
-        # Prepare results storage
-        cv_match_scores = []
-        
-        # Process all CVs
-        for resume_file in os.listdir(cvs_directory):
-            try:
-                # Skip non-text files
-                if not resume_file.lower().endswith(('.txt', '.pdf', '.docx')):
-                    continue
-                
-                resume_path = os.path.join(cvs_directory, resume_file)
-                candidate_name = os.path.splitext(resume_file)[0]
-                
-                # Read CV content
-                with open(resume_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    cv_text = f.read()
-                
-                # Calculate match score
-                match_score = calculate_match_score(cv_text, job_description_text, embedding_model)
-                
-                cv_match_scores.append({
-                    'candidate_name': candidate_name,
-                    'match_score': match_score,
-                    'cv_path': resume_path
-                })
-                
-                logger.info(f"Processed {candidate_name} with match score: {match_score}")
-            
-            except Exception as e:
-                logger.error(f"Error processing {resume_file}: {e}", exc_info=True)
-        
-        # Sort candidates by match score
-        cv_match_scores.sort(key=lambda x: x['match_score'], reverse=True)
-        
-        # Select top 3 candidates
-        top_3_candidates = cv_match_scores[:3]
+        workers = workers or Config.SCREENING_WORKERS
+        # New runs embed with the served model version, so their vectors match the shared index
+        model_name = getattr(embedding_model, 'model_name', None) or active_model_version(db.conn)
         
-        # Ensure database directory exists
-        os.makedirs(os.path.dirname(match_db_path), exist_ok=True)
-        
-        # Remove existing database if it exists to prevent corruption
-        if os.path.exists(match_db_path):
+        if resume_run_id is not None:
             try:
-                os.remove(match_db_path)
-                logger.info(f"Removed existing database: {match_db_path}")
-            except PermissionError:
-                logger.error(f"Cannot remove database. It might be in use: {match_db_path}")
-                raise
-        
-        # Create a new database connection with error handling
-        try:
-            conn = sqlite3.connect(match_db_path)
-            cursor = conn.cursor()
+                run = ScreeningRun.resume(db, resume_run_id)
+            except (LookupError, ValueError) as e:
+                logger.error(f"Cannot resume: {e}")
+                return top_candidates
+            logger.info(f"Resuming screening run {run.run_id}: {len(run.processed)} CVs already done")
+            if embedding_model is not None and run.model_version != model_name:
+                embedding_model = None
+        else:
+            # Stream the job description CSV; only the first row is parsed
+            first_job = next(iter_job_descriptions(job_description_path, chunksize=1), None)
             
-            # Create table with strict schema
-            cursor.execute('''
-                CREATE TABLE candidate_matches (
-                    candidate_name TEXT PRIMARY KEY,
-                    match_score REAL NOT NULL CHECK(match_score >= 0 AND match_score <= 1),
-                    cv_path TEXT NOT NULL
-                )
-            ''')
+            if first_job is None:
+                logger.error("Could not read any job description from the CSV")
+                return top_candidates
             
-            # Insert candidates with type conversion and error handling
-            for candidate in top_3_candidates:
+            run = ScreeningRun.start(db, cvs_directory, first_job['title'], first_job['description'], model_name,
+                                     top_n, min_score, duplicate_threshold or None)
+            logger.info(f"Started screening run {run.run_id}")
+        
+        # A resumed run keeps scoring against the same text and settings
+        job_description_text = run.job_description
+        top_n, min_score, duplicate_threshold = run.top_n, run.min_score, run.duplicate_threshold
+        
+        # Initialize embedding model (sharded workers load their own)
+        if embedding_model is None and workers <= 1:
+            logger.info("Initializing embedding model")
+            embedding_model = EmbeddingModel(run.model_version)
+        
+        # Only CVs the run has not finished yet; just the best top_n scores are held in memory
+        cv_paths = [path for path in list_cv_files(run.cvs_directory) if path not in run.processed]
+        if run.retryable:
+            retried = len(run.retryable.intersection(cv_paths))
+            logger.info(f"Retrying {retried} CVs rejected for a transient reason"
+                        + (f"; {len(run.retryable) - retried} are no longer in {run.cvs_directory}"
+                           if retried < len(run.retryable) else ""))
+        
+        if workers > 1:
+            # Partition the CVs across worker processes; every shard's outcomes are recorded in the run
+            screen_sharded(
+                cv_paths, job_description_text,
+                model_name=run.model_version,
+                workers=workers,
+                torch_threads=torch_threads or Config.TORCH_THREADS_PER_WORKER,
+                top_n=top_n,
+                min_score=min_score,
+                duplicate_threshold=duplicate_threshold,
+                extractor=extractor,
+                run=run
+            )
+        else:
+            detector = NearDuplicateDetector(duplicate_threshold) if duplicate_threshold else None
+            if detector:
+                run.restore_detector(detector)
+            # The job description is embedded once; each CV is embedded once and kept in the run
+            job_vector = np.asarray(embedding_model.encode_text(job_description_text), dtype=np.float32)
+            # Process all CVs, extracted in parallel while earlier ones are scored
+            for extracted in extractor.imap(cv_paths):
+                resume_path = extracted.path
+                resume_file = os.path.basename(resume_path)
+                if extracted.error is not None:
+                    metrics.increment('cvs_failed')
+                    logger.error(f"Error processing {resume_file}: {extracted.error}")
+                    run.record(resume_path, REJECTED, error=extracted.error, retryable=extracted.transient)
+                    run.maybe_checkpoint()
+                    continue
                 try:
-                    cursor.execute('''
-                        INSERT INTO candidate_matches 
-                        (candidate_name, match_score, cv_path) 
-                        VALUES (?, ?, ?)
-                    ''', (
-                        str(candidate['candidate_name']), 
-                        float(candidate['match_score']), 
-                        str(candidate['cv_path'])
-                    ))
-                except sqlite3.IntegrityError as e:
-                    logger.error(f"Integrity error inserting candidate {candidate['candidate_name']}: {e}")
+                    candidate_name = os.path.splitext(resume_file)[0]
+                    cv_text = extracted.text
+                    
+                    # A resubmitted CV shares the score of the copy seen first
+                    signature = detector.hasher.signature(cv_text) if detector else None
+                    canonical_path = detector.add_signature(resume_path, signature) if detector else None
+                    if canonical_path is not None:
+                        run.record(resume_path, DUPLICATE, canonical_path=canonical_path)
+                        metrics.increment('cvs_processed')
+                        logger.info(f"Skipped {candidate_name}: near-duplicate of {os.path.basename(canonical_path)}",
+                                    extra=PER_ITEM)
+                    else:
+                        # Calculate match score
+                        match_score, vector = score_cv(embedding_model, cv_text, job_vector)
+                        run.record(resume_path, SCORED, match_score, vector, signature)
+                        
+                        metrics.increment('cvs_processed')
+                        logger.info(f"Processed {candidate_name} with match score: {match_score}", extra=PER_ITEM)
+                
                 except Exception as e:
-                    logger.error(f"Error inserting candidate {candidate['candidate_name']}: {e}")
-            
-            # Commit and verify
-            conn.commit()
-            
-            # Verify data insertion
-            cursor.execute('SELECT COUNT(*) FROM candidate_matches')
-            count = cursor.fetchone()[0]
-            logger.info(f"Successfully inserted {count} candidates into the database")
-        
-        except sqlite3.Error as e:
-            logger.error(f"SQLite database creation error: {e}")
-            raise
-        finally:
-            if conn:
-                conn.close()
+                    metrics.increment('cvs_failed')
+                    logger.error(f"Error processing {resume_file}: {e}", exc_info=True)
+                    run.record(resume_path, REJECTED, error=str(e), retryable=True)
+                run.maybe_checkpoint()
+        
+        # Canonical CV path -> paths of its near-duplicates, over the whole run
+        duplicates = run.duplicates()
+        if duplicates:
+            logger.info(f"Found {len(duplicates)} near-duplicate clusters covering "
+                        f"{sum(map(len, duplicates.values()))} extra CVs")
+            for canonical_path, copies in duplicates.items():
+                logger.info(f"Duplicate cluster: {os.path.basename(canonical_path)} <- "
+                            f"{', '.join(os.path.basename(path) for path in copies)}")
+        
+        # Select top candidates, best first
+        top_candidates = [
+            dict(candidate, duplicates=duplicates.get(candidate['cv_path'], []))
+            for candidate in run.selector.results()
+        ]
+        
+        # Swap the job's shortlist for this run's in one transaction
+        job_id = run.publish(top_candidates)
+        logger.info(f"Stored {len(top_candidates)} matches for job {job_id}")
         
         # Log results
-        logger.info("Top 3 Matching Candidates:")
-        for candidate in top_3_candidates:
+        logger.info(f"Top {top_n} Matching Candidates:")
+        for candidate in top_candidates:
             logger.info(f"Candidate: {candidate['candidate_name']}, Match Score: {candidate['match_score']}")
         
-        logger.info(f"Results saved to {match_db_path}")
+        logger.info(f"Results saved to {db_path}")
     
     except Exception as e:
         logger.error(f"An error occurred during job screening: {e}", exc_info=True)
+        if run is not None:
+            run.fail()
+            logger.info(f"Continue with: python main.py --resume {run.run_id}")
+    
+    finally:
+        # An interrupted run (e.g. Ctrl-C) keeps everything up to this point
+        if run is not None and run.status == RUNNING:
+            run.checkpoint()
+        extractor.close()
+        db.close()
+        
+        # Export per-stage timings for capacity planning
+        logger.info(f"Pipeline metrics written to {metrics.export(Config.METRICS_PATH)}")
+    
+    return top_candidates
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a folder of CVs against a job description")
+    parser.add_argument('--cvs-dir', default=r'C:\Users\megha\Downloads\hack\database\CVs1')
+    parser.add_argument('--job-description', default=r'C:\Users\megha\Downloads\hack\database\job_description.csv')
+    parser.add_argument('--db', '--match-db', dest='db', default=Config.DATABASE_PATH,
+                        help="Screening database (shared with the dashboard and agents)")
+    parser.add_argument('--top-n', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=Config.SCREENING_WORKERS,
+                        help="Worker processes to shard the CVs across")
+    parser.add_argument('--torch-threads', type=int, default=Config.TORCH_THREADS_PER_WORKER,
+                        help="Torch threads per worker (default: cores / workers)")
+    parser.add_argument('--min-score', type=float, default=None,
+                        help="Ignore candidates scoring below this")
+    parser.add_argument('--duplicate-threshold', type=float, default=Config.DUPLICATE_THRESHOLD,
+                        help="Similarity above which a CV counts as a near-duplicate (0 scores every CV)")
+    parser.add_argument('--resume', type=int, default=None, metavar='RUN_ID',
+                        help="Continue an interrupted screening run from its last checkpoint")
+    args = parser.parse_args()
+    
+    screen_candidates(args.cvs_dir, args.job_description, args.db, top_n=args.top_n,
+                      workers=args.workers, torch_threads=args.torch_threads, min_score=args.min_score,
+                      duplicate_threshold=args.duplicate_threshold, resume_run_id=args.resume)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
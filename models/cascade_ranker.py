@@ -0,0 +1,228 @@
+import re
+import time
+import logging
+import sqlite3
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from models.embedding_model import STUB_MODEL_NAME, HashingEncoder
+from models.match_scoring import MultiFactorScorer, FEATURES
+from models.vector_index import profile_text
+from utils.ollama_interface import OllamaInterface
+from utils.top_k import TopKSelector
+from utils.logger import metrics
+
+logger = logging.getLogger('job_screening_system.cascade_ranker')
+
+STAGES = ('vector', 'cross_encoder', 'llm')
+
+# Rough characters per token, to check a prompt against the token budget before sending it
+CHARS_PER_TOKEN = 4
+# The LLM only has to answer with a score
+LLM_MAX_TOKENS = 16
+# Characters of the job and the candidate put in a prompt
+LLM_TEXT_CHARS = 2000
+
+LLM_PROMPT = """You are screening candidates for a job. Rate how well the candidate fits the job, from 0 (not at all) to 100 (perfect fit).
+
+Job:
+{job}
+
+Candidate:
+{candidate}
+
+Respond with JSON only: {{"score": <0-100>}}"""
+
+_SCORE = re.compile(r'\d+(?:\.\d+)?')
+
+
+class HashingCrossEncoder:
+    def __init__(self, dimension: int = 384):
+        """
+        Offline stand-in for a cross-encoder, scoring each pair by the cosine of its hashed bag-of-words vectors
+
+        :param dimension: Size of the hashed vectors
+        """
+        self.encoder = HashingEncoder(dimension)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Mirror ``CrossEncoder.predict``: one score in [0, 1] per ``(query, document)`` pair"""
+        if not len(pairs):
+            return np.empty(0, dtype=np.float32)
+        queries = self.encoder.encode([query for query, _ in pairs])
+        documents = self.encoder.encode([document for _, document in pairs])
+        return np.einsum('ij,ij->i', queries, documents)
+
+
+def load_cross_encoder(model_name: str = Config.CROSS_ENCODER_MODEL):
+    """
+    Load a cross-encoder into this process
+
+    :param model_name: Name of the cross-encoder, or ``STUB_MODEL_NAME`` for the offline scorer
+    :return: Object with a ``CrossEncoder``-style ``predict``
+    """
+    if model_name == STUB_MODEL_NAME:
+        return HashingCrossEncoder()
+    # Imported here rather than at module load: importing torch alone takes seconds
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError:
+        raise ImportError("sentence-transformers is required for cross-encoder " + model_name) from None
+    return CrossEncoder(model_name, max_length=512)
+
+
+def parse_llm_score(response: str) -> Optional[float]:
+    """
+    Read the 0-100 rating out of an LLM answer
+
+    :param response: Generated text
+    :return: Score in [0, 1], or None if the answer holds no number
+    """
+    match = _SCORE.search(response or '')
+    return min(max(float(match.group()), 0.0), 100.0) / 100 if match else None
+
+
+class CascadeResult(NamedTuple):
+    candidates: List[Dict[str, Any]]
+    stage_seconds: Dict[str, float]
+
+
+class CascadeRanker:
+    def __init__(self, scorer: MultiFactorScorer, cross_encoder=None, llm: Optional[OllamaInterface] = None,
+                 retrieve_n: int = Config.CASCADE_RETRIEVE_N, llm_top_m: int = Config.CASCADE_LLM_TOP_M,
+                 llm_seconds: float = Config.CASCADE_LLM_SECONDS, llm_tokens: int = Config.CASCADE_LLM_TOKENS,
+                 batch_size: int = Config.CROSS_ENCODER_BATCH):
+        """
+        Rank a job's candidates in stages of increasing cost on shrinking sets
+
+        The multi-factor vector score picks the top ``retrieve_n`` of all
+        candidates, a cross-encoder re-scores those against the job text in
+        batches, and an optional LLM judges the best ``llm_top_m`` of them
+        until its time or token budget runs out. Each stage's latency is
+        recorded.
+
+        :param scorer: Multi-factor scorer of the first stage
+        :param cross_encoder: Object with a ``CrossEncoder``-style ``predict`` (``CROSS_ENCODER_MODEL`` if omitted)
+        :param llm: Ollama interface of the last stage (None skips it)
+        :param retrieve_n: Candidates passed to the cross-encoder
+        :param llm_top_m: Candidates the LLM may judge
+        :param llm_seconds: Time budget of the LLM stage per job
+        :param llm_tokens: Token budget of the LLM stage per job, prompts included
+        :param batch_size: Pairs per cross-encoder forward pass
+        """
+        self.scorer = scorer
+        self.cross_encoder = cross_encoder if cross_encoder is not None else load_cross_encoder()
+        self.llm = llm
+        self.retrieve_n = retrieve_n
+        self.llm_top_m = llm_top_m
+        self.llm_seconds = llm_seconds
+        self.llm_tokens = llm_tokens
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _job_text(conn: sqlite3.Connection, job_id: int) -> str:
+        title, summary, required_skills, raw_jd = conn.execute(
+            "SELECT title, summary, required_skills, raw_jd FROM job_descriptions WHERE id = ?", (job_id,)
+        ).fetchone()
+        # Cross-encoders truncate long inputs, so the short fields go first
+        return ' '.join(part for part in (title, summary, profile_text(required_skills, None, None), raw_jd) if part)
+
+    @staticmethod
+    def _candidate_texts(conn: sqlite3.Connection, candidate_ids: List[int]) -> Dict[int, str]:
+        placeholders = ','.join('?' * len(candidate_ids))
+        return {
+            candidate_id: f"{name or ''} {profile_text(skills, experience, education)}".strip()
+            for candidate_id, name, skills, experience, education in conn.execute(
+                f"SELECT id, name, skills, experience, education FROM candidates WHERE id IN ({placeholders})",
+                candidate_ids
+            )
+        }
+
+    def _judge(self, job_text: str, candidates: List[Dict[str, Any]], texts: Dict[int, str]) -> int:
+        """Ask the LLM to score candidates in order until the budget runs out; returns how many it judged"""
+        deadline = time.monotonic() + self.llm_seconds
+        tokens = judged = 0
+        for candidate in candidates:
+            prompt = LLM_PROMPT.format(job=job_text[:LLM_TEXT_CHARS],
+                                       candidate=texts.get(candidate['candidate_id'], '')[:LLM_TEXT_CHARS])
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or tokens + len(prompt) // CHARS_PER_TOKEN + LLM_MAX_TOKENS > self.llm_tokens:
+                metrics.increment('cascade_llm_budget_exhausted')
+                break
+            response, used = self.llm.generate_with_usage(prompt, LLM_MAX_TOKENS, timeout=remaining)
+            tokens += used or len(prompt) // CHARS_PER_TOKEN + LLM_MAX_TOKENS
+            candidate['llm_score'] = parse_llm_score(response)
+            judged += 1
+        metrics.increment('cascade_llm_tokens', tokens)
+        return judged
+
+    def rank(self, conn: sqlite3.Connection, job_id: int, candidate_ids: Optional[List[int]] = None,
+             retrieve_n: Optional[int] = None, llm_top_m: Optional[int] = None) -> CascadeResult:
+        """
+        Rank a job's candidates through the cascade
+
+        :param conn: Database connection
+        :param job_id: ID of the job description
+        :param candidate_ids: Only rank these candidates (all if omitted)
+        :param retrieve_n: Candidates passed to the cross-encoder (the ranker's default if omitted)
+        :param llm_top_m: Candidates the LLM may judge (the ranker's default if omitted)
+        :return: The top ``retrieve_n`` candidates, best first, and the seconds spent in each stage
+        """
+        retrieve_n = self.retrieve_n if retrieve_n is None else retrieve_n
+        llm_top_m = self.llm_top_m if llm_top_m is None else llm_top_m
+        stage_seconds = dict.fromkeys(STAGES, 0.0)
+
+        start = time.perf_counter()
+        with metrics.timer('cascade_vector'):
+            ids, scores, factors = self.scorer.score(conn, job_id, candidate_ids)
+            selector = TopKSelector(retrieve_n)
+            selector.push_scores(scores, range(len(ids)))
+            candidates = [
+                {
+                    'candidate_id': int(ids[row]),
+                    'match_score': float(scores[row]),
+                    'factors': dict(zip(FEATURES, factors[row].tolist())),
+                    'rerank_score': None,
+                    'llm_score': None
+                }
+                for row in selector.results()
+            ]
+        stage_seconds['vector'] = time.perf_counter() - start
+        if not candidates:
+            return CascadeResult(candidates, stage_seconds)
+
+        start = time.perf_counter()
+        with metrics.timer('cascade_cross_encoder', items=len(candidates)):
+            job_text = self._job_text(conn, job_id)
+            texts = self._candidate_texts(conn, [candidate['candidate_id'] for candidate in candidates])
+            rerank_scores = np.asarray(self.cross_encoder.predict(
+                [(job_text, texts.get(candidate['candidate_id'], '')) for candidate in candidates],
+                batch_size=self.batch_size
+            ), dtype=np.float64)
+            for candidate, rerank_score in zip(candidates, rerank_scores.tolist()):
+                candidate['rerank_score'] = rerank_score
+            # Stable sort: equal cross-encoder scores keep the vector order
+            candidates.sort(key=lambda candidate: -candidate['rerank_score'])
+        stage_seconds['cross_encoder'] = time.perf_counter() - start
+
+        judged = 0
+        if self.llm is not None and llm_top_m > 0:
+            start = time.perf_counter()
+            with metrics.timer('cascade_llm'):
+                top = candidates[:llm_top_m]
+                judged = self._judge(job_text, top, texts)
+                # Judged candidates swap places among themselves by LLM score; the rest keep theirs
+                slots = [position for position, candidate in enumerate(top) if candidate['llm_score'] is not None]
+                ranked = sorted((top[position] for position in slots), key=lambda candidate: -candidate['llm_score'])
+                for position, candidate in zip(slots, ranked):
+                    candidates[position] = candidate
+            stage_seconds['llm'] = time.perf_counter() - start
+
+        logger.info(
+            f"Cascade for job {job_id}: {len(ids)} candidates scored in {stage_seconds['vector']:.3f}s, "
+            f"{len(candidates)} re-ranked in {stage_seconds['cross_encoder']:.3f}s, "
+            f"{judged} judged by the LLM in {stage_seconds['llm']:.3f}s"
+        )
+        return CascadeResult(candidates, stage_seconds)
@@ -1,34 +1,137 @@
-from sentence_transformers import SentenceTransformer
+import re
+import zlib
+import logging
+from typing import List, Optional
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from config import Config
+from models.embedding_server import EmbeddingClient, EmbeddingServerError
+from utils.logger import metrics
+
+logger = logging.getLogger('job_screening_system.embedding_model')
+
+# Model name that selects the offline hashing encoder instead of a transformer
+STUB_MODEL_NAME = 'hashing-stub'
+
+
+class HashingEncoder:
+    def __init__(self, dimension: int = 384):
+        """
+        Tiny deterministic bag-of-words encoder for offline runs and benchmarks
+
+        Token counts are hashed into a fixed number of buckets, so it needs no
+        model download and no torch, while still giving higher cosine scores
+        (always within 0-1) to texts that share vocabulary.
+
+        :param dimension: Size of the produced vectors
+        """
+        self.dimension = dimension
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r'\w+', text.lower()):
+            vector[zlib.crc32(token.encode('utf-8')) % self.dimension] += 1.0
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        """Mirror ``SentenceTransformer.encode`` for a string or a list of strings"""
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.vstack([self._encode_one(text) for text in sentences]) if len(sentences) else \
+            np.empty((0, self.dimension), dtype=np.float32)
+
+
+def load_model(model_name: str):
+    """
+    Load an embedding model into this process
+
+    :param model_name: Name of the embedding model, or ``STUB_MODEL_NAME`` for the offline encoder
+        (``STUB_MODEL_NAME-<dimension>``, e.g. 'hashing-stub-256', for one with another vector size)
+    :return: Object with a ``SentenceTransformer``-style ``encode``
+    """
+    if model_name == STUB_MODEL_NAME:
+        return HashingEncoder()
+    dimension = model_name[len(STUB_MODEL_NAME) + 1:] if model_name.startswith(STUB_MODEL_NAME + '-') else ''
+    if dimension.isdigit():
+        return HashingEncoder(int(dimension))
+    # Imported here rather than at module load: importing torch alone takes seconds
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError("sentence-transformers is required for model " + model_name) from None
+    return SentenceTransformer(model_name)
+
 
 class EmbeddingModel:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', socket_path: Optional[str] = Config.EMBEDDING_SOCKET):
         """
         Initialize embedding model
-        
-        :param model_name: Name of the embedding model
+
+        If an embedding server (``python -m models.embedding_server``) is
+        running with the same model, texts are encoded there and nothing is
+        loaded here. Otherwise, or once the server stops answering, the model
+        is loaded in this process.
+
+        :param model_name: Name of the embedding model, or ``STUB_MODEL_NAME`` for the offline encoder
+        :param socket_path: Unix socket of the embedding server (None always loads in-process)
         """
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.client: Optional[EmbeddingClient] = EmbeddingClient.connect(socket_path, model_name) \
+            if socket_path else None
+        self._model = None if self.client is not None else load_model(model_name)
 
+    @property
+    def model(self):
+        """Encoder in use: the server connection, or the in-process model"""
+        if self.client is not None:
+            return self.client
+        if self._model is None:
+            self._model = load_model(self.model_name)
+        return self._model
+
+    def _encode(self, sentences, **kwargs):
+        if self.client is not None:
+            try:
+                return self.client.encode(sentences, **kwargs)
+            except (OSError, EmbeddingServerError) as e:
+                logger.warning(f"Embedding server failed ({e}), loading {self.model_name} in process")
+                self.client.close()
+                self.client = None
+        return self.model.encode(sentences, **kwargs)
+
+    @metrics.timer('encode_text')
     def encode_text(self, text: str) -> np.ndarray:
         """
         Generate embedding for input text
-        
+
         :param text: Input text
         :return: Embedding vector
         """
-        return self.model.encode(text)
+        return self._encode(text)
 
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Generate embeddings for many texts in one model call
+
+        :param texts: Input texts
+        :param batch_size: Texts per forward pass
+        :return: 2-D array with one embedding per text
+        """
+        with metrics.timer('encode_batch', items=len(texts)):
+            return np.asarray(self._encode(list(texts), batch_size=batch_size), dtype=np.float32)
+
+    @metrics.timer('calculate_similarity')
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """
         Calculate cosine similarity between two texts
-        
+
         :param text1: First text
         :param text2: Second text
         :return: Similarity score
         """
         embedding1 = self.encode_text(text1)
         embedding2 = self.encode_text(text2)
-        
-        return float(cosine_similarity([embedding1], [embedding2])[0][0])
\ No newline at end of file
+
+        norm = np.linalg.norm(embedding1) * np.linalg.norm(embedding2)
+        return float(np.dot(embedding1, embedding2) / norm) if norm else 0.0
\ No newline at end of file
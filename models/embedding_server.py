@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import signal
+import socket
+import struct
+import logging
+import argparse
+import threading
+import socketserver
+from typing import List, Optional, Union
+
+import numpy as np
+
+from config import Config
+from utils.logger import metrics
+
+logger = logging.getLogger('job_screening_system.embedding_server')
+
+# Wire format. A request is a little-endian uint32 length followed by that many
+# bytes of UTF-8 JSON: {"model": name, "texts": [...]}. The reply is a pair of
+# int32 (rows, dimension) followed by rows * dimension little-endian float32
+# values; rows == -1 means the next ``dimension`` bytes are a UTF-8 error message.
+_REQUEST_HEADER = struct.Struct('<I')
+_REPLY_HEADER = struct.Struct('<ii')
+_ERROR_ROWS = -1
+
+
+class EmbeddingServerError(RuntimeError):
+    """The embedding server refused or failed a request"""
+
+
+def _recv_into(sock: socket.socket, view: memoryview):
+    received = 0
+    while received < view.nbytes:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Embedding server connection closed")
+        received += count
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    _recv_into(sock, memoryview(buffer))
+    return buffer
+
+
+class EmbeddingClient:
+    def __init__(self, sock: socket.socket, model_name: str, dimension: int):
+        """
+        Connection to a running embedding server (use ``connect``)
+
+        :param sock: Connected Unix socket
+        :param model_name: Model the server encodes with
+        :param dimension: Size of the vectors it returns
+        """
+        self.sock = sock
+        self.model_name = model_name
+        self.dimension = dimension
+        # One request in flight per connection; the model may be shared by several threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, socket_path: str, model_name: str,
+                timeout: float = Config.EMBEDDING_SERVER_TIMEOUT) -> Optional['EmbeddingClient']:
+        """
+        Connect to the embedding server if one is running with the wanted model
+
+        :param socket_path: Path of the server's Unix socket
+        :param model_name: Model the vectors must come from
+        :param timeout: Seconds to wait for a reply before giving up
+        :return: The client, or None if no server with that model is reachable
+        """
+        if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+            client = cls(sock, model_name, 0)
+            # An empty request checks the model and tells us the vector size
+            client.dimension = client.encode([]).shape[1]
+            return client
+        except (OSError, EmbeddingServerError) as e:
+            logger.info(f"Not using the embedding server at {socket_path}: {e}")
+            sock.close()
+            return None
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        """
+        Mirror ``SentenceTransformer.encode`` for a string or a list of strings
+
+        :param sentences: Text or texts to encode
+        :return: Embedding vector, or a 2-D array with one embedding per text
+        :raises EmbeddingServerError: If the server could not encode the texts
+        :raises OSError: If the connection failed
+        """
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        request = json.dumps({'model': self.model_name, 'texts': texts}).encode('utf-8')
+        with self._lock, metrics.timer('embedding_server_request', items=len(texts)):
+            self.sock.sendall(_REQUEST_HEADER.pack(len(request)) + request)
+            rows, dimension = _REPLY_HEADER.unpack(_recv_exactly(self.sock, _REPLY_HEADER.size))
+            if rows == _ERROR_ROWS:
+                raise EmbeddingServerError(_recv_exactly(self.sock, dimension).decode('utf-8'))
+            # Receive straight into the result array
+            vectors = np.empty((rows, dimension), dtype='<f4')
+            _recv_into(self.sock, memoryview(vectors.reshape(-1).view(np.uint8)))
+        return vectors[0] if isinstance(sentences, str) else vectors
+
+    def close(self):
+        """Close the connection"""
+        self.sock.close()
+
+
+class _EncodeHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: EmbeddingServer = self.server
+        # A connection stays open for any number of requests
+        while True:
+            try:
+                (size,) = _REQUEST_HEADER.unpack(_recv_exactly(self.request, _REQUEST_HEADER.size))
+                request = json.loads(_recv_exactly(self.request, size).decode('utf-8'))
+            except ConnectionError:
+                return
+            try:
+                vectors = server.encode(request['model'], request['texts'])
+            except Exception as e:
+                message = str(e).encode('utf-8')
+                self.request.sendall(_REPLY_HEADER.pack(_ERROR_ROWS, len(message)) + message)
+                continue
+            self.request.sendall(_REPLY_HEADER.pack(*vectors.shape))
+            self.request.sendall(memoryview(vectors.reshape(-1)))
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, embedding_model, socket_path: str = Config.EMBEDDING_SOCKET,
+                 max_batch_size: int = Config.ENCODER_MAX_BATCH, max_wait_ms: float = Config.ENCODER_MAX_WAIT_MS):
+        """
+        Serve encode requests for a resident embedding model over a Unix socket
+
+        Every connection gets its own thread; their texts are queued to one
+        ``EncodingScheduler``, so concurrent clients share model calls. A
+        stale socket file left by a crashed server is replaced.
+
+        :param embedding_model: In-process ``EmbeddingModel`` to serve
+        :param socket_path: Path of the Unix socket
+        :param max_batch_size: Texts per model call
+        :param max_wait_ms: How long a text may wait for others to share its model call
+        """
+        # The scheduler imports embedding_model, which imports this module for its client
+        from models.encoding_scheduler import EncodingScheduler
+
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                os.unlink(socket_path)
+            else:
+                raise OSError(f"An embedding server is already listening on {socket_path}")
+            finally:
+                probe.close()
+
+        self.embedding_model = embedding_model
+        self.scheduler = EncodingScheduler(embedding_model, max_batch_size, max_wait_ms)
+        self.dimension = int(np.asarray(embedding_model.encode_text('')).shape[-1])
+        super().__init__(socket_path, _EncodeHandler)
+        # Only the user running the server may connect
+        os.chmod(socket_path, 0o600)
+
+    def encode(self, model_name: str, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts for a client
+
+        :param model_name: Model the client expects
+        :param texts: Input texts
+        :return: 2-D little-endian float32 array with one embedding per text
+        """
+        if model_name != self.embedding_model.model_name:
+            raise EmbeddingServerError(f"Server runs {self.embedding_model.model_name}, not {model_name}")
+        futures = [self.scheduler.submit(text) for text in texts]
+        if not futures:
+            return np.empty((0, self.dimension), dtype='<f4')
+        return np.ascontiguousarray(np.vstack([future.result() for future in futures]), dtype='<f4')
+
+    def server_close(self):
+        super().server_close()
+        self.scheduler.close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def main():
+    from models.embedding_model import EmbeddingModel
+    from utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="Keep an embedding model resident and serve it over a Unix socket")
+    parser.add_argument('--model', default=Config.EMBEDDING_MODEL, help="Embedding model to serve")
+    parser.add_argument('--socket', default=Config.EMBEDDING_SOCKET, help="Path of the Unix socket")
+    args = parser.parse_args()
+
+    if not args.socket:
+        parser.error("no socket path (set EMBEDDING_SOCKET or pass --socket)")
+    setup_logging()
+    os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+
+    server = EmbeddingServer(EmbeddingModel(args.model, socket_path=None), args.socket)
+    logger.info(f"Serving {args.model} ({server.dimension} dimensions) on {args.socket}")
+    # Remove the socket on a plain kill too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import os
+import glob
+import hashlib
+import logging
+import sqlite3
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from config import Config
+from utils.logger import metrics
+
+logger = logging.getLogger('job_screening_system.embedding_store')
+
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+
+# Embedding tables per entity kind, with the column holding the entity ID.
+# The dtype and dimension of each model version live in embedding_models.
+EMBEDDING_TABLES = {
+    'candidate': ('candidate_embeddings', 'candidate_id'),
+    'job': ('job_embeddings', 'job_id')
+}
+
+# Rows fetched per round trip by the bulk loader
+LOAD_CHUNK_ROWS = 4096
+
+# IDs per lookup query, below SQLite's bound parameter limit
+LOOKUP_CHUNK_IDS = 500
+
+
+class EmbeddingMatrix(NamedTuple):
+    """Vectors of one model version packed into contiguous arrays"""
+    ids: np.ndarray
+    vectors: np.ndarray
+    scales: Optional[np.ndarray]
+    model_version: str
+
+    def to_float32(self) -> np.ndarray:
+        """
+        Dequantize the vectors
+
+        :return: 2-D float32 array
+        """
+        return dequantize(self.vectors, self.scales)
+
+
+def quantize(vectors: np.ndarray, dtype: str = 'float32'):
+    """
+    Convert embeddings to their storage dtype
+
+    int8 uses symmetric per-vector scaling: each row is divided by
+    ``max(|x|) / 127`` and the scale is stored next to it.
+
+    :param vectors: 2-D array of embeddings
+    :param dtype: One of ``EMBEDDING_DTYPES``
+    :return: Tuple of (converted vectors, per-row scales or None)
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype '{dtype}', expected one of {EMBEDDING_DTYPES}")
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype != 'int8':
+        return np.ascontiguousarray(vectors, dtype=dtype), None
+
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def dequantize(vectors: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert stored embeddings back to float32
+
+    :param vectors: 2-D array in storage dtype
+    :param scales: Per-row int8 scales
+    :return: 2-D float32 array
+    """
+    if scales is None:
+        return vectors.astype(np.float32, copy=False)
+    return vectors.astype(np.float32) * scales[:, None]
+
+
+def save_embeddings(conn: sqlite3.Connection, kind: str, ids: Iterable[int], vectors: np.ndarray,
+                    model_version: str, dtype: str = 'float32'):
+    """
+    Store embeddings as BLOBs, replacing earlier vectors of the same model version (caller commits)
+
+    :param conn: Database connection
+    :param kind: 'candidate' or 'job'
+    :param ids: Entity IDs, one per vector
+    :param vectors: 2-D array of embeddings
+    :param model_version: Model/version tag the vectors were produced with
+    :param dtype: Storage dtype, one of ``EMBEDDING_DTYPES``
+    """
+    table, id_column = EMBEDDING_TABLES[kind]
+    stored, scales = quantize(vectors, dtype)
+
+    layout = get_layout(conn, kind, model_version)
+    if layout is None:
+        conn.execute(
+            "INSERT INTO embedding_models (kind, model_version, dtype, dim) VALUES (?, ?, ?, ?)",
+            (kind, model_version, dtype, stored.shape[1])
+        )
+    elif layout != (dtype, stored.shape[1]):
+        raise ValueError(f"'{model_version}' {kind} embeddings are stored as {layout}, "
+                         f"not ({dtype!r}, {stored.shape[1]})")
+
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table} ({id_column}, model_version, scale, vector) VALUES (?, ?, ?, ?)",
+        (
+            (int(entity_id), model_version, None if scales is None else float(scales[row]), stored[row].tobytes())
+            for row, entity_id in enumerate(ids)
+        )
+    )
+    _bump_revision(conn, kind, model_version)
+
+
+def _bump_revision(conn: sqlite3.Connection, kind: str, model_version: str):
+    """Mark a model version's vectors as changed, so earlier snapshots of them are no longer used"""
+    # Random rather than a counter: a version that is dropped and rebuilt never reuses a revision
+    conn.execute(
+        "UPDATE embedding_models SET revision = ? WHERE kind = ? AND model_version = ?",
+        (os.urandom(8).hex(), kind, model_version)
+    )
+
+
+def copy_canonical_embeddings(conn: sqlite3.Connection, model_version: str, min_id: int = 0) -> int:
+    """
+    Give near-duplicate candidates the stored vector of their canonical candidate (caller commits)
+
+    :param conn: Database connection
+    :param model_version: Model/version tag to copy
+    :param min_id: Only fill candidates with a larger ID
+    :return: Number of vectors copied
+    """
+    table, id_column = EMBEDDING_TABLES['candidate']
+    copied = conn.execute(
+        f'''
+        INSERT OR IGNORE INTO {table} ({id_column}, model_version, scale, vector)
+        SELECT c.id, e.model_version, e.scale, e.vector FROM candidates c
+        JOIN {table} e ON e.{id_column} = c.canonical_candidate_id AND e.model_version = ?
+        WHERE c.id > ? AND c.canonical_candidate_id IS NOT NULL
+        ''',
+        (model_version, min_id)
+    ).rowcount
+    if copied:
+        _bump_revision(conn, 'candidate', model_version)
+    return copied
+
+
+def get_layout(conn: sqlite3.Connection, kind: str, model_version: str) -> Optional[tuple]:
+    """
+    Look up how a model version's embeddings are stored
+
+    :param conn: Database connection
+    :param kind: 'candidate' or 'job'
+    :param model_version: Model/version tag
+    :return: Tuple of (dtype, dimension), or None if nothing was stored yet
+    """
+    row = conn.execute(
+        "SELECT dtype, dim FROM embedding_models WHERE kind = ? AND model_version = ?",
+        (kind, model_version)
+    ).fetchone()
+    return None if row is None else (row[0], row[1])
+
+
+def _snapshot_prefix(conn: sqlite3.Connection, kind: str, model_version: str, snapshot_dir: str) -> Optional[str]:
+    """Path prefix of the snapshot of a model version's current revision (None for in-memory databases)"""
+    database = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == 'main'), '')
+    row = conn.execute(
+        "SELECT revision FROM embedding_models WHERE kind = ? AND model_version = ?", (kind, model_version)
+    ).fetchone()
+    if not database or row is None or row[0] is None:
+        return None
+    database = hashlib.sha1(os.path.abspath(database).encode('utf-8')).hexdigest()[:12]
+    version = hashlib.sha1(model_version.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(snapshot_dir, f'{database}.{kind}.{version}.{row[0]}')
+
+
+def _read_snapshot(prefix: str, model_version: str) -> Optional[EmbeddingMatrix]:
+    try:
+        ids = np.load(f'{prefix}.ids.npy', mmap_mode='r')
+        vectors = np.load(f'{prefix}.vectors.npy', mmap_mode='r')
+        scales = np.load(f'{prefix}.scales.npy', mmap_mode='r') if os.path.exists(f'{prefix}.scales.npy') else None
+    except (OSError, ValueError):
+        return None
+    return EmbeddingMatrix(ids, vectors, scales, model_version)
+
+
+def _write_snapshot(prefix: str, matrix: EmbeddingMatrix):
+    arrays = {'vectors': matrix.vectors, 'scales': matrix.scales, 'ids': matrix.ids}
+    try:
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        # ids go last: a snapshot without them is never read
+        for name, array in arrays.items():
+            if array is None:
+                continue
+            tmp_path = f'{prefix}.{name}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, f'{prefix}.{name}.npy')
+        # Snapshots of earlier revisions of the same vectors
+        for stale in glob.glob(f"{glob.escape(prefix.rsplit('.', 1)[0])}.*.npy"):
+            if not stale.startswith(f'{prefix}.'):
+                os.remove(stale)
+    except OSError as e:
+        logger.warning(f"Could not write embedding snapshot {prefix}: {e}")
+
+
+@metrics.timer('load_embeddings')
+def load_embeddings(conn: sqlite3.Connection, kind: str, model_version: str, min_id: int = 0) -> EmbeddingMatrix:
+    """
+    Bulk load every vector of a model version into one contiguous array
+
+    A full load is served from a memory-mapped snapshot in
+    ``EMBEDDING_SNAPSHOT_DIR`` when one exists for the version's current
+    revision, which takes milliseconds. Otherwise, and for incremental loads
+    (``min_id``), rows are fetched in chunks whose BLOBs are joined and viewed
+    with ``np.frombuffer``, so no per-row array or tuple outlives its chunk;
+    a full load then writes the snapshot for the next one.
+
+    :param conn: Database connection
+    :param kind: 'candidate' or 'job'
+    :param model_version: Model/version tag to load
+    :param min_id: Only load entities with a larger ID
+    :return: Vectors in storage dtype, sorted by ID (read-only when memory-mapped)
+    """
+    layout = get_layout(conn, kind, model_version)
+    if layout is None:
+        return EmbeddingMatrix(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), None, model_version)
+
+    # The revision is read before the rows, so a snapshot never claims a newer revision than its contents
+    prefix = _snapshot_prefix(conn, kind, model_version, Config.EMBEDDING_SNAPSHOT_DIR) \
+        if min_id == 0 and Config.EMBEDDING_SNAPSHOT_DIR else None
+    if prefix is not None:
+        matrix = _read_snapshot(prefix, model_version)
+        if matrix is not None:
+            metrics.increment('embedding_snapshot_hits')
+            return matrix
+
+    matrix = _read_rows(conn, kind, model_version, layout, min_id)
+    if prefix is not None:
+        _write_snapshot(prefix, matrix)
+    return matrix
+
+
+def _read_rows(conn: sqlite3.Connection, kind: str, model_version: str, layout: tuple, min_id: int) -> EmbeddingMatrix:
+    table, id_column = EMBEDDING_TABLES[kind]
+    # Answered from the primary key index alone, without touching the BLOBs
+    dtype, dim = layout
+    count = conn.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE model_version = ? AND {id_column} > ?",
+        (model_version, min_id)
+    ).fetchone()[0]
+    ids = np.empty(count, dtype=np.int64)
+    vectors = np.empty((count, dim), dtype=dtype)
+    scales = np.empty(count, dtype=np.float32) if dtype == 'int8' else None
+
+    cursor = conn.execute(
+        f"SELECT {id_column}, scale, vector FROM {table} WHERE model_version = ? AND {id_column} > ? "
+        f"ORDER BY {id_column}",
+        (model_version, min_id)
+    )
+    loaded = 0
+    while loaded < count:
+        rows = cursor.fetchmany(min(LOAD_CHUNK_ROWS, count - loaded))
+        if not rows:
+            break
+        chunk_ids, chunk_scales, blobs = zip(*rows)
+        end = loaded + len(rows)
+        ids[loaded:end] = chunk_ids
+        vectors[loaded:end] = np.frombuffer(b''.join(blobs), dtype=dtype).reshape(len(rows), dim)
+        if scales is not None:
+            scales[loaded:end] = chunk_scales
+        loaded = end
+
+    # Rows written after the count are picked up by the next load
+    return EmbeddingMatrix(ids[:loaded], vectors[:loaded], None if scales is None else scales[:loaded], model_version)
+
+
+def fetch_embeddings(conn: sqlite3.Connection, kind: str, model_version: str, ids: Iterable[int]) -> np.ndarray:
+    """
+    Look up the float32 vectors of specific entities, e.g. to re-rank a quantized shortlist
+
+    :param conn: Database connection
+    :param kind: 'candidate' or 'job'
+    :param model_version: Model/version tag to read
+    :param ids: Entity IDs
+    :return: 2-D float32 array aligned with ``ids`` (zero rows for IDs without a vector)
+    """
+    table, id_column = EMBEDDING_TABLES[kind]
+    ids = np.fromiter(ids, dtype=np.int64)
+    layout = get_layout(conn, kind, model_version)
+    if layout is None:
+        raise LookupError(f"No {kind} embeddings stored for '{model_version}'")
+
+    dtype, dim = layout
+    vectors = np.zeros((len(ids), dim), dtype=np.float32)
+    rows_by_id = {int(entity_id): row for row, entity_id in enumerate(ids)}
+    for start in range(0, len(ids), LOOKUP_CHUNK_IDS):
+        chunk = ids[start:start + LOOKUP_CHUNK_IDS].tolist()
+        for entity_id, scale, blob in conn.execute(
+            f"SELECT {id_column}, scale, vector FROM {table} "
+            f"WHERE model_version = ? AND {id_column} IN ({','.join('?' * len(chunk))})",
+            [model_version] + chunk
+        ):
+            vector = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+            vectors[rows_by_id[entity_id]] = vector if scale is None else vector * scale
+    return vectors
@@ -0,0 +1,295 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import sqlite3
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from models.embedding_store import EMBEDDING_TABLES, save_embeddings, copy_canonical_embeddings, get_layout
+from models.vector_index import profile_text, job_text
+from utils.logger import metrics
+
+logger = logging.getLogger('job_screening_system.embedding_versions')
+
+# Lifecycle of a model version: embedded in the background, complete, then served
+BUILDING = 'building'
+READY = 'ready'
+ACTIVE = 'active'
+
+# Rows to embed per entity kind; both take the model version, a minimum ID and a limit
+_MISSING_QUERIES = {
+    'candidate': '''
+        SELECT c.id, c.skills, c.experience, c.education FROM candidates c
+        LEFT JOIN candidate_embeddings e ON e.candidate_id = c.id AND e.model_version = ?
+        WHERE c.id > ? AND e.candidate_id IS NULL AND c.canonical_candidate_id IS NULL ORDER BY c.id LIMIT ?
+    ''',
+    'job': '''
+        SELECT j.id, j.title, j.summary, j.required_skills, j.raw_jd FROM job_descriptions j
+        LEFT JOIN job_embeddings e ON e.job_id = j.id AND e.model_version = ?
+        WHERE j.id > ? AND e.job_id IS NULL ORDER BY j.id LIMIT ?
+    '''
+}
+
+_TEXT_BUILDERS: Dict[str, Callable[..., str]] = {'candidate': profile_text, 'job': job_text}
+
+# Progress column of each entity kind in embedding_versions
+_PROGRESS_COLUMNS = {'candidate': 'candidates_embedded', 'job': 'jobs_embedded'}
+
+
+def active_model_version(conn: sqlite3.Connection, default: Optional[str] = None) -> str:
+    """
+    Model version whose embeddings are served
+
+    :param conn: Database connection
+    :param default: Version used while none was activated (``EMBEDDING_MODEL`` if omitted)
+    :return: Model version
+    """
+    row = conn.execute("SELECT model_version FROM embedding_versions WHERE status = ?", (ACTIVE,)).fetchone()
+    return row[0] if row else default or Config.EMBEDDING_MODEL
+
+
+def list_model_versions(conn: sqlite3.Connection) -> List[Dict]:
+    """
+    Every registered model version with its status and progress
+
+    :param conn: Database connection
+    :return: One dict per version, oldest first
+    """
+    cursor = conn.execute('''
+        SELECT model_version, status, candidates_embedded, jobs_embedded, started_at, completed_at, activated_at
+        FROM embedding_versions ORDER BY started_at, model_version
+    ''')
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def register_served_version(conn: sqlite3.Connection, model_version: str) -> bool:
+    """
+    Record the version a serving process uses while none was activated as the active one
+
+    Otherwise only the process knows which version it serves, and activating
+    another version from elsewhere could not keep it ready for a rollback.
+    Its readers keep it completely embedded, as for any active version.
+
+    :param conn: Database connection
+    :param model_version: Version being served
+    :return: True if it was registered, False if a version is already active
+    """
+    try:
+        registered = conn.execute(
+            "INSERT INTO embedding_versions (model_version, status, completed_at, activated_at) "
+            "SELECT ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+            "WHERE NOT EXISTS (SELECT 1 FROM embedding_versions WHERE status = ?) "
+            "ON CONFLICT (model_version) DO UPDATE SET status = excluded.status, "
+            "completed_at = COALESCE(completed_at, excluded.completed_at), activated_at = excluded.activated_at",
+            (model_version, ACTIVE, ACTIVE)
+        ).rowcount > 0
+        conn.commit()
+    except sqlite3.IntegrityError:
+        # Another process registered or activated a version first
+        conn.rollback()
+        return False
+    if registered:
+        logger.info(f"Registered served embedding model version {model_version} as active")
+    return registered
+
+
+def activate_model_version(conn: sqlite3.Connection, model_version: str, current: Optional[str] = None) -> bool:
+    """
+    Switch the served embeddings to another model version in one transaction
+
+    The previously active version stays ready, so switching back is just as
+    quick. A version that was served without being activated (see
+    ``register_served_version``) is registered as ready on the way out.
+
+    :param conn: Database connection
+    :param model_version: Completely embedded version to serve
+    :param current: Version being served while none was activated (``EMBEDDING_MODEL`` if omitted)
+    :return: True if the active version changed
+    :raises ValueError: If the version has not finished embedding
+    """
+    row = conn.execute("SELECT status FROM embedding_versions WHERE model_version = ?", (model_version,)).fetchone()
+    if row is None or row[0] == BUILDING:
+        raise ValueError(f"'{model_version}' is not completely embedded yet; "
+                         f"run python -m models.embedding_versions --model {model_version}")
+    if row[0] == ACTIVE:
+        return False
+
+    previous = active_model_version(conn, current)
+    try:
+        if get_layout(conn, 'candidate', previous) is not None:
+            conn.execute(
+                "INSERT OR IGNORE INTO embedding_versions "
+                "(model_version, status, candidates_embedded, jobs_embedded, completed_at) VALUES (?, ?, "
+                "(SELECT COUNT(*) FROM candidate_embeddings WHERE model_version = ?), "
+                "(SELECT COUNT(*) FROM job_embeddings WHERE model_version = ?), CURRENT_TIMESTAMP)",
+                (previous, READY, previous, previous)
+            )
+        conn.execute("UPDATE embedding_versions SET status = ? WHERE status = ?", (READY, ACTIVE))
+        conn.execute(
+            "UPDATE embedding_versions SET status = ?, activated_at = CURRENT_TIMESTAMP WHERE model_version = ?",
+            (ACTIVE, model_version)
+        )
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    logger.info(f"Activated embedding model version {model_version} (was {previous})")
+    return True
+
+
+def drop_model_version(conn: sqlite3.Connection, model_version: str) -> int:
+    """
+    Delete the stored embeddings of a version that is not served
+
+    :param conn: Database connection
+    :param model_version: Version to delete
+    :return: Number of vectors deleted
+    :raises ValueError: If the version is the active one
+    """
+    if model_version == active_model_version(conn):
+        raise ValueError(f"'{model_version}' is the active embedding model version")
+    deleted = 0
+    for table, _ in EMBEDDING_TABLES.values():
+        deleted += conn.execute(f"DELETE FROM {table} WHERE model_version = ?", (model_version,)).rowcount
+    conn.execute("DELETE FROM embedding_models WHERE model_version = ?", (model_version,))
+    conn.execute("DELETE FROM embedding_versions WHERE model_version = ?", (model_version,))
+    conn.commit()
+    return deleted
+
+
+class ReembedJob:
+    def __init__(self, conn: sqlite3.Connection, embedding_model, batch_size: int = Config.REEMBED_BATCH_SIZE,
+                 rate: float = Config.REEMBED_RATE):
+        """
+        Embed every candidate and job description under a new model version, next to the served one
+
+        Each batch is embedded and committed together with the version's
+        progress, so the job can be stopped at any time and a rerun carries on
+        with the rows that still have no vector. Readers keep using the active
+        version until the new one is activated.
+
+        :param conn: Database connection
+        :param embedding_model: ``EmbeddingModel`` of the new version (its name is the version tag)
+        :param batch_size: Texts embedded and committed together
+        :param rate: Texts per second at most, to leave the database and CPU to the serving processes
+            (0 does not throttle)
+        """
+        self.conn = conn
+        self.embedding_model = embedding_model
+        self.model_version = embedding_model.model_name
+        self.batch_size = batch_size
+        self.rate = rate
+
+    def _register(self):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO embedding_versions (model_version, status) VALUES (?, ?)",
+            (self.model_version, BUILDING)
+        )
+        self.conn.commit()
+
+    def _embed(self, kind: str) -> int:
+        """Embed rows of one kind without a vector of this version, a batch per transaction"""
+        embedded = last_id = 0
+        while True:
+            rows = self.conn.execute(_MISSING_QUERIES[kind], (self.model_version, last_id, self.batch_size)).fetchall()
+            if not rows:
+                return embedded
+            start = time.monotonic()
+            with metrics.timer('reembed_batch', items=len(rows)):
+                vectors = self.embedding_model.encode_batch([_TEXT_BUILDERS[kind](*row[1:]) for row in rows])
+                save_embeddings(self.conn, kind, [row[0] for row in rows], vectors,
+                                self.model_version, Config.EMBEDDING_DTYPE)
+                self._progress(kind, len(rows))
+                self.conn.commit()
+            embedded += len(rows)
+            last_id = rows[-1][0]
+            logger.info(f"Re-embedded {embedded} {kind}s under {self.model_version}")
+            if self.rate > 0:
+                time.sleep(max(0.0, len(rows) / self.rate - (time.monotonic() - start)))
+
+    def _progress(self, kind: str, count: int):
+        column = _PROGRESS_COLUMNS[kind]
+        self.conn.execute(
+            f"UPDATE embedding_versions SET {column} = {column} + ? WHERE model_version = ?",
+            (count, self.model_version)
+        )
+
+    def run(self, activate: bool = False) -> Dict[str, int]:
+        """
+        Embed everything still missing, then mark the version ready
+
+        Rows added while the job runs are picked up as it goes; rows added
+        after it finished are embedded by the readers once the version is
+        active, as for any new row.
+
+        :param activate: Switch to the new version once it is complete
+        :return: Number of vectors stored per entity kind in this run
+        """
+        self._register()
+        done = {'candidate': self._embed('candidate')}
+        # Near-duplicates share the vector of their canonical candidate
+        copied = copy_canonical_embeddings(self.conn, self.model_version)
+        self._progress('candidate', copied)
+        self.conn.commit()
+        done['candidate'] += copied
+        done['job'] = self._embed('job')
+
+        self.conn.execute(
+            "UPDATE embedding_versions SET status = ?, completed_at = CURRENT_TIMESTAMP "
+            "WHERE model_version = ? AND status = ?",
+            (READY, self.model_version, BUILDING)
+        )
+        self.conn.commit()
+        logger.info(f"{self.model_version} is completely embedded ({done['candidate']} candidate and "
+                    f"{done['job']} job vectors stored in this run)")
+        if activate:
+            activate_model_version(self.conn, self.model_version)
+        return done
+
+
+def main():
+    from models.embedding_model import EmbeddingModel
+    from utils.database_manager import DatabaseManager
+    from utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="Re-embed candidates and jobs under a new model version and "
+                                                 "switch the served version")
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help="Screening database")
+    parser.add_argument('--model', help="Model version to embed everything with (resumes an interrupted run)")
+    parser.add_argument('--batch-size', type=int, default=Config.REEMBED_BATCH_SIZE)
+    parser.add_argument('--rate', type=float, default=Config.REEMBED_RATE,
+                        help="Texts per second at most (0 does not throttle)")
+    parser.add_argument('--activate', action='store_true',
+                        help="Serve --model once it is completely embedded, or right away if it already is")
+    parser.add_argument('--drop', metavar='MODEL', help="Delete the embeddings of a version that is not served")
+    args = parser.parse_args()
+
+    setup_logging()
+    # Opening through DatabaseManager upgrades older databases to the current schema
+    db = DatabaseManager(args.db)
+    try:
+        if args.drop and args.drop == active_model_version(db.conn):
+            parser.error(f"{args.drop} is the active embedding model version; activate another one first")
+        if args.drop:
+            print(f"Deleted {drop_model_version(db.conn, args.drop)} vectors of {args.drop}")
+        if args.model:
+            # The active version is kept complete by its readers; any other is (re-)run to pick up new rows
+            if args.model != active_model_version(db.conn):
+                # A background job: yield the CPU to the serving processes
+                if hasattr(os, 'nice'):
+                    os.nice(10)
+                ReembedJob(db.conn, EmbeddingModel(args.model), args.batch_size, args.rate).run(args.activate)
+        print(f"Active: {active_model_version(db.conn)}")
+        for row in list_model_versions(db.conn):
+            print(f"{row['model_version']}: {row['status']}, {row['candidates_embedded']} candidates, "
+                  f"{row['jobs_embedded']} jobs embedded")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
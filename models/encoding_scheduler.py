@@ -0,0 +1,154 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+
+from models.embedding_model import EmbeddingModel
+from utils.logger import metrics
+
+_STOP = object()
+
+
+class EncodingScheduler:
+    def __init__(self, embedding_model: EmbeddingModel, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Micro-batch single-text encode requests from many threads into one model call
+
+        A background thread collects queued texts until ``max_batch_size`` is
+        reached or ``max_wait_ms`` has passed since the first one arrived, then
+        encodes them together and hands each caller its own vector. Threads use
+        ``encode_text``, asyncio tasks ``encode_text_async``. The scheduler
+        exposes the same methods as ``EmbeddingModel`` so it can be passed to
+        the agents, the taxonomy or the serving app in its place.
+
+        :param embedding_model: Model used for the batched encodes
+        :param max_batch_size: Flush once this many texts are queued
+        :param max_wait_ms: Flush at the latest this long after the first queued text
+        """
+        self.embedding_model = embedding_model
+        self.model_name = embedding_model.model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        # Guards _closed, so nothing is queued behind the stop marker
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='encoding-scheduler', daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for encoding
+
+        :param text: Input text
+        :return: Future resolving to the embedding vector
+        :raises RuntimeError: If the scheduler was closed
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Encoding scheduler is closed")
+            self._queue.put((text, future))
+        return future
+
+    def encode_text(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Encode one text through the shared batch, blocking until its vector is ready
+
+        :param text: Input text
+        :param timeout: Seconds to wait before giving up
+        :return: Embedding vector
+        """
+        return self.submit(text).result(timeout)
+
+    async def encode_text_async(self, text: str) -> np.ndarray:
+        """
+        Encode one text through the shared batch without blocking the event loop
+
+        :param text: Input text
+        :return: Embedding vector
+        """
+        return await asyncio.wrap_future(self.submit(text))
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Callers that already hold a batch go straight to the model"""
+        return self.embedding_model.encode_batch(texts, batch_size)
+
+    def calculate_similarity(self, text1: str, text2: str) -> float:
+        """
+        Calculate cosine similarity between two texts, encoding both in the shared batch
+
+        :param text1: First text
+        :param text2: Second text
+        :return: Similarity score
+        """
+        future1, future2 = self.submit(text1), self.submit(text2)
+        embedding1, embedding2 = future1.result(), future2.result()
+        norm = np.linalg.norm(embedding1) * np.linalg.norm(embedding2)
+        return float(np.dot(embedding1, embedding2) / norm) if norm else 0.0
+
+    def _collect(self, first) -> tuple:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        stop = False
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch, stop = self._collect(item)
+            # Callers that gave up (cancelled futures) don't need encoding
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._flush(batch)
+
+            if stop:
+                return
+
+    def _flush(self, batch: list):
+        metrics.increment('encoding_batches')
+        metrics.increment('encoding_batched_texts', len(batch))
+        try:
+            with metrics.timer('encoding_scheduler_flush', items=len(batch)):
+                vectors = self.embedding_model.encode_batch([text for text, _ in batch], len(batch))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def close(self):
+        """Flush pending requests and stop the background thread; later ``submit`` calls raise"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join()
+        # Nothing should be left, but a waiting caller must never hang
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("Encoding scheduler is closed"))
\ No newline at end of file
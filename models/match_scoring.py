@@ -0,0 +1,330 @@
+import re
+import sqlite3
+import datetime
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from models.embedding_model import EmbeddingModel
+from models.embedding_store import (EMBEDDING_TABLES, save_embeddings, load_embeddings, fetch_embeddings,
+                                    copy_canonical_embeddings)
+from models.vector_index import profile_text, job_text
+from utils.logger import metrics
+
+# Feature columns of the candidate matrix, in order
+FEATURES = ('embedding', 'skills', 'experience', 'education')
+
+# Fit given to a candidate whose years of experience could not be read from the resume
+UNKNOWN_EXPERIENCE_FIT = 0.5
+
+# Education levels, highest first; a text's level is the highest one it mentions
+EDUCATION_LEVELS = (
+    (4, re.compile(r'\b(?:ph\.?\s?d|doctorate|doctoral|doctor of)\b', re.IGNORECASE)),
+    (3, re.compile(r"\b(?:master'?s?|msc|m\.sc|mba|meng|m\.eng|mphil)\b", re.IGNORECASE)),
+    (2, re.compile(r"\b(?:bachelor'?s?|bsc|b\.sc|beng|b\.eng|btech|b\.tech|b\.?a|b\.?s|undergraduate)\b",
+                   re.IGNORECASE)),
+    (1, re.compile(r'\b(?:associate|diploma|hnd|certificate)\b', re.IGNORECASE)),
+)
+
+# Fit lost per education level below the required one
+EDUCATION_STEP = 0.5
+
+_YEAR_SPAN = re.compile(r'\b((?:19|20)\d{2})\s*(?:-|\u2013|to)\s*((?:19|20)\d{2}|present|current|now)\b', re.IGNORECASE)
+_YEARS_REQUIRED = re.compile(r'(\d+(?:\.\d+)?)\s*\+?\s*(?:-\s*\d+\s*)?(?:years?|yrs?)', re.IGNORECASE)
+
+# Minimum years implied by a seniority word, when the level gives no number
+SENIORITY_YEARS = (
+    ('principal', 10), ('staff', 8), ('lead', 7), ('senior', 5), ('mid', 3),
+    ('junior', 1), ('entry', 0), ('graduate', 0), ('intern', 0)
+)
+
+
+class ScoringWeights(NamedTuple):
+    """Weight of each feature column in the combined match score"""
+    embedding: float = Config.MATCH_WEIGHT_EMBEDDING
+    skills: float = Config.MATCH_WEIGHT_SKILLS
+    experience: float = Config.MATCH_WEIGHT_EXPERIENCE
+    education: float = Config.MATCH_WEIGHT_EDUCATION
+
+    def as_array(self) -> np.ndarray:
+        """
+        Weights as a column vector that sums to one, so scores stay in [0, 1]
+
+        :return: float32 array aligned with ``FEATURES``
+        """
+        weights = np.asarray(self, dtype=np.float32)
+        if (weights < 0).any() or not weights.sum():
+            raise ValueError(f"Match weights must be non-negative and not all zero, got {self}")
+        return weights / weights.sum()
+
+
+class JobRequirements(NamedTuple):
+    """What a job asks for, in the units of the candidate feature columns"""
+    job_id: int
+    vector: np.ndarray
+    skill_ids: np.ndarray
+    min_years: float
+    education: int
+
+
+def education_level(text: str) -> int:
+    """
+    Highest education level mentioned in a text
+
+    :param text: Education entries or job description text
+    :return: 0 (none found), 1 (associate/diploma), 2 (bachelor), 3 (master) or 4 (doctorate)
+    """
+    for level, pattern in EDUCATION_LEVELS:
+        if text and pattern.search(text):
+            return level
+    return 0
+
+
+def experience_years(experience: str) -> float:
+    """
+    Years of experience covered by the date ranges of a candidate's experience entries
+
+    Overlapping ranges (two jobs held at once) are merged, so each year counts once.
+
+    :param experience: JSON list of experience entries
+    :return: Total years, or NaN if no entry has a date range
+    """
+    spans = _YEAR_SPAN.findall(experience or '')
+    if not spans:
+        return float('nan')
+    this_year = datetime.date.today().year
+    total = 0
+    covered_to = None
+    for start, end in sorted((int(start), this_year if end.isalpha() else int(end)) for start, end in spans):
+        if covered_to is not None and start < covered_to:
+            start = covered_to
+        if end > start:
+            total += end - start
+            covered_to = end
+    return float(total)
+
+
+def required_years(experience_level: str) -> float:
+    """
+    Minimum years of experience asked for by a job's experience level
+
+    :param experience_level: E.g. '5+ years', '3-5 years' or 'Senior'
+    :return: Minimum years (0 if the level is empty or not understood)
+    """
+    match = _YEARS_REQUIRED.search(experience_level or '')
+    if match:
+        return float(match.group(1))
+    lowered = (experience_level or '').lower()
+    for word, years in SENIORITY_YEARS:
+        if word in lowered:
+            return float(years)
+    return 0.0
+
+
+class MultiFactorScorer:
+    def __init__(self, embedding_model: EmbeddingModel, weights: Optional[ScoringWeights] = None):
+        """
+        Score every candidate against a job with a handful of array operations
+
+        Candidates are held as a feature store: unit-length profile embeddings,
+        (candidate, skill) pairs from the skills dictionary, years of
+        experience and education level. Scoring a job computes four feature
+        columns (embedding similarity, required-skill coverage, experience
+        fit and education fit) for all candidates at once and combines them
+        with one matrix-vector product.
+
+        :param embedding_model: Model used for profiles and jobs without a stored vector
+        :param weights: Feature weights (defaults to the ``MATCH_WEIGHT_*`` settings)
+        """
+        self.embedding_model = embedding_model
+        self.model_version = embedding_model.model_name
+        self.weights = weights or ScoringWeights()
+        self._weights = self.weights.as_array()
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors: Optional[np.ndarray] = None
+        self.years = np.empty(0, dtype=np.float32)
+        self.education = np.empty(0, dtype=np.int8)
+        # Candidate skills as parallel arrays of (candidate position, skill ID)
+        self.skill_owners = np.empty(0, dtype=np.int64)
+        self.skill_ids = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def max_id(self) -> int:
+        """Largest loaded candidate ID, used to load only newer rows on refresh"""
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def positions(self, wanted: Iterable[int]) -> np.ndarray:
+        """
+        Map candidate IDs to rows of the feature store, skipping unknown IDs
+
+        :param wanted: Candidate IDs
+        :return: Array of positions
+        """
+        wanted = np.fromiter(wanted, dtype=np.int64)
+        if not len(self.ids) or not len(wanted):
+            return np.empty(0, dtype=np.int64)
+        # IDs are loaded in ascending order
+        found = np.searchsorted(self.ids, wanted).clip(max=len(self.ids) - 1)
+        return found[self.ids[found] == wanted]
+
+    @metrics.timer('load_candidate_features')
+    def refresh(self, conn: sqlite3.Connection) -> int:
+        """
+        Load candidates added since the last refresh, embedding profiles that have no stored vector
+
+        Only rows with an ID above ``max_id`` are read: candidates are only
+        ever inserted, never edited in place. A candidate changed or deleted
+        directly in the database keeps its loaded features until a new
+        scorer is built.
+
+        :param conn: Database connection
+        :return: Number of candidates added
+        """
+        min_id = self.max_id
+        table, id_column = EMBEDDING_TABLES['candidate']
+        # Near-duplicates get a copy of their canonical candidate's vector instead
+        missing = conn.execute(f'''
+            SELECT c.id, c.skills, c.experience, c.education FROM candidates c
+            LEFT JOIN {table} e ON e.{id_column} = c.id AND e.model_version = ?
+            WHERE c.id > ? AND e.{id_column} IS NULL AND c.canonical_candidate_id IS NULL ORDER BY c.id
+        ''', (self.model_version, min_id)).fetchall()
+        if missing:
+            vectors = self.embedding_model.encode_batch([profile_text(*row[1:]) for row in missing])
+            save_embeddings(conn, 'candidate', [row[0] for row in missing], vectors,
+                            self.model_version, Config.EMBEDDING_DTYPE)
+        copy_canonical_embeddings(conn, self.model_version, min_id)
+        # Even a copy of no rows opened a write transaction, which would lock out other writers
+        conn.commit()
+
+        rows = conn.execute(
+            "SELECT id, experience, education FROM candidates WHERE id > ? ORDER BY id", (min_id,)
+        ).fetchall()
+        if not rows:
+            return 0
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        years = np.fromiter((experience_years(row[1]) for row in rows), dtype=np.float32, count=len(rows))
+        education = np.fromiter((education_level(row[2]) for row in rows), dtype=np.int8, count=len(rows))
+
+        stored = load_embeddings(conn, 'candidate', self.model_version, min_id)
+        if len(stored.ids):
+            dim = stored.vectors.shape[1]
+        elif self.vectors is not None:
+            dim = self.vectors.shape[1]
+        else:
+            dim = len(self.embedding_model.encode_text(''))
+        # Candidates without a vector keep a zero row and an embedding similarity of 0
+        vectors = np.zeros((len(ids), dim), dtype=np.float32)
+        found = np.isin(stored.ids, ids)
+        vectors[np.searchsorted(ids, stored.ids[found])] = stored.to_float32()[found]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        pairs = np.array(conn.execute(
+            "SELECT candidate_id, skill_id FROM candidate_skills WHERE candidate_id > ?", (min_id,)
+        ).fetchall(), dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[np.isin(pairs[:, 0], ids)]
+
+        offset = len(self.ids)
+        self.ids = np.concatenate([self.ids, ids])
+        self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+        self.years = np.concatenate([self.years, years])
+        self.education = np.concatenate([self.education, education])
+        self.skill_owners = np.concatenate([self.skill_owners, offset + np.searchsorted(ids, pairs[:, 0])])
+        self.skill_ids = np.concatenate([self.skill_ids, pairs[:, 1]])
+        return len(ids)
+
+    def job_requirements(self, conn: sqlite3.Connection, job_id: int) -> Optional[JobRequirements]:
+        """
+        Read a job's requirements, embedding its text if it has no stored vector
+
+        :param conn: Database connection
+        :param job_id: ID of the job description
+        :return: Job requirements, or None if the job does not exist
+        """
+        job = conn.execute(
+            "SELECT title, summary, required_skills, experience_level, raw_jd FROM job_descriptions WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if not job:
+            return None
+        title, summary, required_skills, experience_level, raw_jd = job
+
+        vector = None
+        try:
+            vector = fetch_embeddings(conn, 'job', self.model_version, [job_id])[0]
+        except LookupError:
+            pass
+        if vector is None or not vector.any():
+            vector = self.embedding_model.encode_batch([job_text(title, summary, required_skills, raw_jd)])
+            save_embeddings(conn, 'job', [job_id], vector, self.model_version, Config.EMBEDDING_DTYPE)
+            conn.commit()
+            vector = vector[0]
+        norm = np.linalg.norm(vector)
+
+        skill_ids = np.array(
+            [row[0] for row in conn.execute("SELECT skill_id FROM job_skills WHERE job_id = ?", (job_id,))],
+            dtype=np.int64
+        )
+        return JobRequirements(
+            job_id=job_id,
+            vector=(vector / norm if norm else vector).astype(np.float32),
+            skill_ids=skill_ids,
+            min_years=required_years(experience_level),
+            education=education_level(f"{summary or ''} {required_skills or ''} {raw_jd or ''}")
+        )
+
+    def feature_matrix(self, job: JobRequirements, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Feature columns of candidates against a job, each in [0, 1]
+
+        :param job: Job requirements
+        :param positions: Rows of the feature store to compute (all candidates if omitted)
+        :return: float32 array of shape (candidates, len(FEATURES))
+        """
+        # Scoring every candidate works on the stored arrays without copying them
+        select = (lambda column: column) if positions is None else (lambda column: column[positions])
+        matrix = np.ones((len(self.ids) if positions is None else len(positions), len(FEATURES)), dtype=np.float32)
+        if not len(matrix):
+            return matrix
+
+        matrix[:, 0] = np.clip(select(self.vectors) @ job.vector, 0, 1)
+
+        if len(job.skill_ids):
+            hits = np.bincount(self.skill_owners[np.isin(self.skill_ids, job.skill_ids)], minlength=len(self.ids))
+            matrix[:, 1] = select(hits) / len(job.skill_ids)
+
+        if job.min_years:
+            years = select(self.years)
+            matrix[:, 2] = np.where(np.isnan(years), UNKNOWN_EXPERIENCE_FIT, np.clip(years / job.min_years, 0, 1))
+
+        if job.education:
+            shortfall = job.education - select(self.education).astype(np.float32)
+            matrix[:, 3] = np.clip(1 - EDUCATION_STEP * shortfall, 0, 1)
+        return matrix
+
+    def score(self, conn: sqlite3.Connection, job_id: int,
+              candidate_ids: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Weighted match scores of candidates for a job
+
+        :param conn: Database connection
+        :param job_id: ID of the job description
+        :param candidate_ids: Only score these candidates (every candidate if omitted)
+        :return: Tuple of (candidate IDs, scores, feature matrix), aligned
+        """
+        self.refresh(conn)
+        job = self.job_requirements(conn, job_id)
+
+        positions = None if candidate_ids is None else self.positions(candidate_ids)
+        ids = self.ids if positions is None else self.ids[positions]
+        if job is None:
+            return ids, np.zeros(len(ids), dtype=np.float32), np.zeros((len(ids), len(FEATURES)), dtype=np.float32)
+
+        with metrics.timer('multi_factor_scoring', items=len(ids)):
+            matrix = self.feature_matrix(job, positions)
+            return ids, matrix @ self._weights, matrix
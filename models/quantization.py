@@ -0,0 +1,387 @@
+import copy
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from models.vector_index import VectorIndex
+
+# Rows scored per step, so ADC temporaries stay small for large pools
+SCORE_CHUNK_ROWS = 65536
+
+# Codebooks are retrained once the index has grown by this factor since they were trained
+RETRAIN_GROWTH = 2.0
+
+# Vectors product quantization codebooks are trained on by default
+PQ_TRAINING_SAMPLE = 10000
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class ScalarQuantizer:
+    def __init__(self):
+        """
+        int8 scalar quantization with a per-vector scale
+
+        Each code row holds ``dim`` int8 values followed by the float32 scale,
+        so a 384-d vector takes 388 bytes instead of 1536.
+        """
+        self.dim: Optional[int] = None
+
+    @property
+    def trained(self) -> bool:
+        return True
+
+    @property
+    def min_training(self) -> int:
+        """Vectors needed before anything can be encoded (none: there is nothing to train)"""
+        return 0
+
+    def fit(self, vectors: np.ndarray) -> 'ScalarQuantizer':
+        """Scalar quantization needs no training; kept for a common interface"""
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Quantize vectors
+
+        :param vectors: 2-D float array
+        :return: uint8 code matrix of shape (n, dim + 4)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.dim = vectors.shape[1]
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        values = np.round(vectors / scales[:, None]).astype(np.int8)
+        return np.hstack([values.view(np.uint8), scales.astype(np.float32)[:, None].view(np.uint8)])
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Asymmetric inner products: the query stays float, only the database side is quantized
+
+        :param query: 1-D float query
+        :param codes: Code matrix from ``encode``
+        :return: Approximate inner products
+        """
+        values = codes[:, :self.dim].view(np.int8)
+        scales = np.ascontiguousarray(codes[:, self.dim:]).view(np.float32).ravel()
+        return (values.astype(np.float32) @ query) * scales
+
+
+class ProductQuantizer:
+    def __init__(self, subspaces: int = 48, centroids: int = 256, iterations: int = 10,
+                 training_sample: int = PQ_TRAINING_SAMPLE, seed: int = 0):
+        """
+        Product quantization: each vector is split into ``subspaces`` slices and
+        every slice is replaced by the index of its nearest k-means centroid
+
+        With 48 subspaces a 384-d vector takes 48 bytes.
+
+        :param subspaces: Number of slices (must divide the dimension)
+        :param centroids: Centroids per slice (at most 256, codes are uint8)
+        :param iterations: k-means iterations
+        :param training_sample: Vectors used to train the codebooks; an index holds this many
+            before it trains them
+        :param seed: Random seed for sampling and initialisation
+        """
+        if not 1 <= centroids <= 256:
+            raise ValueError("Product quantization supports at most 256 centroids per subspace")
+        self.subspaces = subspaces
+        self.centroids = centroids
+        self.iterations = iterations
+        self.training_sample = training_sample
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def min_training(self) -> int:
+        """Vectors needed to train codebooks that represent the data"""
+        return self.training_sample
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        n, dim = vectors.shape
+        if dim % self.subspaces:
+            raise ValueError(f"Dimension {dim} is not divisible into {self.subspaces} subspaces")
+        return vectors.reshape(n, self.subspaces, dim // self.subspaces)
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (centers ** 2).sum(axis=1) - 2 * points @ centers.T
+        return distances.argmin(axis=1)
+
+    def fit(self, vectors: np.ndarray) -> 'ProductQuantizer':
+        """
+        Train one k-means codebook per subspace
+
+        :param vectors: 2-D float training vectors
+        :return: The quantizer
+        """
+        rng = np.random.default_rng(self.seed)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) > self.training_sample:
+            vectors = vectors[rng.choice(len(vectors), self.training_sample, replace=False)]
+        slices = self._split(vectors)
+        k = min(self.centroids, len(vectors))
+
+        codebooks = np.zeros((self.subspaces, self.centroids, slices.shape[2]), dtype=np.float32)
+        for j in range(self.subspaces):
+            points = np.ascontiguousarray(slices[:, j])
+            centers = points[rng.choice(len(points), k, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(points, centers)
+                counts = np.bincount(assignment, minlength=k)
+                sums = np.stack([np.bincount(assignment, points[:, d], minlength=k)
+                                 for d in range(points.shape[1])], axis=1)
+                filled = counts > 0
+                centers[filled] = sums[filled] / counts[filled, None]
+            codebooks[j, :k] = centers
+            # Unused slots repeat a real centroid so no code maps to the origin
+            codebooks[j, k:] = centers[0]
+        self.codebooks = codebooks
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Quantize vectors
+
+        :param vectors: 2-D float array
+        :return: uint8 code matrix of shape (n, subspaces)
+        """
+        slices = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.empty((len(slices), self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            codes[:, j] = self._nearest(np.ascontiguousarray(slices[:, j]), self.codebooks[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Approximate the vectors behind codes by their centroids
+
+        :param codes: Code matrix from ``encode``
+        :return: 2-D float32 array
+        """
+        return np.hstack([self.codebooks[j, codes[:, j]] for j in range(self.subspaces)])
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Asymmetric distance computation: inner products of the float query with
+        every centroid go into a lookup table, then each code row sums its entries
+
+        :param query: 1-D float query
+        :param codes: Code matrix from ``encode``
+        :return: Approximate inner products
+        """
+        table = np.einsum('mkd,md->mk', self.codebooks, query.reshape(self.subspaces, -1))
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.subspaces):
+            scores += table[j, codes[:, j]]
+        return scores
+
+
+class QuantizedVectorIndex(VectorIndex):
+    def __init__(self, quantizer, rerank_vectors: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 rerank_factor: int = 10, retrain_growth: float = RETRAIN_GROWTH, seed: int = 0):
+        """
+        Cosine index over quantized candidate vectors
+
+        Only the codes are held in memory. A search scores every code with the
+        quantizer's asymmetric distance, then, if ``rerank_vectors`` is given,
+        fetches the float vectors of the best ``k * rerank_factor`` rows and
+        re-scores them exactly.
+
+        A quantizer that needs training (product quantization) is trained
+        once the index holds ``quantizer.min_training`` vectors; until then
+        the float vectors are kept and searched exactly. A uniform sample of
+        up to that many vectors is kept for retraining, which happens each
+        time the index has grown by ``retrain_growth`` since the last
+        training; existing rows are then re-encoded from ``rerank_vectors``,
+        or from their old codes without it.
+
+        :param quantizer: ``ScalarQuantizer`` or ``ProductQuantizer``
+        :param rerank_vectors: Returns float vectors for an array of row IDs, aligned with it
+        :param rerank_factor: Shortlist size for the re-rank, as a multiple of ``k``
+        :param retrain_growth: Growth factor of the index that triggers retraining
+        :param seed: Random seed for the training sample
+        """
+        super().__init__()
+        self.quantizer = quantizer
+        self.rerank_vectors = rerank_vectors
+        self.rerank_factor = rerank_factor
+        self.retrain_growth = retrain_growth
+        self.codes: Optional[np.ndarray] = None
+        self.trained_on = 0
+        self._sample: Optional[np.ndarray] = None
+        self._seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the codes, IDs, training sample and any float vectors not yet quantized"""
+        return sum(array.nbytes for array in (self.ids, self.codes, self.vectors, self._sample) if array is not None)
+
+    def _add_to_sample(self, vectors: np.ndarray):
+        """Reservoir sampling, so the training sample stays uniform over everything added"""
+        capacity = self.quantizer.min_training
+        if self._sample is None:
+            self._sample = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        free = capacity - len(self._sample)
+        if free > 0:
+            self._sample = np.vstack([self._sample, vectors[:free]])
+        rest = vectors[max(free, 0):]
+        if len(rest):
+            slots = self._rng.integers(0, self._seen + max(free, 0) + np.arange(len(rest)) + 1)
+            kept = slots < capacity
+            self._sample[slots[kept]] = rest[kept]
+        self._seen += len(vectors)
+
+    def _float_chunks(self, ids: np.ndarray, codes: Optional[np.ndarray], vectors: Optional[np.ndarray], quantizer):
+        """Float vectors of indexed rows, a chunk at a time"""
+        for start in range(0, len(ids), SCORE_CHUNK_ROWS):
+            end = start + SCORE_CHUNK_ROWS
+            if vectors is not None:
+                yield vectors[start:end]
+            elif self.rerank_vectors is not None:
+                yield _normalize(self.rerank_vectors(ids[start:end]))
+            else:
+                yield quantizer.decode(codes[start:end])
+
+    def _train(self, ids: np.ndarray, vectors: np.ndarray):
+        """Train a fresh copy of the quantizer, re-encode every row with it and swap both in"""
+        with self._lock:
+            old_ids, old_codes, old_vectors, old_quantizer = self.ids, self.codes, self.vectors, self.quantizer
+        quantizer = copy.deepcopy(old_quantizer).fit(self._sample)
+        codes = [quantizer.encode(chunk) for chunk in self._float_chunks(old_ids, old_codes, old_vectors, old_quantizer)]
+        codes.append(quantizer.encode(vectors))
+
+        with self._lock:
+            self._sorted = self._sorted and bool(np.all(np.diff(ids) > 0)) and \
+                (not len(old_ids) or ids[0] > old_ids[-1])
+            self.ids = np.concatenate([old_ids, ids])
+            self.codes = np.vstack(codes)
+            self.vectors = None
+            self.quantizer = quantizer
+        self.trained_on = len(self.ids)
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray):
+        """
+        Quantize and add vectors to the index
+
+        :param ids: Row IDs, one per vector
+        :param vectors: 2-D array of embeddings
+        """
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if not len(ids):
+            return
+
+        vectors = _normalize(vectors)
+        trainable = self.quantizer.min_training > 0
+        if trainable:
+            self._add_to_sample(vectors)
+        total = len(self.ids) + len(ids)
+
+        if trainable and self.codes is None and total < self.quantizer.min_training:
+            # Too few vectors for codebooks that represent the data: keep them as floats
+            with self._lock:
+                self._sorted = self._sorted and bool(np.all(np.diff(ids) > 0)) and \
+                    (not len(self.ids) or ids[0] > self.ids[-1])
+                self.ids = np.concatenate([self.ids, ids])
+                self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+            return
+        if trainable and (self.codes is None or total >= self.trained_on * self.retrain_growth):
+            self._train(ids, vectors)
+            return
+
+        codes = self.quantizer.encode(vectors)
+        with self._lock:
+            self._sorted = self._sorted and bool(np.all(np.diff(ids) > 0)) and \
+                (not len(self.ids) or ids[0] > self.ids[-1])
+            self.ids = np.concatenate([self.ids, ids])
+            self.codes = codes if self.codes is None else np.vstack([self.codes, codes])
+
+    def approximate_scores(self, query: np.ndarray, codes: np.ndarray, quantizer=None) -> np.ndarray:
+        """
+        Score codes against a normalized query in bounded-size chunks
+
+        :param query: 1-D normalized float query
+        :param codes: Code matrix
+        :param quantizer: Quantizer the codes were made with (the current one if omitted)
+        :return: Approximate cosine scores
+        """
+        quantizer = quantizer or self.quantizer
+        return np.concatenate([
+            quantizer.scores(query, codes[start:start + SCORE_CHUNK_ROWS])
+            for start in range(0, len(codes), SCORE_CHUNK_ROWS)
+        ]) if len(codes) else np.empty(0, dtype=np.float32)
+
+    def search(self, query_vector: np.ndarray, k: int = 10,
+               restrict_to: Optional[Iterable[int]] = None, rerank: bool = True) -> List[Tuple[int, float]]:
+        """
+        Return the ``k`` most similar rows
+
+        :param query_vector: Query embedding
+        :param k: Number of results
+        :param restrict_to: Only score these row IDs
+        :param rerank: Re-score the shortlist with float vectors when a source is configured
+        :return: List of ``(id, score)`` sorted best first
+        """
+        with self._lock:
+            ids, codes, vectors, quantizer = self.ids, self.codes, self.vectors, self.quantizer
+        if (codes is None and vectors is None) or not len(ids):
+            return []
+
+        if restrict_to is not None:
+            rows = self.positions(restrict_to, ids)
+            ids = ids[rows]
+            codes = None if codes is None else codes[rows]
+            vectors = None if vectors is None else vectors[rows]
+            if not len(ids):
+                return []
+
+        query = _normalize(query_vector)
+        if codes is None:
+            # Not trained yet: the float vectors give exact scores
+            scores = vectors @ query
+            rerank = False
+        else:
+            scores = self.approximate_scores(query, codes, quantizer)
+            rerank = rerank and self.rerank_vectors is not None
+
+        shortlist = min(k * self.rerank_factor if rerank else k, len(scores))
+        top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        if rerank:
+            ids = ids[top]
+            scores = _normalize(self.rerank_vectors(ids)) @ query
+            top = np.arange(len(ids))
+
+        top = top[np.argsort(-scores[top])][:k]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+def make_vector_index(method: str = 'none', rerank_vectors: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                      rerank_factor: int = 10, pq_subspaces: int = 48,
+                      pq_training_sample: int = PQ_TRAINING_SAMPLE) -> VectorIndex:
+    """
+    Build a candidate vector index for a quantization setting
+
+    :param method: 'none' (exact float32), 'int8' or 'pq'
+    :param rerank_vectors: Float vector source for the re-rank stage of quantized indexes
+    :param rerank_factor: Shortlist size for the re-rank, as a multiple of ``k``
+    :param pq_subspaces: Subspaces for product quantization
+    :param pq_training_sample: Vectors the index holds, and trains on, before it is product quantized
+    :return: Vector index
+    """
+    if method == 'none':
+        return VectorIndex()
+    if method == 'int8':
+        return QuantizedVectorIndex(ScalarQuantizer(), rerank_vectors, rerank_factor)
+    if method == 'pq':
+        return QuantizedVectorIndex(ProductQuantizer(pq_subspaces, training_sample=pq_training_sample),
+                                    rerank_vectors, rerank_factor)
+    raise ValueError(f"Unknown vector quantization '{method}', expected 'none', 'int8' or 'pq'")
@@ -0,0 +1,132 @@
+import json
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def profile_text(skills: str, experience: str, education: str) -> str:
+    """
+    Build the text embedded for a candidate from the JSON columns of the candidates table
+
+    :param skills: JSON list of skills
+    :param experience: JSON list of experience entries
+    :param education: JSON list of education entries
+    :return: Flattened profile text
+    """
+    parts = []
+    for column in (skills, experience, education):
+        try:
+            values = json.loads(column) if column else []
+        except (TypeError, json.JSONDecodeError):
+            values = [column]
+        for value in values if isinstance(values, list) else [values]:
+            if isinstance(value, dict):
+                parts.extend(str(v) for v in value.values() if v)
+            elif value:
+                parts.append(str(value))
+    return ' '.join(parts)
+
+
+def job_text(title: str, summary: str, required_skills: str, raw_jd: str) -> str:
+    """
+    Build the text embedded for a job from the columns of the job_descriptions table
+
+    :param title: Job title
+    :param summary: Summary of the job description
+    :param required_skills: JSON list of required skills
+    :param raw_jd: Full job description
+    :return: Flattened job text
+    """
+    return f"{title} {summary} {profile_text(required_skills, None, None)} {raw_jd}"
+
+
+class VectorIndex:
+    def __init__(self):
+        """
+        In-memory exact cosine index over candidate embeddings
+
+        Vectors are L2-normalised on insert, so a search is one matrix-vector product.
+        """
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors: Optional[np.ndarray] = None
+        self._sorted = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def max_id(self) -> int:
+        """Largest indexed ID, used to add only newer rows on refresh"""
+        return int(self.ids.max()) if len(self.ids) else 0
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray):
+        """
+        Add vectors to the index
+
+        :param ids: Row IDs, one per vector
+        :param vectors: 2-D array of embeddings
+        """
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if not len(ids):
+            return
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            # IDs normally arrive in ascending order, which lets lookups use a binary search
+            self._sorted = self._sorted and bool(np.all(np.diff(ids) > 0)) and \
+                (not len(self.ids) or ids[0] > self.ids[-1])
+            self.ids = np.concatenate([self.ids, ids])
+            self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+
+    def positions(self, wanted: Iterable[int], ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Map row IDs to their positions in the index, skipping unknown IDs
+
+        :param wanted: Row IDs to look up
+        :param ids: ID array to search (defaults to the current index)
+        :return: Array of positions
+        """
+        ids = self.ids if ids is None else ids
+        wanted = np.fromiter(wanted, dtype=np.int64)
+        if not len(ids) or not len(wanted):
+            return np.empty(0, dtype=np.int64)
+
+        if self._sorted:
+            found = np.searchsorted(ids, wanted).clip(max=len(ids) - 1)
+            return found[ids[found] == wanted]
+        return np.flatnonzero(np.isin(ids, wanted))
+
+    def search(self, query_vector: np.ndarray, k: int = 10,
+               restrict_to: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Return the ``k`` most similar rows
+
+        :param query_vector: Query embedding
+        :param k: Number of results
+        :param restrict_to: Only score these row IDs
+        :return: List of ``(id, cosine score)`` sorted best first
+        """
+        with self._lock:
+            ids, vectors = self.ids, self.vectors
+        if vectors is None or not len(ids):
+            return []
+
+        if restrict_to is not None:
+            rows = self.positions(restrict_to, ids)
+            ids, vectors = ids[rows], vectors[rows]
+            if not len(ids):
+                return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        scores = vectors @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
\ No newline at end of file
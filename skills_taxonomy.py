@@ -1,40 +1,91 @@
+import json
+from functools import lru_cache
+from typing import Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from fairlearn.metrics import demographic_parity_difference
+from config import Config
+from models.embedding_model import EmbeddingModel
+from utils.skill_extractor import SkillExtractor
+
+# Hierarchical skills taxonomy
+SKILLS_HIERARCHY = {
+    'Technical Skills': {
+        'Programming Languages': ['Python', 'Java', 'JavaScript'],
+        'Frameworks': ['Django', 'React', 'Spring'],
+        'Cloud Technologies': ['AWS', 'Azure', 'GCP']
+    },
+    'Soft Skills': {
+        'Communication': ['Verbal', 'Written', 'Presentation'],
+        'Leadership': ['Team Management', 'Strategic Planning']
+    }
+}
+
+# Other spellings of taxonomy skills, found in text as the skill itself
+SKILL_SYNONYMS = {
+    'Python': ['Python3', 'Python 3'],
+    'JavaScript': ['JS', 'ECMAScript'],
+    'React': ['React.js', 'ReactJS'],
+    'Spring': ['Spring Boot', 'Spring Framework'],
+    'AWS': ['Amazon Web Services'],
+    'Azure': ['Microsoft Azure'],
+    'GCP': ['Google Cloud', 'Google Cloud Platform'],
+    'Presentation': ['Presentations', 'Public Speaking'],
+    'Team Management': ['People Management', 'Team Lead', 'Team Leadership'],
+    'Strategic Planning': ['Strategy Planning']
+}
+
+
+@lru_cache(maxsize=None)
+def load_skill_extractor(taxonomy_path: Optional[str] = Config.SKILLS_TAXONOMY_PATH) -> SkillExtractor:
+    """
+    Skill extractor for the configured taxonomy, compiled once per process
+    
+    :param taxonomy_path: JSON file with 'hierarchy' and 'synonyms' keys (the built-in taxonomy if None)
+    :return: Skill extractor
+    """
+    if taxonomy_path is None:
+        return SkillExtractor(SKILLS_HIERARCHY, SKILL_SYNONYMS)
+    with open(taxonomy_path, encoding='utf-8') as file:
+        taxonomy = json.load(file)
+    return SkillExtractor(taxonomy['hierarchy'], taxonomy.get('synonyms'))
 
 class SkillsTaxonomy:
-    def __init__(self):
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, embedding_model=None):
+        # Initialize embedding model (an EncodingScheduler can be passed to share batches)
+        self.embedding_model = embedding_model or EmbeddingModel(Config.EMBEDDING_MODEL)
         
         # Hierarchical skills taxonomy
-        self.skills_hierarchy = {
-            'Technical Skills': {
-                'Programming Languages': ['Python', 'Java', 'JavaScript'],
-                'Frameworks': ['Django', 'React', 'Spring'],
-                'Cloud Technologies': ['AWS', 'Azure', 'GCP']
-            },
-            'Soft Skills': {
-                'Communication': ['Verbal', 'Written', 'Presentation'],
-                'Leadership': ['Team Management', 'Strategic Planning']
-            }
-        }
+        self.skills_hierarchy = SKILLS_HIERARCHY
+        self.skill_synonyms = SKILL_SYNONYMS
+    
+    def extract_skills(self, text):
+        """Find taxonomy skills in text, with their normalized IDs and hierarchy paths"""
+        return load_skill_extractor().extract(text)
     
     def get_skill_embedding(self, skill):
         """Generate embedding for a skill"""
-        return self.embedding_model.encode([skill])[0]
+        return self.embedding_model.encode_text(skill)
     
     def semantic_skill_match(self, candidate_skills, job_skills):
         """Perform semantic matching of skills"""
-        candidate_embeddings = [self.get_skill_embedding(skill) for skill in candidate_skills]
-        job_embeddings = [self.get_skill_embedding(skill) for skill in job_skills]
+        # One model call per side instead of one per skill
+        candidate_embeddings = self.embedding_model.encode_batch(list(candidate_skills))
+        job_embeddings = self.embedding_model.encode_batch(list(job_skills))
         
-        similarity_matrix = cosine_similarity(candidate_embeddings, job_embeddings)
+        # Cosine similarity of every candidate skill to every job skill
+        candidate_embeddings = candidate_embeddings / np.maximum(
+            np.linalg.norm(candidate_embeddings, axis=1, keepdims=True), 1e-12)
+        job_embeddings = job_embeddings / np.maximum(np.linalg.norm(job_embeddings, axis=1, keepdims=True), 1e-12)
+        similarity_matrix = candidate_embeddings @ job_embeddings.T
         return similarity_matrix
     
     def detect_bias(self, candidate_pool, selection_results):
         """Detect potential bias in candidate selection"""
+        # Imported on use: fairlearn pulls in scikit-learn, which slows every start-up
+        try:
+            from fairlearn.metrics import demographic_parity_difference
+        except ImportError:
+            raise ImportError('fairlearn library not installed') from None
+        
         # Implement fairness metrics
         demographic_parity = demographic_parity_difference(
             y_true=selection_results['selected'],
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Offline models and no embedding server, before config is imported anywhere
+os.environ.setdefault('EMBEDDING_MODEL', 'hashing-stub')
+os.environ['EMBEDDING_SOCKET'] = ''
+os.environ.setdefault('CROSS_ENCODER_MODEL', 'hashing-stub')
+# Dataset and embedding snapshots of the test databases stay out of the repository
+os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='job-screening-tests-')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CANDIDATES = [
+    ('Ada Lovelace', ['Python', 'Machine Learning'], 'Python developer building machine learning pipelines'),
+    ('Grace Hopper', ['Java', 'SQL'], 'Java engineer writing SQL reports'),
+    ('Alan Turing', ['Python', 'AWS'], 'Python and AWS cloud engineer'),
+    ('Linus Torvalds', ['C', 'Linux'], 'C programmer working on the Linux kernel'),
+]
+
+JOBS = [
+    ('Data Scientist', ['Python', 'Machine Learning'], 'Build machine learning models in Python'),
+    ('Backend Engineer', ['Java', 'SQL'], 'Write Java services backed by SQL'),
+]
+
+
+@pytest.fixture
+def screening_db(tmp_path):
+    """Path of a database holding a few candidates and job descriptions"""
+    from utils.database_manager import DatabaseManager
+
+    db_path = str(tmp_path / 'screening.db')
+    db = DatabaseManager(db_path)
+    try:
+        for name, skills, text in CANDIDATES:
+            db.store_candidate({
+                'name': name,
+                'email': f"{name.split()[0].lower()}@example.com",
+                'resume_path': f"{name.split()[0].lower()}.txt",
+                'skills': skills,
+                'experience': [{'role': 'Engineer', 'duration': '2018 - 2022'}],
+                'education': [{'degree': 'BSc'}],
+                'resume_text': text
+            })
+        for title, skills, text in JOBS:
+            db.insert_job_description({'title': title, 'summary': text, 'required_skills': skills, 'raw_jd': text})
+    finally:
+        db.close()
+    return db_path
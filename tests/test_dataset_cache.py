@@ -0,0 +1,64 @@
+import os
+import glob
+
+import pytest
+
+from utils import dataset_cache
+from utils.dataset_cache import load_dataset, _BuildLock
+
+
+@pytest.fixture(autouse=True)
+def _fresh_process_cache():
+    dataset_cache._datasets.clear()
+    yield
+    dataset_cache._datasets.clear()
+
+
+def _write_csv(path, description):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'Job Title,Job Description\nEngineer,{description}\n')
+
+
+def test_same_file_name_in_two_folders_keeps_both_snapshots(tmp_path):
+    first, second = str(tmp_path / 'a' / 'dataset.csv'), str(tmp_path / 'b' / 'dataset.csv')
+    _write_csv(first, 'python')
+    _write_csv(second, 'java')
+    cache_dir = str(tmp_path / 'cache')
+
+    assert load_dataset(first, cache_dir).iloc[0, 1] == 'python'
+    assert load_dataset(second, cache_dir).iloc[0, 1] == 'java'
+    snapshots = [path for path in glob.glob(os.path.join(cache_dir, 'dataset.*')) if not path.endswith('.lock')]
+    assert len(snapshots) == 2
+
+    # A fresh process reads each file's own snapshot
+    dataset_cache._datasets.clear()
+    assert load_dataset(first, cache_dir).iloc[0, 1] == 'python'
+
+
+def test_new_version_replaces_only_its_own_snapshot(tmp_path):
+    path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    _write_csv(path, 'python')
+    load_dataset(path, cache_dir)
+
+    _write_csv(path, 'python and rust')
+    os.utime(path, ns=(1, 1))
+    assert load_dataset(path, cache_dir).iloc[0, 1] == 'python and rust'
+    assert len(glob.glob(os.path.join(cache_dir, 'dataset.*.parquet')) +
+               glob.glob(os.path.join(cache_dir, 'dataset.*.pkl'))) == 1
+
+
+@pytest.mark.parametrize('use_flock', [True, False])
+def test_build_lock_is_exclusive_until_released(tmp_path, monkeypatch, use_flock):
+    monkeypatch.setattr(dataset_cache, 'LOCK_TIMEOUT', 0.2)
+    if not use_flock:
+        monkeypatch.setattr(dataset_cache, 'fcntl', None)
+    lock_path = str(tmp_path / 'snapshot.lock')
+    holder = _BuildLock(lock_path)
+    assert holder.acquire()
+    assert not _BuildLock(lock_path).acquire()
+    holder.release()
+    other = _BuildLock(lock_path)
+    assert other.acquire()
+    other.release()
@@ -0,0 +1,54 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from config import Config
+from models.embedding_store import save_embeddings, load_embeddings, fetch_embeddings
+from utils.logger import metrics
+from utils.migrations import migrate
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'EMBEDDING_SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    conn = sqlite3.connect(str(tmp_path / 'embeddings.db'))
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def _snapshot_hits() -> int:
+    return metrics.summary().get('counters', {}).get('embedding_snapshot_hits', 0)
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'float16', 'int8'])
+def test_round_trip(conn, dtype):
+    vectors = np.random.default_rng(0).standard_normal((50, 16)).astype(np.float32)
+    save_embeddings(conn, 'candidate', range(1, 51), vectors, 'm', dtype)
+    conn.commit()
+
+    loaded = load_embeddings(conn, 'candidate', 'm')
+    assert loaded.ids.tolist() == list(range(1, 51))
+    np.testing.assert_allclose(loaded.to_float32(), vectors, atol=0.05 if dtype != 'float32' else 0)
+    np.testing.assert_allclose(fetch_embeddings(conn, 'candidate', 'm', [7, 3]), loaded.to_float32()[[6, 2]])
+
+
+def test_full_loads_come_from_a_snapshot_until_the_vectors_change(conn):
+    vectors = np.random.default_rng(1).standard_normal((20, 8)).astype(np.float32)
+    save_embeddings(conn, 'candidate', range(1, 21), vectors, 'm')
+    conn.commit()
+
+    first = load_embeddings(conn, 'candidate', 'm')
+    hits = _snapshot_hits()
+    second = load_embeddings(conn, 'candidate', 'm')
+    assert _snapshot_hits() == hits + 1
+    np.testing.assert_array_equal(first.vectors, second.vectors)
+
+    # A replaced vector and a new row invalidate the snapshot
+    save_embeddings(conn, 'candidate', [20, 21], np.ones((2, 8), dtype=np.float32), 'm')
+    conn.commit()
+    third = load_embeddings(conn, 'candidate', 'm')
+    assert third.ids.tolist() == list(range(1, 22))
+    np.testing.assert_array_equal(third.vectors[-2:], np.ones((2, 8)))
+    assert load_embeddings(conn, 'candidate', 'm', min_id=20).ids.tolist() == [21]
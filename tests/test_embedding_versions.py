@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from models.embedding_model import EmbeddingModel
+from models.embedding_versions import (ReembedJob, activate_model_version, active_model_version,
+                                       list_model_versions, register_served_version, ACTIVE, READY)
+
+
+@pytest.fixture
+def conn(screening_db):
+    conn = sqlite3.connect(screening_db)
+    yield conn
+    conn.close()
+
+
+def reembed(conn, model_version):
+    return ReembedJob(conn, EmbeddingModel(model_version, socket_path=None), rate=0).run()
+
+
+def statuses(conn):
+    return {row['model_version']: row['status'] for row in list_model_versions(conn)}
+
+
+def test_register_served_version_only_without_an_active_one(conn):
+    assert register_served_version(conn, 'hashing-stub-32')
+    assert active_model_version(conn) == 'hashing-stub-32'
+    assert not register_served_version(conn, 'hashing-stub-64')
+    assert statuses(conn) == {'hashing-stub-32': ACTIVE}
+
+
+def test_activation_keeps_the_served_version_for_a_rollback(conn):
+    register_served_version(conn, 'hashing-stub-32')
+    reembed(conn, 'hashing-stub-32')
+    assert reembed(conn, 'hashing-stub-64') == {'candidate': 4, 'job': 2}
+
+    with pytest.raises(ValueError):
+        activate_model_version(conn, 'hashing-stub-128')
+    assert activate_model_version(conn, 'hashing-stub-64')
+    assert statuses(conn) == {'hashing-stub-32': READY, 'hashing-stub-64': ACTIVE}
+    assert not activate_model_version(conn, 'hashing-stub-64')
+
+    assert activate_model_version(conn, 'hashing-stub-32')
+    assert active_model_version(conn) == 'hashing-stub-32'
+
+
+def test_activation_registers_the_version_being_served(conn):
+    reembed(conn, 'hashing-stub-32')
+    conn.execute("DELETE FROM embedding_versions")
+    conn.commit()
+    reembed(conn, 'hashing-stub-64')
+
+    assert activate_model_version(conn, 'hashing-stub-64', current='hashing-stub-32')
+    assert statuses(conn)['hashing-stub-32'] == READY
+    assert activate_model_version(conn, 'hashing-stub-32')
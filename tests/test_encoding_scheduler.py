@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from models.embedding_model import EmbeddingModel
+from models.encoding_scheduler import EncodingScheduler
+
+
+@pytest.fixture
+def model():
+    return EmbeddingModel('hashing-stub', socket_path=None)
+
+
+def test_concurrent_texts_match_direct_encoding(model):
+    texts = [f'python developer {i}' for i in range(40)]
+    scheduler = EncodingScheduler(model, max_batch_size=8, max_wait_ms=20)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            vectors = list(executor.map(scheduler.encode_text, texts))
+    finally:
+        scheduler.close()
+    np.testing.assert_allclose(np.vstack(vectors), model.encode_batch(texts), rtol=1e-6)
+
+
+def test_submit_after_close_raises(model):
+    scheduler = EncodingScheduler(model)
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler.submit('python')
+    # Closing twice is harmless
+    scheduler.close()
+
+
+def test_close_flushes_queued_texts(model):
+    scheduler = EncodingScheduler(model, max_batch_size=64, max_wait_ms=1000)
+    futures = [scheduler.submit(f'text {i}') for i in range(5)]
+    closer = threading.Thread(target=scheduler.close)
+    closer.start()
+    assert all(future.result(timeout=5) is not None for future in futures)
+    closer.join(5)
+    assert not closer.is_alive()
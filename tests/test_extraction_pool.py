@@ -0,0 +1,46 @@
+import os
+import json
+
+import pytest
+
+from utils.extraction_pool import ExtractionPool, QUARANTINE_LOG
+
+
+def test_quarantine_keeps_only_the_newest_files(tmp_path):
+    quarantine_dir = tmp_path / 'quarantine'
+    pool = ExtractionPool(workers=1, quarantine_dir=str(quarantine_dir), quarantine_max_files=2)
+    for i in range(4):
+        path = tmp_path / f'resume{i}.pdf'
+        path.write_bytes(b'%PDF-')
+        os.utime(path, (1000 + i, 1000 + i))
+        assert pool.quarantine(str(path), "timed out") == str(quarantine_dir / path.name)
+
+    assert sorted(os.listdir(quarantine_dir)) == [QUARANTINE_LOG, 'resume2.pdf', 'resume3.pdf']
+    with open(quarantine_dir / QUARANTINE_LOG, encoding='utf-8') as log:
+        assert len([json.loads(line) for line in log]) == 4
+
+
+def test_quarantine_without_a_folder_leaves_the_file(tmp_path):
+    path = tmp_path / 'resume.pdf'
+    path.write_bytes(b'%PDF-')
+    assert ExtractionPool(workers=1, quarantine_dir=None).quarantine(str(path), "timed out") is None
+    assert path.exists()
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="needs named pipes")
+def test_only_files_at_fault_are_quarantined(tmp_path):
+    quarantine_dir = tmp_path / 'quarantine'
+    broken = tmp_path / 'broken.pdf'
+    broken.write_bytes(b'not a pdf')
+    # Opening a pipe nobody writes to blocks, like a parse that is slow on a loaded machine
+    stalled = tmp_path / 'stalled.txt'
+    os.mkfifo(stalled)
+
+    with ExtractionPool(workers=1, timeout=1, quarantine_dir=str(quarantine_dir)) as pool:
+        results = {os.path.basename(result.path): result for result in pool.imap([str(broken), str(stalled)])}
+
+    assert results['broken.pdf'].quarantined_path == str(quarantine_dir / 'broken.pdf')
+    assert not results['broken.pdf'].transient
+    assert results['stalled.txt'].error.startswith('timed out')
+    assert results['stalled.txt'].quarantined_path is None and results['stalled.txt'].transient
+    assert stalled.exists()
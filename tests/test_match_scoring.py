@@ -0,0 +1,42 @@
+import math
+import sqlite3
+
+import pytest
+
+from models.embedding_model import EmbeddingModel
+from models.match_scoring import MultiFactorScorer, experience_years
+
+
+@pytest.mark.parametrize('experience, years', [
+    ('2010 - 2015', 5),
+    ('2010 - 2015, 2012 - 2018', 8),
+    ('2010 - 2015, 2011 - 2013', 5),
+    ('2010 - 2012, 2015 - 2017', 4),
+    ('2015 - 2010', 0),
+])
+def test_experience_years_counts_overlapping_jobs_once(experience, years):
+    assert experience_years(experience) == years
+
+
+def test_experience_years_without_dates_is_unknown():
+    assert math.isnan(experience_years('[{"role": "Engineer"}]'))
+
+
+def test_refresh_loads_only_new_candidates(screening_db):
+    from utils.database_manager import DatabaseManager
+
+    conn = sqlite3.connect(screening_db)
+    scorer = MultiFactorScorer(EmbeddingModel('hashing-stub', socket_path=None))
+    assert scorer.refresh(conn) == 4
+    assert scorer.refresh(conn) == 0
+
+    db = DatabaseManager(screening_db)
+    db.store_candidate({'name': 'Barbara Liskov', 'email': 'barbara@example.com', 'skills': ['Java'],
+                        'experience': [{'duration': '2000 - 2010'}], 'education': [{'degree': 'PhD'}]})
+    db.close()
+    assert scorer.refresh(conn) == 1
+    assert scorer.years[-1] == 10 and scorer.education[-1] == 4
+
+    ids, scores, _ = scorer.score(conn, 1)
+    assert len(ids) == 5 and ids[scores.argmax()] == 1
+    conn.close()
@@ -0,0 +1,98 @@
+import json
+import sqlite3
+
+import pytest
+
+from utils.migrations import IMPORTED_JOB_TITLE, MIGRATIONS, SCHEMA_VERSION, current_version, migrate
+from utils.resume_text_store import load_resume_text
+
+RESUME = ("Senior Python developer with ten years of experience building machine learning pipelines, "
+          "data platforms and REST services on AWS for retail and finance clients")
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """Unversioned database as written by the application before migrations existed"""
+    conn = sqlite3.connect(str(tmp_path / 'legacy.db'))
+    conn.executescript('''
+        CREATE TABLE job_descriptions (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, company TEXT, summary TEXT,
+                                       required_skills TEXT, experience_level TEXT, raw_jd TEXT);
+        CREATE TABLE candidates (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, email TEXT, resume_path TEXT,
+                                 skills TEXT, experience TEXT, education TEXT, match_scores TEXT, resume_text TEXT);
+        CREATE TABLE job_matches (id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER, candidate_id INTEGER,
+                                  match_score REAL, status TEXT);
+        CREATE TABLE candidate_matches (candidate_name TEXT, match_score REAL, cv_path TEXT);
+    ''')
+    conn.execute("INSERT INTO job_descriptions (title, required_skills) VALUES ('Data Scientist', ?)",
+                 (json.dumps(['Python', 'Machine  Learning']),))
+    for name, skills, scores, text in (
+        ('Ada', ['Python', 'AWS'], {'1': 0.9}, RESUME),
+        ('Ada again', ['python'], {}, RESUME + ' clients'),
+        ('Grace', ['Java'], {'1': 0.4}, 'Java engineer writing SQL reports for a bank'),
+    ):
+        conn.execute(
+            "INSERT INTO candidates (name, email, resume_path, skills, match_scores, resume_text) "
+            "VALUES (?, '', ?, ?, ?, ?)",
+            (name, f"{name}.pdf", json.dumps(skills), json.dumps(scores), text)
+        )
+    # A repeated shortlisting run left two rows for the same pair
+    conn.execute("INSERT INTO job_matches (job_id, candidate_id, match_score, status) VALUES (1, 3, 0.2, 'pending')")
+    conn.execute("INSERT INTO job_matches (job_id, candidate_id, match_score, status) VALUES (1, 3, 0.3, 'pending')")
+    conn.execute("INSERT INTO candidate_matches VALUES ('Linus', 0.7, 'linus.pdf')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_fresh_database_reaches_the_latest_version(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'fresh.db'))
+    assert current_version(conn) == 0
+    assert migrate(conn) == SCHEMA_VERSION
+    applied = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert applied == [version for version, _, _ in MIGRATIONS]
+
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM schema_migrations").fetchone()[0] == len(MIGRATIONS)
+    conn.close()
+
+
+def test_legacy_database_is_upgraded_in_small_batches(legacy_db):
+    conn = legacy_db
+    assert migrate(conn, batch_size=2) == SCHEMA_VERSION
+
+    # Migration 2: one match per pair (the latest), JSON scores and old run results moved into job_matches
+    scores = "SELECT match_score FROM job_matches WHERE job_id = 1 AND candidate_id = ?"
+    assert conn.execute(scores, (3,)).fetchall() == [(0.3,)]
+    assert conn.execute(scores, (1,)).fetchall() == [(0.9,)]
+    assert 'match_scores' not in columns(conn, 'candidates')
+    assert conn.execute('''
+        SELECT c.resume_path, m.status FROM job_matches m
+        JOIN candidates c ON c.id = m.candidate_id JOIN job_descriptions j ON j.id = m.job_id WHERE j.title = ?
+    ''', (IMPORTED_JOB_TITLE,)).fetchall() == [('linus.pdf', 'shortlisted')]
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'candidate_matches'").fetchone() is None
+
+    # Migration 3: skills normalized into the dictionary
+    assert conn.execute('''
+        SELECT s.name FROM candidate_skills cs JOIN skills s ON s.id = cs.skill_id WHERE cs.candidate_id = 2
+    ''').fetchall() == [('python',)]
+    assert {row[0] for row in conn.execute(
+        "SELECT s.name FROM job_skills js JOIN skills s ON s.id = js.skill_id WHERE js.job_id = 1"
+    )} == {'python', 'machine learning'}
+
+    # Migration 4: the resubmitted resume points at the first one
+    assert conn.execute("SELECT canonical_candidate_id FROM candidates WHERE id = 2").fetchone() == (1,)
+
+    # Migration 6: resume text moved to the compressed side table
+    assert load_resume_text(conn, 3) == 'Java engineer writing SQL reports for a bank'
+    assert 'resume_text' not in columns(conn, 'candidates')
+
+    # Migrations 5, 7, 8 and 9: run checkpoints, version lifecycle, snapshot revisions and retry flags
+    assert {'embedding_versions', 'screening_runs'} <= {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    assert 'revision' in columns(conn, 'embedding_models')
+    assert 'retryable' in columns(conn, 'screening_run_files')
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from models.quantization import ProductQuantizer, QuantizedVectorIndex, ScalarQuantizer
+from models.vector_index import VectorIndex
+
+
+def clustered(count, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(0, clusters, count)] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def recall(index, exact, queries, k=10):
+    hits = [len({i for i, _ in index.search(q, k)} & {i for i, _ in exact.search(q, k)}) / k for q in queries]
+    return float(np.mean(hits))
+
+
+def test_pq_serves_exact_search_until_trained():
+    vectors = clustered(300)
+    index = QuantizedVectorIndex(ProductQuantizer(subspaces=8, centroids=16, training_sample=200))
+    exact = VectorIndex()
+    exact.add(np.arange(1, 2), vectors[:1])
+    index.add(np.arange(1, 2), vectors[:1])
+
+    assert not index.quantizer.trained
+    assert index.search(vectors[0], 1) == pytest.approx(exact.search(vectors[0], 1))
+
+    index.add(np.arange(2, 151), vectors[1:150])
+    exact.add(np.arange(2, 151), vectors[1:150])
+    assert index.codes is None
+    assert recall(index, exact, vectors[:20]) == 1.0
+
+    index.add(np.arange(151, 301), vectors[150:])
+    assert index.quantizer.trained and index.vectors is None
+    assert index.codes.shape == (300, 8)
+
+
+@pytest.mark.parametrize('batch', [1, 50, 400])
+def test_pq_recall_does_not_depend_on_the_first_batch(batch):
+    vectors = clustered(400)
+    ids = np.arange(1, 401)
+    exact = VectorIndex()
+    exact.add(ids, vectors)
+    index = QuantizedVectorIndex(ProductQuantizer(subspaces=8, centroids=16, training_sample=200),
+                                 rerank_vectors=lambda wanted: vectors[wanted - 1])
+    for start in range(0, 400, batch):
+        index.add(ids[start:start + batch], vectors[start:start + batch])
+
+    assert index.ids.tolist() == ids.tolist()
+    assert recall(index, exact, clustered(30, seed=1)) >= 0.9
+
+
+def test_pq_retrains_when_the_index_has_grown():
+    vectors = clustered(1000)
+    index = QuantizedVectorIndex(ProductQuantizer(subspaces=8, centroids=16, training_sample=100), retrain_growth=2.0)
+    index.add(np.arange(1, 101), vectors[:100])
+    first = index.quantizer
+    assert index.trained_on == 100
+
+    index.add(np.arange(101, 151), vectors[100:150])
+    assert index.quantizer is first
+
+    index.add(np.arange(151, 251), vectors[150:250])
+    assert index.quantizer is not first and index.trained_on == 250
+    assert index.codes.shape == (250, 8)
+
+
+def test_scalar_quantizer_needs_no_training():
+    vectors = clustered(50)
+    index = QuantizedVectorIndex(ScalarQuantizer())
+    index.add([1], vectors[:1])
+    assert index.codes is not None and index.vectors is None
@@ -0,0 +1,93 @@
+import os
+from functools import partial
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from utils.database_manager import DatabaseManager
+from utils.screening_runs import ScreeningRun, FAILED, REJECTED, SCORED
+
+
+def test_resume_skips_finished_cvs_and_retries_transient_rejections(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'runs.db'))
+    try:
+        run = ScreeningRun.start(db, str(tmp_path), 'Data Scientist', 'Python and machine learning',
+                                 'hashing-stub', top_n=2)
+        run.record('a.pdf', SCORED, 0.9, np.ones(4))
+        run.record('b.pdf', SCORED, 0.4, np.ones(4))
+        run.record('c.pdf', REJECTED, error="PdfReadError: EOF marker not found")
+        run.record('d.pdf', REJECTED, error="worker did not start", retryable=True)
+        run.fail()
+        assert run.status == FAILED
+
+        resumed = ScreeningRun.resume(db, run.run_id)
+        assert resumed.processed == {'a.pdf', 'b.pdf', 'c.pdf'}
+        assert resumed.retryable == {'d.pdf'}
+        assert [c['cv_path'] for c in resumed.selector.results()] == ['a.pdf', 'b.pdf']
+
+        resumed.record('d.pdf', SCORED, 0.95, np.ones(4))
+        resumed.checkpoint()
+        again = ScreeningRun.resume(db, run.run_id)
+        assert again.processed == {'a.pdf', 'b.pdf', 'c.pdf', 'd.pdf'} and not again.retryable
+        assert [c['cv_path'] for c in again.selector.results()] == ['d.pdf', 'a.pdf']
+    finally:
+        db.close()
+
+
+def test_publish_shortlists_the_run(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'runs.db'))
+    try:
+        run = ScreeningRun.start(db, str(tmp_path), 'Data Scientist', 'Python', 'hashing-stub', top_n=1)
+        run.record('a.pdf', SCORED, 0.9, np.ones(4))
+        job_id = run.publish(run.selector.results())
+        statuses = db.conn.execute("SELECT status FROM job_matches WHERE job_id = ?", (job_id,)).fetchall()
+        assert statuses == [('shortlisted',)]
+    finally:
+        db.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="needs named pipes")
+def test_cv_that_timed_out_is_scored_on_resume(tmp_path, monkeypatch):
+    import main
+    from utils.extraction_pool import ExtractionPool
+
+    cvs = tmp_path / 'cvs'
+    cvs.mkdir()
+    (cvs / 'ada.txt').write_text('Python developer building machine learning models')
+    # Opening a pipe nobody writes to blocks until the extraction times out
+    os.mkfifo(cvs / 'grace.txt')
+    job_csv = tmp_path / 'jobs.csv'
+    job_csv.write_text('Job Title,Job Description\nData Scientist,Python machine learning\n')
+    db_path = str(tmp_path / 'runs.db')
+
+    monkeypatch.setattr(main, 'ExtractionPool', partial(ExtractionPool, workers=1, timeout=1,
+                                                        quarantine_dir=str(tmp_path / 'quarantine')))
+    # The first pass is interrupted before its shortlist is published
+    monkeypatch.setattr(ScreeningRun, 'publish', Mock(side_effect=RuntimeError("interrupted")))
+    main.screen_candidates(str(cvs), str(job_csv), db_path, workers=1, duplicate_threshold=None)
+
+    db = DatabaseManager(db_path)
+    try:
+        run_id, = db.conn.execute("SELECT id FROM screening_runs").fetchone()
+        status, error, retryable = db.conn.execute(
+            "SELECT status, error, retryable FROM screening_run_files WHERE path LIKE '%grace.txt'"
+        ).fetchone()
+        assert (status, retryable) == (REJECTED, 1) and error.startswith('timed out')
+    finally:
+        db.close()
+
+    os.remove(cvs / 'grace.txt')
+    (cvs / 'grace.txt').write_text('Python machine learning engineer')
+    monkeypatch.undo()
+    monkeypatch.setattr(main, 'ExtractionPool', partial(ExtractionPool, workers=1, quarantine_dir=None))
+    top = main.screen_candidates(str(cvs), str(job_csv), db_path, workers=1, resume_run_id=run_id)
+
+    assert {candidate['candidate_name'] for candidate in top} == {'ada', 'grace'}
+    db = DatabaseManager(db_path)
+    try:
+        assert db.conn.execute(
+            "SELECT status FROM screening_run_files WHERE path LIKE '%grace.txt'"
+        ).fetchone() == (SCORED,)
+    finally:
+        db.close()
@@ -0,0 +1,37 @@
+import numpy as np
+
+from utils.database_manager import DatabaseManager
+from utils.extraction_pool import ExtractionPool
+from utils.screening_runs import ScreeningRun, SCORED
+from utils.sharded_screening import list_cv_files, screen_sharded
+
+JOB = 'Python developer building machine learning models'
+
+
+def test_workers_store_outcomes_and_resume_rebuilds_the_top_k(tmp_path):
+    cvs = tmp_path / 'cvs'
+    cvs.mkdir()
+    for i, text in enumerate(['Python machine learning models', 'Java SQL reports', 'Python developer',
+                              'C Linux kernel', 'machine learning research', 'Go services']):
+        (cvs / f'cv{i}.txt').write_text(text)
+
+    db = DatabaseManager(str(tmp_path / 'runs.db'))
+    try:
+        run = ScreeningRun.start(db, str(cvs), 'Data Scientist', JOB, 'hashing-stub', top_n=2)
+        with ExtractionPool(workers=1, quarantine_dir=None) as extractor:
+            top = screen_sharded(list_cv_files(str(cvs)), JOB, 'hashing-stub', workers=2, torch_threads=1,
+                                 top_n=2, extractor=extractor, run=run)
+        run.checkpoint()
+
+        # Embeddings were written by the workers, not held in the parent
+        assert not run._pending
+        rows = db.conn.execute("SELECT status, embedding FROM screening_run_files WHERE run_id = ?",
+                               (run.run_id,)).fetchall()
+        assert len(rows) == 6 and all(status == SCORED and embedding for status, embedding in rows)
+        assert len(np.frombuffer(rows[0][1], dtype=np.float32)) > 0
+
+        resumed = ScreeningRun.resume(db, run.run_id)
+        assert len(resumed.processed) == 6
+        assert resumed.selector.results() == top
+    finally:
+        db.close()
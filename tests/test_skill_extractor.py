@@ -0,0 +1,25 @@
+from skills_taxonomy import load_skill_extractor
+from utils.skill_extractor import SkillExtractor
+
+
+def names(matches):
+    return [match.name for match in matches]
+
+
+def test_longest_match_wins_over_terms_inside_it():
+    extractor = load_skill_extractor(None)
+    assert names(extractor.find_all("Built UIs in React.js")) == ['React']
+    assert names(extractor.extract("ReactJS, JS and Java")) == ['React', 'JavaScript', 'Java']
+
+
+def test_leftmost_match_wins_over_a_partial_overlap():
+    extractor = SkillExtractor({'Skills': ['machine learning', 'learning analytics', 'analytics']})
+    matches = extractor.find_all("machine learning analytics")
+    assert names(matches) == ['machine learning', 'analytics']
+    assert [(match.start, match.end) for match in matches] == [(0, 16), (17, 26)]
+
+
+def test_matches_need_word_boundaries():
+    extractor = SkillExtractor({'Languages': ['Java', 'JavaScript']})
+    assert names(extractor.extract("JavaScript and  java")) == ['JavaScript', 'Java']
+    assert extractor.extract("Javanese") == []
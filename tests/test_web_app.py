@@ -0,0 +1,98 @@
+import pytest
+
+from models.embedding_model import EmbeddingModel
+from web_app import create_app
+
+
+@pytest.fixture
+def client(screening_db):
+    app = create_app(screening_db, EmbeddingModel('hashing-stub', socket_path=None))
+    yield app.test_client()
+    app.extensions['serving_state'].extractor.close()
+
+
+def test_search_returns_matching_candidates(client):
+    results = client.get('/api/search?q=python').get_json()['results']
+    assert results
+    assert {result['name'] for result in results} >= {'Ada Lovelace', 'Alan Turing'}
+
+
+def test_search_caps_k(client):
+    assert len(client.get('/api/search?q=python&k=1').get_json()['results']) == 1
+    assert len(client.get('/api/search?q=python&k=100000').get_json()['results']) <= 4
+
+
+@pytest.mark.parametrize('k', ['0', '-5'])
+def test_search_rejects_non_positive_k(client, k):
+    assert client.get(f'/api/search?q=python&k={k}').status_code == 400
+    assert client.get(f'/search?q=python&k={k}').status_code == 400
+
+
+def test_score_ranks_jobs_for_posted_text(client):
+    response = client.post('/api/score?k=1', data={'text': 'Python machine learning engineer'})
+    assert response.status_code == 200
+    jobs = response.get_json()['jobs']
+    assert [job['title'] for job in jobs] == ['Data Scientist']
+
+
+@pytest.mark.parametrize('k', ['0', '-5'])
+def test_score_rejects_non_positive_k(client, k):
+    assert client.post(f'/api/score?k={k}', data={'text': 'Python'}).status_code == 400
+
+
+def test_switch_closes_the_old_encoder_after_its_last_request(client, screening_db):
+    import sqlite3
+    import time
+
+    from models.embedding_versions import ReembedJob, active_model_version
+
+    state = client.application.extensions['serving_state']
+    conn = sqlite3.connect(screening_db)
+    try:
+        assert active_model_version(conn) == 'hashing-stub'
+        with state.serving_model() as old:
+            ReembedJob(conn, EmbeddingModel('hashing-stub-32', socket_path=None), rate=0).run(activate=True)
+            state.refresh_index()
+            deadline = time.monotonic() + 30
+            while state.model_version != 'hashing-stub-32' and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert state.model_version == 'hashing-stub-32'
+            # A request that picked up the old model before the swap can still encode with it
+            assert len(old.encoder.encode_text('python')) == len(old.embedding_model.encode_text('python'))
+
+        deadline = time.monotonic() + 10
+        while not old.encoder._closed and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert old.encoder._closed
+        assert client.post('/api/score?k=1', data={'text': 'Python machine learning'}).status_code == 200
+
+        ReembedJob(conn, EmbeddingModel('hashing-stub', socket_path=None), rate=0).run(activate=True)
+        assert active_model_version(conn) == 'hashing-stub'
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('limit', ['0', '-1'])
+def test_top_rejects_non_positive_limit(client, limit):
+    assert client.get(f'/api/top?limit={limit}').status_code == 400
+
+
+def test_huge_page_is_empty_not_an_error(client):
+    body = client.get('/api/candidates?page=99999999999999999999').get_json()
+    assert body['candidates'] == [] and body['total'] == 4
+
+
+def test_first_repeat_search_is_served_from_the_cache(client, screening_db):
+    from utils.database_manager import DatabaseManager
+    from utils.logger import metrics
+
+    # The first search embeds the new candidate, which changes the data version
+    db = DatabaseManager(screening_db)
+    db.store_candidate({'name': 'Guido van Rossum', 'email': 'guido@example.com', 'skills': ['Python'],
+                        'resume_text': 'Python language designer'})
+    db.close()
+    results = client.get('/api/search?q=python').get_json()['results']
+    assert 'Guido van Rossum' in {result['name'] for result in results}
+    hits = metrics.summary()['counters'].get('response_cache_hits', 0)
+    client.get('/api/search?q=python')
+    assert metrics.summary()['counters']['response_cache_hits'] == hits + 1
@@ -1,29 +1,36 @@
 # File: c:\Users\megha\Downloads\hack\utils\csv_encoding_diagnostic.py
-import pandas as pd
-import chardet
+import codecs
 import os
+import sys
+import chardet
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.jd_loader import SNIFF_BYTES, iter_job_description_chunks, sniff_encoding
 
-def detect_file_encoding(file_path):
+def detect_file_encoding(file_path, sample_bytes=SNIFF_BYTES):
     """
-    Detect the encoding of a file using chardet
+    Detect the encoding of a file using chardet on a bounded prefix
     """
     with open(file_path, 'rb') as file:
-        raw_data = file.read()
+        raw_data = file.read(sample_bytes)
         result = chardet.detect(raw_data)
         print(f"Detected encoding: {result['encoding']} (Confidence: {result['confidence']})")
-    
+
     return result['encoding']
 
-def try_read_csv(file_path, encodings=None):
+def try_read_csv(file_path, encodings=None, nrows=5):
     """
-    Try reading CSV with different encodings
+    Try reading the first rows of a CSV with different encodings
     """
     if encodings is None:
-        encodings = ['utf-8', 'latin-1', 'windows-1252', 'iso-8859-1']
-    
+        encodings = [sniff_encoding(file_path)]
+
     for encoding in encodings:
+        if not encoding:
+            continue
         try:
-            df = pd.read_csv(file_path, encoding=encoding)
+            df = next(iter_job_description_chunks(file_path, chunksize=nrows, encoding=encoding))
             print(f"Successfully read with {encoding} encoding")
             print("DataFrame Info:")
             print(df.info())
@@ -32,46 +39,56 @@ def try_read_csv(file_path, encodings=None):
             return df
         except Exception as e:
             print(f"Failed with {encoding} encoding: {e}")
-    
+
     print("Could not read the file with any of the specified encodings.")
     return None
 
-def diagnose_problematic_character(file_path, encoding='utf-8'):
+def diagnose_problematic_character(file_path, encoding='utf-8', block_size=1024 * 1024):
     """
-    Diagnose the problematic character causing encoding issues
+    Diagnose the problematic character causing encoding issues, streaming the file block by block
     """
     try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        offset = 0
         with open(file_path, 'rb') as file:
-            content = file.read()
-        
-        # Try to decode and find the problematic character
-        try:
-            content.decode(encoding)
-        except UnicodeDecodeError as e:
-            print(f"Problematic character details:")
-            print(f"Error: {e}")
-            print(f"Problematic byte: {content[e.start:e.end]}")
-            print(f"Surrounding context: {content[max(0, e.start-10):min(len(content), e.end+10)]}")
+            while True:
+                block = file.read(block_size)
+                try:
+                    decoder.decode(block, final=not block)
+                except UnicodeDecodeError as e:
+                    # Offsets are relative to the pending bytes: buffered tail of the last block + this block
+                    pending = len(e.object) - len(block)
+                    start = offset - pending + e.start
+                    print(f"Problematic character details:")
+                    print(f"Error: {e}")
+                    print(f"Byte offset: {start}")
+                    print(f"Problematic byte: {e.object[e.start:e.end]}")
+                    print(f"Surrounding context: {e.object[max(0, e.start-10):min(len(e.object), e.end+10)]}")
+                    return
+                if not block:
+                    break
+                offset += len(block)
+        print(f"No {encoding} decoding problems found")
     except Exception as e:
         print(f"Error reading file: {e}")
 
 def main():
-    file_path = r'c:\Users\megha\Downloads\hack\database\job_description.csv'
-    
+    file_path = sys.argv[1] if len(sys.argv) > 1 else r'c:\Users\megha\Downloads\hack\database\job_description.csv'
+
     # File existence and size check
     if not os.path.exists(file_path):
         print(f"Error: File {file_path} does not exist!")
         return
-    
+
     file_size = os.path.getsize(file_path)
     print(f"File size: {file_size} bytes")
-    
+
     # First, detect the encoding
     detected_encoding = detect_file_encoding(file_path)
-    
+
     # Diagnose problematic character
     diagnose_problematic_character(file_path)
-    
+
     # Then try reading with the detected and other common encodings
     try_read_csv(file_path, [detected_encoding, 'utf-8', 'latin-1', 'windows-1252'])
 
@@ -1,7 +1,45 @@
 import os
+import queue
 import sqlite3
+import threading
 import json
-from typing import List, Dict, Any
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Optional
+import numpy as np
+from utils.logger import metrics
+from models.vector_index import profile_text
+from models.embedding_store import EmbeddingMatrix, save_embeddings, load_embeddings
+from utils.migrations import migrate, link_skills, normalize_skill
+from utils.near_duplicates import MinHasher, find_near_duplicate, store_signature
+from utils.resume_text_store import save_resume_text, load_resume_text, decompress_text
+from config import Config
+
+# Candidate columns read by lookups; the resume text lives in candidate_resume_text and is loaded on demand
+CANDIDATE_COLUMNS = 'id, name, email, resume_path, skills, experience, education, canonical_candidate_id'
+
+def candidates_with_all_skills(conn: sqlite3.Connection, skills: Iterable[str]) -> List[int]:
+    """
+    Candidates that have every one of the given skills, as an indexed SQL intersection
+
+    :param conn: Database connection
+    :param skills: Required skill names
+    :return: Candidate IDs in ascending order (empty if any skill is unknown)
+    """
+    names = list(dict.fromkeys(filter(None, (normalize_skill(skill) for skill in skills))))
+    if not names:
+        return []
+
+    skill_ids = dict(conn.execute(
+        f"SELECT name, id FROM skills WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall())
+    if len(skill_ids) < len(names):
+        return []
+
+    query = ' INTERSECT '.join(['SELECT candidate_id FROM candidate_skills WHERE skill_id = ?'] * len(names))
+    with metrics.timer('skill_prefilter'):
+        rows = conn.execute(f"{query} ORDER BY 1", [skill_ids[name] for name in names]).fetchall()
+    return [row[0] for row in rows]
+
 
 class DatabaseManager:
     def __init__(self, db_path: str):
@@ -17,56 +55,20 @@ class DatabaseManager:
         self.conn = sqlite3.connect(db_path)
         self.cursor = self.conn.cursor()
         self._create_tables()
+        
+        # Signatures must match those already indexed, so the hasher is not configurable
+        self.minhasher = MinHasher()
 
     def _create_tables(self):
-        """Create necessary tables if they don't exist"""
-        # Job Descriptions Table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS job_descriptions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                company TEXT,
-                summary TEXT,
-                required_skills TEXT,
-                experience_level TEXT,
-                raw_jd TEXT
-            )
-        ''')
+        """Create the tables, or upgrade an existing database to the current schema"""
+        migrate(self.conn, Config.MIGRATION_BATCH_SIZE)
 
-        # Candidates Table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS candidates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                email TEXT,
-                resume_path TEXT,
-                skills TEXT,
-                experience TEXT,
-                education TEXT,
-                match_scores TEXT
-            )
-        ''')
-
-        # Matching Results Table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS job_matches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id INTEGER,
-                candidate_id INTEGER,
-                match_score REAL,
-                status TEXT,
-                FOREIGN KEY(job_id) REFERENCES job_descriptions(id),
-                FOREIGN KEY(candidate_id) REFERENCES candidates(id)
-            )
-        ''')
-
-        self.conn.commit()
-
-    def insert_job_description(self, job_data: Dict[str, Any]) -> int:
+    def insert_job_description(self, job_data: Dict[str, Any], commit: bool = True) -> int:
         """
         Insert a new job description
         
         :param job_data: Dictionary containing job description details
+        :param commit: Commit immediately
         :return: ID of inserted job description
         """
         query = '''
@@ -84,60 +86,87 @@ class DatabaseManager:
         )
         
         self.cursor.execute(query, values)
-        self.conn.commit()
-        return self.cursor.lastrowid
+        job_id = self.cursor.lastrowid
+        link_skills(self.conn, 'job_skills', 'job_id', job_id, job_data.get('required_skills', []))
+        if commit:
+            self.conn.commit()
+        return job_id
+
+    def get_or_create_job_description(self, job_data: Dict[str, Any], commit: bool = True) -> int:
+        """
+        Return the ID of a job description with the same title and text, inserting it if new
+        
+        :param job_data: Dictionary containing job description details
+        :param commit: Commit immediately
+        :return: ID of the job description
+        """
+        row = self.cursor.execute(
+            "SELECT id FROM job_descriptions WHERE title = ? AND raw_jd = ?",
+            (job_data.get('title', ''), job_data.get('raw_jd', ''))
+        ).fetchone()
+        return row[0] if row else self.insert_job_description(job_data, commit)
 
     def store_candidate(self, candidate_data: Dict[str, Any]) -> int:
         """
         Store candidate information in the database
         
-        :param candidate_data: Dictionary containing candidate information
+        :param candidate_data: Dictionary containing candidate information; 'canonical_candidate_id'
+            links a near-duplicate, 'minhash' indexes the resume signature of a canonical candidate
         :return: Candidate ID
         """
         try:
-            # Convert experiences and education to JSON strings
-            experiences_json = json.dumps(candidate_data.get('experiences', []))
+            # Convert experience and education to JSON strings
+            experience = candidate_data.get('experience', candidate_data.get('experiences', []))
+            experience_json = json.dumps(experience)
             education_json = json.dumps(candidate_data.get('education', []))
             
-            # Extract skills from experiences if not provided
-            skills = candidate_data.get('skills', [])
-            if not skills:
-                skills = [exp.get('role', '') for exp in candidate_data.get('experiences', [])]
+            # Fall back to the experience roles if no skills were extracted
+            skills = candidate_data.get('skills')
+            if skills is None:
+                skills = [exp.get('role', '') for exp in experience if isinstance(exp, dict)]
             skills_json = json.dumps(skills)
             
-            # Insert or update candidate
+            # Insert candidate
             self.cursor.execute('''
                 INSERT INTO candidates 
-                (name, email, resume_text, experiences, education, skills) 
-                VALUES (?, ?, ?, ?, ?, ?)
+                (name, email, resume_path, skills, experience, education, canonical_candidate_id) 
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (
                 candidate_data.get('name', ''), 
                 candidate_data.get('email', ''), 
-                candidate_data.get('resume_text', ''),
-                experiences_json,
+                candidate_data.get('resume_path', ''),
+                skills_json,
+                experience_json,
                 education_json,
-                skills_json
+                candidate_data.get('canonical_candidate_id')
             ))
+            candidate_id = self.cursor.lastrowid
+            save_resume_text(self.conn, candidate_id, candidate_data.get('resume_text', ''))
+            if candidate_data.get('canonical_candidate_id') is None and candidate_data.get('minhash') is not None:
+                store_signature(self.conn, self.minhasher, candidate_id, candidate_data['minhash'])
+            self.index_candidate_text(candidate_id, candidate_data.get('resume_text', ''), skills)
+            link_skills(self.conn, 'candidate_skills', 'candidate_id', candidate_id, skills)
             
-            # Commit and get the last inserted ID
+            # Commit and return the inserted ID
             self.conn.commit()
-            return self.cursor.lastrowid
+            return candidate_id
         
         except Exception as e:
             # Rollback in case of error
             self.conn.rollback()
             raise
 
-    def insert_candidate(self, candidate_data: Dict[str, Any]) -> int:
+    def insert_candidate(self, candidate_data: Dict[str, Any], commit: bool = True) -> int:
         """
         Insert a new candidate
         
         :param candidate_data: Dictionary containing candidate details
+        :param commit: Commit immediately
         :return: ID of inserted candidate
         """
         query = '''
             INSERT INTO candidates 
-            (name, email, resume_path, skills, experience, education, match_scores) 
+            (name, email, resume_path, skills, experience, education, canonical_candidate_id) 
             VALUES (?, ?, ?, ?, ?, ?, ?)
         '''
         values = (
@@ -147,30 +176,206 @@ class DatabaseManager:
             json.dumps(candidate_data.get('skills', [])),
             json.dumps(candidate_data.get('experience', [])),
             json.dumps(candidate_data.get('education', [])),
-            json.dumps(candidate_data.get('match_scores', {}))
+            candidate_data.get('canonical_candidate_id')
         )
         
         self.cursor.execute(query, values)
+        candidate_id = self.cursor.lastrowid
+        self.index_candidate_text(
+            candidate_id,
+            profile_text(values[4], values[5], None),
+            candidate_data.get('skills', [])
+        )
+        link_skills(self.conn, 'candidate_skills', 'candidate_id', candidate_id, candidate_data.get('skills', []))
+        
+        # Scores known up front go to job_matches like any other match
+        for job_id, match_score in candidate_data.get('match_scores', {}).items():
+            self.insert_job_match(int(job_id), candidate_id, match_score, commit=False)
+        if commit:
+            self.conn.commit()
+        return candidate_id
+
+    def get_or_create_candidate(self, candidate_data: Dict[str, Any], commit: bool = True) -> int:
+        """
+        Return the ID of the candidate with the same resume path, inserting it if new
+        
+        :param candidate_data: Dictionary containing candidate details (must include 'resume_path')
+        :param commit: Commit immediately
+        :return: ID of the candidate
+        """
+        row = self.cursor.execute(
+            "SELECT id FROM candidates WHERE resume_path = ?", (candidate_data['resume_path'],)
+        ).fetchone()
+        return row[0] if row else self.insert_candidate(candidate_data, commit)
+
+    def get_candidate(self, candidate_id: int, with_text: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Fetch one candidate
+        
+        :param candidate_id: ID of the candidate
+        :param with_text: Also load the resume text (as 'resume_text', None if none was stored)
+        :return: Candidate row, or None if it does not exist
+        """
+        self.cursor.execute(f"SELECT {CANDIDATE_COLUMNS} FROM candidates WHERE id = ?", (candidate_id,))
+        row = self.cursor.fetchone()
+        if not row:
+            return None
+        candidate = dict(zip([column[0] for column in self.cursor.description], row))
+        if with_text:
+            candidate['resume_text'] = self.get_resume_text(candidate_id)
+        return candidate
+
+    def get_resume_text(self, candidate_id: int) -> Optional[str]:
+        """
+        Load a candidate's resume text, for detail views and re-extraction
+        
+        :param candidate_id: ID of the candidate
+        :return: Resume text, or None if none was stored
+        """
+        return load_resume_text(self.conn, candidate_id)
+
+    def find_near_duplicate(self, signature: np.ndarray, threshold: float = Config.DUPLICATE_THRESHOLD) -> Optional[int]:
+        """
+        Find the canonical candidate whose resume is a near-duplicate of a new one
+        
+        :param signature: MinHash signature of the new resume (from ``self.minhasher``)
+        :param threshold: Minimum estimated Jaccard similarity
+        :return: Canonical candidate ID, or None if the resume is new
+        """
+        return find_near_duplicate(self.conn, self.minhasher, signature, threshold)
+
+    def get_duplicate_clusters(self) -> Dict[int, List[int]]:
+        """
+        Candidates grouped under the canonical candidate they duplicate
+        
+        :return: Canonical candidate ID -> IDs of its duplicates
+        """
+        clusters: Dict[int, List[int]] = {}
+        for candidate_id, canonical_id in self.conn.execute(
+            "SELECT id, canonical_candidate_id FROM candidates "
+            "WHERE canonical_candidate_id IS NOT NULL ORDER BY canonical_candidate_id, id"
+        ):
+            clusters.setdefault(canonical_id, []).append(candidate_id)
+        return clusters
+
+    def index_candidate_text(self, candidate_id: int, resume_text: str, skills: List[str]):
+        """
+        Add a candidate to the full-text search index (caller commits)
+        
+        :param candidate_id: ID of the candidate
+        :param resume_text: Resume or profile text
+        :param skills: List of skills
+        """
+        self.cursor.execute(
+            "INSERT INTO candidate_fts (rowid, resume_text, skills) VALUES (?, ?, ?)",
+            (candidate_id, resume_text or '', ' '.join(str(skill) for skill in skills))
+        )
+
+    def candidates_with_skills(self, skills: Iterable[str]) -> List[int]:
+        """
+        Candidates that have all of the given skills ("must have Python AND AWS")
+        
+        :param skills: Required skill names
+        :return: Candidate IDs in ascending order
+        """
+        return candidates_with_all_skills(self.conn, skills)
+
+    def rebuild_search_index(self) -> int:
+        """
+        Re-populate the full-text index from the candidates table
+        
+        :return: Number of candidates indexed
+        """
+        self.cursor.execute("INSERT INTO candidate_fts (candidate_fts) VALUES ('delete-all')")
+        # Streamed, so only one resume text is decompressed at a time
+        rows = self.conn.execute('''
+            SELECT c.id, t.codec, t.text, c.skills, c.experience, c.education
+            FROM candidates c
+            LEFT JOIN candidate_resume_text t ON t.candidate_id = c.id
+        ''')
+        count = 0
+        for candidate_id, codec, blob, skills, experience, education in rows:
+            try:
+                skills_list = json.loads(skills) if skills else []
+            except json.JSONDecodeError:
+                skills_list = [skills]
+            self.index_candidate_text(
+                candidate_id,
+                decompress_text(codec, blob) if blob is not None else profile_text(experience, education, None),
+                skills_list
+            )
+            count += 1
+        self.conn.commit()
+        return count
+
+    def store_embeddings(self, kind: str, ids: Iterable[int], vectors: np.ndarray,
+                         model_version: str, dtype: str = 'float32'):
+        """
+        Persist candidate or job embeddings
+        
+        :param kind: 'candidate' or 'job'
+        :param ids: Entity IDs, one per vector
+        :param vectors: 2-D array of embeddings
+        :param model_version: Model/version tag the vectors were produced with
+        :param dtype: Storage dtype ('float32', 'float16' or 'int8')
+        """
+        save_embeddings(self.conn, kind, ids, vectors, model_version, dtype)
         self.conn.commit()
-        return self.cursor.lastrowid
 
-    def insert_job_match(self, job_id: int, candidate_id: int, match_score: float, status: str = 'pending'):
+    def load_embeddings(self, kind: str, model_version: str, min_id: int = 0) -> EmbeddingMatrix:
         """
-        Record job match for a candidate
+        Load every stored embedding of a model version into one contiguous array
+        
+        :param kind: 'candidate' or 'job'
+        :param model_version: Model/version tag to load
+        :param min_id: Only load entities with a larger ID
+        :return: IDs, vectors in storage dtype and int8 scales
+        """
+        return load_embeddings(self.conn, kind, model_version, min_id)
+
+    @metrics.timer('insert_job_match')
+    def insert_job_match(self, job_id: int, candidate_id: int, match_score: float, status: str = 'pending',
+                         commit: bool = True):
+        """
+        Record job match for a candidate, updating the score if the pair was matched before
         
         :param job_id: ID of the job description
         :param candidate_id: ID of the candidate
         :param match_score: Matching score
-        :param status: Current status of the match
+        :param status: Status of a new match (an existing match keeps its status)
+        :param commit: Commit immediately
         """
         query = '''
             INSERT INTO job_matches 
             (job_id, candidate_id, match_score, status) 
             VALUES (?, ?, ?, ?)
+            ON CONFLICT(job_id, candidate_id) DO UPDATE SET match_score = excluded.match_score
         '''
         
         self.cursor.execute(query, (job_id, candidate_id, match_score, status))
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
+
+    def insert_job_matches(self, job_id: int, candidate_ids: Iterable[int], match_scores: Iterable[float],
+                           status: str = 'pending'):
+        """
+        Record the scores of many candidates for one job in a single transaction
+        
+        :param job_id: ID of the job description
+        :param candidate_ids: IDs of the candidates
+        :param match_scores: Matching score per candidate
+        :param status: Status of new matches (existing matches keep their status)
+        """
+        with metrics.timer('insert_job_matches'):
+            self.cursor.executemany(
+                '''
+                INSERT INTO job_matches (job_id, candidate_id, match_score, status) VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_id, candidate_id) DO UPDATE SET match_score = excluded.match_score
+                ''',
+                ((job_id, int(candidate_id), float(score), status)
+                 for candidate_id, score in zip(candidate_ids, match_scores))
+            )
+            self.conn.commit()
 
     def get_shortlisted_candidates(self, job_id: int, threshold: float = 0.8) -> List[Dict[str, Any]]:
         """
@@ -181,7 +386,7 @@ class DatabaseManager:
         :return: List of shortlisted candidates
         """
         query = '''
-            SELECT c.*, jm.match_score 
+            SELECT c.id, c.name, c.email, c.resume_path, c.canonical_candidate_id, jm.match_score 
             FROM candidates c
             JOIN job_matches jm ON c.id = jm.candidate_id
             WHERE jm.job_id = ? AND jm.match_score >= ?
@@ -192,16 +397,97 @@ class DatabaseManager:
         columns = [column[0] for column in self.cursor.description]
         return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
 
-def get_all_candidates(self) -> List[Dict[str, Any]]:
-    """
-    Fetch all records from the candidates table.
-    :return: List of all candidates
-    """
-    query = "SELECT * FROM candidates"
-    self.cursor.execute(query)
-    columns = [column[0] for column in self.cursor.description]
-    return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+    def get_top_matches(self, job_id: int = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Best matches across jobs (or for one job), as shown on the dashboard
+        
+        :param job_id: Only matches for this job description
+        :param limit: Maximum number of matches
+        :return: Matches with candidate name, CV path and job title
+        """
+        query = f'''
+            SELECT c.name AS candidate_name, jm.match_score, c.resume_path AS cv_path,
+                   jm.job_id, jd.title AS job_title, jm.status
+            FROM job_matches jm
+            JOIN candidates c ON c.id = jm.candidate_id
+            LEFT JOIN job_descriptions jd ON jd.id = jm.job_id
+            {'WHERE jm.job_id = ?' if job_id is not None else ''}
+            ORDER BY jm.match_score DESC
+            LIMIT ?
+        '''
+        params = (job_id, limit) if job_id is not None else (limit,)
+        self.cursor.execute(query, params)
+        columns = [column[0] for column in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def get_all_candidates(self) -> List[Dict[str, Any]]:
+        """
+        Fetch all records from the candidates table.
+        :return: List of all candidates
+        """
+        query = f"SELECT {CANDIDATE_COLUMNS} FROM candidates"
+        self.cursor.execute(query)
+        columns = [column[0] for column in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
 
     def close(self):
         """Close database connection"""
-        self.conn.close()
\ No newline at end of file
+        self.conn.close()
+
+
+class ConnectionPool:
+    def __init__(self, db_path: str, size: int = 4):
+        """
+        Fixed-size pool of SQLite connections shared across request threads
+
+        :param db_path: Path to SQLite database
+        :param size: Number of connections to keep open
+        """
+        self.db_path = db_path
+        self._connections = queue.Queue(maxsize=size)
+        self._local = threading.local()
+
+        for _ in range(size):
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # WAL lets readers proceed while a screening run is writing
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a ``with`` block"""
+        # Nested borrows in the same thread share its connection instead of
+        # waiting on the pool, which could deadlock once every connection is out
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._connections.get()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._connections.put(conn)
+
+    def data_version(self) -> tuple:
+        """
+        Cheap fingerprint that changes whenever the database is written
+
+        :return: Modification time and size of the database and its WAL file
+        """
+        version = []
+        for path in (self.db_path, f'{self.db_path}-wal'):
+            try:
+                stat = os.stat(path)
+                version.extend((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.extend((0, 0))
+        return tuple(version)
+
+    def close(self):
+        """Close every pooled connection"""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
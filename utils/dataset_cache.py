@@ -0,0 +1,204 @@
+import os
+import glob
+import time
+import pickle
+import hashlib
+import logging
+import threading
+import importlib.util
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from config import Config
+from utils.jd_loader import load_job_descriptions, sniff_encoding
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Snapshots are Parquet when pyarrow is installed; pandas and pyarrow are only imported once a dataset is loaded
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger('job_screening_system.dataset_cache')
+
+# Parsed datasets for this process, keyed on path and validated against (mtime, size)
+_datasets: Dict[str, Tuple[Tuple[int, int], 'pd.DataFrame']] = {}
+_lock = threading.Lock()
+
+LOCK_TIMEOUT = 60  # seconds to wait for another process's build; without flock, also when a lock file is stale
+
+
+def _parse_csv(csv_path: str) -> 'pd.DataFrame':
+    """Parse the dataset CSV, treating a column-less file as one job description"""
+    import pandas as pd
+
+    dataset = load_job_descriptions(csv_path)
+
+    if len(dataset.columns) <= 1:
+        with open(csv_path, 'r', encoding=sniff_encoding(csv_path), errors='replace') as f:
+            dataset = pd.DataFrame({'job_description': [f.read()]})
+
+    return dataset
+
+
+def _read_cache(cache_path: str) -> 'pd.DataFrame':
+    if cache_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        # The DataFrame is a copy of the Arrow table; releasing the table column by column as it is
+        # converted keeps the peak near one copy of the dataset instead of two
+        return pq.read_table(cache_path).to_pandas(split_blocks=True, self_destruct=True)
+    with open(cache_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _write_cache(dataset: 'pd.DataFrame', cache_path: str):
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    if cache_path.endswith('.parquet'):
+        dataset.to_parquet(tmp_path, index=False)
+    else:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(dataset, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+class _BuildLock:
+    def __init__(self, lock_path: str):
+        """
+        Cross-process lock around building one snapshot
+
+        Where ``fcntl`` exists the lock is a ``flock`` on the lock file, which
+        the kernel releases when its holder exits, so it can never go stale.
+        Elsewhere the lock is the exclusive creation of the lock file; its
+        holder touches it every ``LOCK_TIMEOUT / 3`` seconds while it builds,
+        and a file left untouched for ``LOCK_TIMEOUT`` seconds by a crashed
+        holder is broken.
+
+        :param lock_path: Path of the lock file
+        """
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+        self._heartbeat: Optional[threading.Event] = None
+
+    def acquire(self) -> bool:
+        """
+        Wait up to ``LOCK_TIMEOUT`` seconds for the lock
+
+        :return: True if the lock is held, False if the wait timed out
+        """
+        deadline = time.time() + LOCK_TIMEOUT
+        while True:
+            if self._try_acquire():
+                return True
+            if time.time() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def _try_acquire(self) -> bool:
+        if fcntl is not None:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._fd = fd
+            return True
+
+        try:
+            os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.lock_path) > LOCK_TIMEOUT:
+                    os.remove(self.lock_path)
+            except FileNotFoundError:
+                pass
+            return False
+        self._heartbeat = threading.Event()
+        threading.Thread(target=self._touch, args=(self._heartbeat,), daemon=True).start()
+        return True
+
+    def _touch(self, stopped: threading.Event):
+        # Keeps a long parse from looking like a crashed holder
+        while not stopped.wait(LOCK_TIMEOUT / 3):
+            try:
+                os.utime(self.lock_path)
+            except FileNotFoundError:
+                return
+
+    def release(self):
+        """Release the lock"""
+        if self._fd is not None:
+            # The file stays: removing it would let two processes lock different inodes
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        elif self._heartbeat is not None:
+            self._heartbeat.set()
+            self._heartbeat = None
+            os.remove(self.lock_path)
+
+
+def load_dataset(csv_path: str, cache_dir: str = None) -> 'pd.DataFrame':
+    """
+    Load a dataset CSV once per process and once per file version across processes
+
+    The first process to need a given version of the CSV parses it and writes a
+    Parquet (or pickle, without pyarrow) snapshot keyed on the file's mtime and
+    size. Every other process, e.g. a pool of ingestion workers, reads the
+    snapshot instead of re-parsing the CSV.
+
+    :param csv_path: Path to the dataset CSV
+    :param cache_dir: Folder for snapshots (defaults to ``Config.CACHE_DIR``)
+    :return: Parsed dataset
+    """
+    csv_path = os.path.abspath(csv_path)
+    stat = os.stat(csv_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _datasets.get(csv_path)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        cache_dir = cache_dir or Config.CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        # Files with the same name in different folders get their own snapshots
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        stem = f"{stem}.{hashlib.sha1(csv_path.encode('utf-8')).hexdigest()[:12]}"
+        extension = 'parquet' if HAVE_PYARROW else 'pkl'
+        cache_path = os.path.join(cache_dir, f'{stem}.{version[0]}.{version[1]}.{extension}')
+
+        dataset = None
+        if os.path.exists(cache_path):
+            try:
+                dataset = _read_cache(cache_path)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable dataset cache {cache_path}: {e}")
+
+        if dataset is None:
+            lock = _BuildLock(f'{cache_path}.lock')
+            locked = lock.acquire()
+            try:
+                # Another process may have written the snapshot while we waited
+                if os.path.exists(cache_path):
+                    dataset = _read_cache(cache_path)
+                else:
+                    logger.info(f"Parsing dataset {csv_path}")
+                    dataset = _parse_csv(csv_path)
+                    _write_cache(dataset, cache_path)
+
+                    # Drop snapshots of older versions of the same file
+                    for stale in glob.glob(os.path.join(glob.escape(cache_dir), f'{glob.escape(stem)}.*.{extension}')):
+                        if stale != cache_path:
+                            os.remove(stale)
+                            if fcntl is not None and os.path.exists(f'{stale}.lock'):
+                                os.remove(f'{stale}.lock')
+            finally:
+                if locked:
+                    lock.release()
+
+        _datasets[csv_path] = (version, dataset)
+        return dataset
\ No newline at end of file
@@ -0,0 +1,401 @@
+import os
+import json
+import time
+import queue
+import shutil
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from config import Config
+from utils.resume_parser import extract_text
+from utils.logger import metrics
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger('job_screening_system.extraction_pool')
+
+# Record of every quarantined file, one JSON object per line, inside the quarantine folder
+QUARANTINE_LOG = 'quarantine.jsonl'
+
+# Seconds a new worker may take to start, on top of the per-file timeout of its first file
+WORKER_START_TIMEOUT = 120
+
+# First message of every worker, sent once it is ready for files
+READY = 'ready'
+
+# Files handed out ahead of the oldest unfinished one, per worker, so ordered results never pile up
+DISPATCH_AHEAD_PER_WORKER = 4
+
+# Failures that say more about the environment or the load than about the file, worth another try later
+TRANSIENT_FAILURES = ('error', 'unstarted', 'timeout')
+
+# Failures the file causes itself, which move it to quarantine; a timeout also depends on the machine's load
+QUARANTINED_FAILURES = ('rejected', 'memory', 'crashed')
+
+
+class ExtractionError(Exception):
+    """Raised when a resume cannot be extracted within the pool's limits"""
+
+    def __init__(self, path: str, reason: str):
+        super().__init__(f"{path}: {reason}")
+        self.path = path
+        self.reason = reason
+
+
+class ExtractionResult(NamedTuple):
+    """Outcome of extracting one file"""
+    path: str
+    text: Optional[str]
+    error: Optional[str]
+    seconds: float
+    quarantined_path: Optional[str]
+    # Whether the failure may not happen again, e.g. a worker that did not start
+    transient: bool = False
+
+
+def _limit_memory(max_memory_mb: Optional[int]):
+    """Cap the address space of this process at its current size plus ``max_memory_mb``"""
+    if resource is None or not max_memory_mb:
+        return
+    # Address space is an upper bound of resident memory, so this also caps RSS growth
+    baseline = 0
+    try:
+        with open('/proc/self/statm') as statm:
+            baseline = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = baseline + max_memory_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(conn, max_pages: Optional[int], max_memory_mb: Optional[int]):
+    """
+    Extract files sent over ``conn`` until it closes
+
+    Replies are ``(status, text_or_reason, seconds)`` with status 'ok',
+    'rejected' (the file is at fault), 'memory' (the worker must be replaced)
+    or 'error' (the environment is at fault, e.g. a missing parser library).
+    """
+    _limit_memory(max_memory_mb)
+    conn.send(READY)
+    while True:
+        try:
+            path = conn.recv()
+        except EOFError:
+            return
+        if path is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            reply = ('ok', extract_text(path, max_pages=max_pages))
+        except MemoryError:
+            reply = ('memory', f"memory limit of {max_memory_mb} MB exceeded")
+        except ImportError as e:
+            reply = ('error', str(e))
+        except Exception as e:
+            reply = ('rejected', f"{type(e).__name__}: {e}")
+        conn.send(reply + (time.perf_counter() - start,))
+
+
+class _Worker:
+    def __init__(self, context, max_pages: Optional[int], max_memory_mb: Optional[int]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, max_pages, max_memory_mb),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.path: Optional[str] = None
+        self.index: Optional[int] = None
+        self.timeout = 0.0
+        self.started = 0.0
+        self.deadline = 0.0
+
+    def submit(self, path: str, timeout: float, index: Optional[int] = None):
+        self.path, self.index, self.timeout = path, index, timeout
+        self.started = time.perf_counter()
+        # The clock of a worker that is still starting restarts once it reports ready
+        self.deadline = self.started + timeout + (0 if self.ready else WORKER_START_TIMEOUT)
+        self.conn.send(path)
+
+    def done(self) -> bool:
+        """Whether the current file has a reply, the worker exited or the deadline passed"""
+        try:
+            if self.conn.poll() and not self.ready:
+                self.conn.recv()
+                self.ready = True
+                self.started = time.perf_counter()
+                self.deadline = self.started + self.timeout
+            if self.conn.poll():
+                return True
+        except (EOFError, OSError):
+            return True
+        return not self.process.is_alive() or time.perf_counter() >= self.deadline
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionPool:
+    def __init__(self, workers: Optional[int] = None, timeout: float = Config.EXTRACTION_TIMEOUT,
+                 max_memory_mb: Optional[int] = Config.EXTRACTION_MAX_MEMORY_MB,
+                 max_pages: Optional[int] = Config.EXTRACTION_MAX_PAGES,
+                 quarantine_dir: Optional[str] = Config.QUARANTINE_DIR,
+                 quarantine_max_files: Optional[int] = Config.QUARANTINE_MAX_FILES):
+        """
+        Resume text extraction in sandboxed worker processes
+
+        Every file is parsed in a worker process with a wall-clock timeout, a
+        memory cap and a page limit. A worker that times out, runs out of
+        memory or crashes is killed and replaced, so one hostile file costs at
+        most ``timeout`` seconds of one worker. Files that fail through their
+        own fault (unreadable, out of memory, a crash) are moved to
+        ``quarantine_dir`` and logged there with the reason; only the newest
+        ``quarantine_max_files`` of them are kept. Timeouts are only reported.
+
+        :param workers: Worker processes (started on first use)
+        :param timeout: Seconds a single file may take
+        :param max_memory_mb: Memory a worker may grow by beyond its start-up size (None for no cap)
+        :param max_pages: Refuse PDFs with more pages than this (None for no limit)
+        :param quarantine_dir: Folder offending files are moved to (None only logs them)
+        :param quarantine_max_files: Quarantined files kept, oldest deleted first (None keeps all)
+        """
+        self.workers = max(1, workers or Config.EXTRACTION_WORKERS)
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_pages = max_pages
+        self.quarantine_dir = quarantine_dir
+        self.quarantine_max_files = quarantine_max_files
+        # Never fork this process, so workers don't inherit model weights or thread pools. A fork
+        # server pays the interpreter start-up once and makes replacing a killed worker cheap.
+        self._context = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        )
+        self._idle: queue.Queue = queue.Queue()
+        for _ in range(self.workers):
+            self._idle.put(None)
+        self._quarantine_lock = threading.Lock()
+
+    def __enter__(self) -> 'ExtractionPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self) -> 'ExtractionPool':
+        """
+        Start every worker now rather than on first use, e.g. before serving requests
+
+        :return: The pool
+        """
+        workers = []
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in workers:
+            self._idle.put(worker or _Worker(self._context, self.max_pages, self.max_memory_mb))
+        return self
+
+    def _checkout(self) -> _Worker:
+        return self._idle.get() or _Worker(self._context, self.max_pages, self.max_memory_mb)
+
+    def _receive(self, worker: _Worker) -> ExtractionResult:
+        """Collect the result of a worker that is ``done``"""
+        path = worker.path
+        try:
+            if worker.ready and worker.conn.poll():
+                status, payload, seconds = worker.conn.recv()
+            elif worker.process.is_alive() and not worker.ready:
+                status, payload, seconds = 'unstarted', "worker did not start", time.perf_counter() - worker.started
+            elif worker.process.is_alive():
+                status, payload, seconds = 'timeout', f"timed out after {self.timeout:g}s", self.timeout
+            else:
+                raise EOFError
+        except (EOFError, OSError):
+            status, payload = 'crashed', f"worker exited with code {worker.process.exitcode}"
+            seconds = time.perf_counter() - worker.started
+        worker.path = None
+
+        metrics.observe('extract_text_from_resume', seconds)
+        if status == 'ok':
+            return ExtractionResult(path, payload, None, seconds, None)
+
+        if status in ('timeout', 'crashed', 'memory', 'unstarted'):
+            worker.stop(kill=True)
+        metrics.increment('extraction_failures')
+        # Only the file's own faults quarantine it, not a missing library, a worker that never started or a
+        # timeout, which may pass on a less loaded machine and must not cost the user the file
+        quarantined_path = self.quarantine(path, payload) if status in QUARANTINED_FAILURES else None
+        return ExtractionResult(path, None, payload, seconds, quarantined_path, status in TRANSIENT_FAILURES)
+
+    def _release(self, worker: _Worker):
+        self._idle.put(worker if worker.process.is_alive() else None)
+
+    def extract(self, path: str) -> str:
+        """
+        Extract one file (safe to call from several threads)
+
+        :param path: Path to the resume
+        :return: Extracted text
+        :raises ExtractionError: If the file failed, timed out or hit a limit
+        """
+        worker = self._checkout()
+        try:
+            worker.submit(path, self.timeout)
+            while not worker.done():
+                wait([worker.conn, worker.process.sentinel], max(0.0, worker.deadline - time.perf_counter()))
+            result = self._receive(worker)
+        except BaseException:
+            worker.stop(kill=True)
+            raise
+        finally:
+            self._release(worker)
+
+        if result.error is not None:
+            raise ExtractionError(path, result.error)
+        return result.text
+
+    def imap(self, paths: Iterable[str]) -> Iterator[ExtractionResult]:
+        """
+        Extract many files in parallel, yielding results in input order
+
+        Failures are yielded too, with ``text`` set to None and the reason in ``error``.
+
+        :param paths: Resume paths
+        :return: Iterator of extraction results
+        """
+        paths = iter(paths)
+        idle: List[Optional[_Worker]] = [self._idle.get()]
+        while len(idle) < self.workers:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        ahead = len(idle) * DISPATCH_AHEAD_PER_WORKER
+
+        busy: List[_Worker] = []
+        finished = {}
+        dispatched = yielded = 0
+        exhausted = False
+        try:
+            while True:
+                while idle and not exhausted and dispatched < yielded + ahead:
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    worker = idle.pop() or _Worker(self._context, self.max_pages, self.max_memory_mb)
+                    worker.submit(path, self.timeout, dispatched)
+                    busy.append(worker)
+                    dispatched += 1
+
+                while yielded in finished:
+                    yield finished.pop(yielded)
+                    yielded += 1
+
+                if not busy:
+                    if exhausted:
+                        return
+                    continue
+
+                wait([worker.conn for worker in busy] + [worker.process.sentinel for worker in busy],
+                     max(0.0, min(worker.deadline for worker in busy) - time.perf_counter()))
+                for worker in list(busy):
+                    if worker.done():
+                        index = worker.index
+                        finished[index] = self._receive(worker)
+                        busy.remove(worker)
+                        idle.append(worker if worker.process.is_alive() else None)
+        finally:
+            # Files still in flight when the caller stops early are abandoned with their workers
+            for worker in busy:
+                worker.stop(kill=True)
+                idle.append(None)
+            for worker in idle:
+                self._idle.put(worker)
+
+    def quarantine(self, path: str, reason: str) -> Optional[str]:
+        """
+        Move an offending file out of the way and record why
+
+        :param path: File to quarantine
+        :param reason: Why it was rejected
+        :return: New location of the file, or None if it was not moved
+        """
+        logger.warning(f"Quarantined {path}: {reason}")
+        metrics.increment('resumes_quarantined')
+        if not self.quarantine_dir:
+            return None
+
+        with self._quarantine_lock:
+            os.makedirs(self.quarantine_dir, exist_ok=True)
+            target = os.path.join(self.quarantine_dir, os.path.basename(path))
+            if os.path.exists(target):
+                stem, extension = os.path.splitext(target)
+                target = f"{stem}.{int(time.time() * 1000)}{extension}"
+            try:
+                shutil.move(path, target)
+            except OSError as e:
+                logger.error(f"Could not move {path} to quarantine: {e}")
+                target = None
+
+            with open(os.path.join(self.quarantine_dir, QUARANTINE_LOG), 'a', encoding='utf-8') as log:
+                log.write(json.dumps({
+                    'path': path,
+                    'quarantined_path': target,
+                    'reason': reason,
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S')
+                }) + '\n')
+            self._prune_quarantine()
+        return target
+
+    def _prune_quarantine(self):
+        """Delete the oldest quarantined files beyond ``quarantine_max_files``"""
+        if not self.quarantine_max_files:
+            return
+        with os.scandir(self.quarantine_dir) as entries:
+            files = [entry for entry in entries if entry.is_file() and entry.name != QUARANTINE_LOG]
+        if len(files) <= self.quarantine_max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.quarantine_max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.error(f"Could not delete quarantined file {entry.path}: {e}")
+
+    def close(self):
+        """Stop the idle workers; the pool starts new ones if it is used again"""
+        stopped = []
+        while True:
+            try:
+                stopped.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in stopped:
+            if worker is not None:
+                worker.stop()
+            self._idle.put(None)
@@ -0,0 +1,127 @@
+import codecs
+import logging
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import chardet
+except ImportError:
+    chardet = None
+
+logger = logging.getLogger('job_screening_system.jd_loader')
+
+# Bytes inspected to pick an encoding; large enough for a few dozen JDs, small enough to stay cheap
+SNIFF_BYTES = 64 * 1024
+DEFAULT_CHUNKSIZE = 1000
+
+
+def sniff_encoding(file_path: str, sample_bytes: int = SNIFF_BYTES) -> str:
+    """
+    Guess a file's encoding from a bounded prefix
+
+    :param file_path: Path to the file
+    :param sample_bytes: Number of leading bytes to inspect
+    :return: Encoding name usable by ``open``/``pd.read_csv``
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # The prefix may simply end in the middle of a multi-byte character
+        if e.reason == 'unexpected end of data' and len(sample) == sample_bytes:
+            return 'utf-8'
+
+    if chardet is not None:
+        result = chardet.detect(sample)
+        if result['encoding'] and result['confidence'] >= 0.5:
+            return result['encoding']
+
+    try:
+        sample.decode('windows-1252')
+        return 'windows-1252'
+    except UnicodeDecodeError:
+        # latin-1 maps every byte, so it never fails
+        return 'latin-1'
+
+
+def iter_job_description_chunks(file_path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                                encoding: Optional[str] = None,
+                                usecols: Optional[List[str]] = None) -> Iterator['pd.DataFrame']:
+    """
+    Stream a job description CSV as DataFrame chunks in constant memory
+
+    The encoding is sniffed once; stray undecodable bytes later in the file are
+    replaced rather than forcing a re-read with another encoding.
+
+    :param file_path: Path to the CSV
+    :param chunksize: Rows per chunk
+    :param encoding: Encoding to use instead of sniffing
+    :param usecols: Only parse these columns
+    :return: Iterator of DataFrame chunks
+    """
+    # pandas takes most of a second to import, so only code that reads a CSV pays for it
+    import pandas as pd
+
+    encoding = encoding or sniff_encoding(file_path)
+    logger.info(f"Reading {file_path} with {encoding} encoding in chunks of {chunksize}")
+
+    with pd.read_csv(file_path, encoding=encoding, encoding_errors='replace',
+                     chunksize=chunksize, usecols=usecols) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def iter_job_descriptions(file_path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                          title_column: str = 'Job Title',
+                          description_column: str = 'Job Description') -> Iterator[Dict[str, str]]:
+    """
+    Stream job descriptions one row at a time
+
+    :param file_path: Path to the CSV
+    :param chunksize: Rows parsed per chunk
+    :param title_column: Column holding the job title
+    :param description_column: Column holding the job description text
+    :return: Iterator of ``{'title': ..., 'description': ...}`` dictionaries
+    """
+    import pandas as pd
+
+    for chunk in iter_job_description_chunks(file_path, chunksize):
+        titles = chunk[title_column] if title_column in chunk.columns else [''] * len(chunk)
+        for title, description in zip(titles, chunk[description_column]):
+            if pd.isna(description):
+                continue
+            yield {
+                'title': '' if pd.isna(title) else str(title).strip(),
+                'description': str(description)
+            }
+
+
+def load_job_descriptions(file_path: str, nrows: Optional[int] = None) -> 'pd.DataFrame':
+    """
+    Read a (small) job description CSV, or its first ``nrows`` rows, into one DataFrame
+
+    :param file_path: Path to the CSV
+    :param nrows: Stop after this many rows
+    :return: DataFrame of job descriptions
+    """
+    import pandas as pd
+
+    chunks = []
+    remaining = nrows
+    for chunk in iter_job_description_chunks(file_path, chunksize=min(nrows or DEFAULT_CHUNKSIZE, DEFAULT_CHUNKSIZE)):
+        if remaining is not None:
+            chunk = chunk.iloc[:remaining]
+            remaining -= len(chunk)
+        chunks.append(chunk)
+        if remaining is not None and remaining <= 0:
+            break
+
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
\ No newline at end of file
@@ -1,71 +1,392 @@
 # c:/Users/megha/Downloads/hack/utils/logger.py
+import atexit
+import bisect
+import json
 import logging
 import os
+import queue
+import threading
+import time
+from contextlib import ContextDecorator
 from datetime import datetime
-from typing import Optional, Dict, Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Dict, Any, Sequence
+from config import Config
 
-class JobScreeningLogger:
-    def __init__(self, log_dir: Optional[str] = None, log_level: int = logging.INFO):
+LOGGER_NAME = 'job_screening_system'
+
+# Pass as ``extra=`` on high-volume per-CV / per-match records so they can be sampled
+PER_ITEM = {'per_item': True}
+
+_setup_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as one JSON object per line"""
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+
+        # Carry through structured fields passed via ``extra=``
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED and not key.startswith('_'):
+                entry[key] = value
+
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, sample_rate: float = 1.0, max_per_second: Optional[float] = None):
         """
-        Initialize a comprehensive logger for job screening system
-        
-        :param log_dir: Directory to store log files
-        :param log_level: Logging level
+        Sample and rate-limit per-item log records
+
+        Only records logged with ``extra=PER_ITEM`` below WARNING are affected;
+        errors and run summaries always pass.
+
+        :param sample_rate: Fraction of per-item records to keep (0-1)
+        :param max_per_second: Maximum per-item records emitted per second
         """
+        super().__init__()
+        self.sample_every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.max_per_second = max_per_second
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._seen = 0
+        self._window_start = 0.0
+        self._window_count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'per_item', False) or record.levelno >= logging.WARNING:
+            return True
+
+        with self._lock:
+            self._seen += 1
+            if not self.sample_every or self._seen % self.sample_every:
+                self.dropped += 1
+                return False
+
+            if self.max_per_second is not None:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start = now
+                    self._window_count = 0
+                if self._window_count >= self.max_per_second:
+                    self.dropped += 1
+                    return False
+                self._window_count += 1
+
+        return True
+
+
+def setup_logging(
+    log_dir: Optional[str] = None,
+    log_level: int = logging.INFO,
+    json_lines: bool = False,
+    console: bool = True,
+    sample_rate: float = 1.0,
+    max_per_second: Optional[float] = None
+) -> logging.Logger:
+    """
+    Configure the shared job screening logger once per process
+
+    Callers only enqueue records; a background ``QueueListener`` thread does the
+    file and console writes. Repeated calls just update the level.
+
+    :param log_dir: Directory to store log files
+    :param log_level: Logging level
+    :param json_lines: Write the log file as JSON lines instead of plain text
+    :param console: Also echo records to the console
+    :param sample_rate: Fraction of per-item records to keep
+    :param max_per_second: Rate limit for per-item records
+    :return: The configured ``job_screening_system`` logger
+    """
+    global _listener, _queue_handler
+
+    logger = logging.getLogger(LOGGER_NAME)
+
+    with _setup_lock:
+        logger.setLevel(log_level)
+        if _listener is not None:
+            return logger
+
         # Create log directory if not exists
-        self.log_dir = log_dir or os.path.join(os.path.dirname(__file__), '..', 'logs')
-        os.makedirs(self.log_dir, exist_ok=True)
-        
-        # Create logger
-        self.logger = logging.getLogger('job_screening_system')
-        self.logger.setLevel(log_level)
-        
-        # Create file handler
-        log_file = os.path.join(self.log_dir, f'job_screening_{datetime.now().strftime("%Y%m%d")}.log')
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(log_level)
-        
-        # Create console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(log_level)
-        
+        log_dir = log_dir or os.path.join(os.path.dirname(__file__), '..', 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+
         # Create formatter
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        # Add handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-    
+
+        # Create file handler
+        extension = 'jsonl' if json_lines else 'log'
+        log_file = os.path.join(log_dir, f'job_screening_{datetime.now().strftime("%Y%m%d")}.{extension}')
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(JsonLinesFormatter() if json_lines else formatter)
+        handlers = [file_handler]
+
+        # Create console handler
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
+            handlers.append(console_handler)
+
+        # Filter before enqueueing so sampled-out records cost almost nothing
+        _queue_handler = QueueHandler(queue.SimpleQueue())
+        _queue_handler.addFilter(RateLimitFilter(sample_rate, max_per_second))
+
+        _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        logger.addHandler(_queue_handler)
+        # Root handlers would write every line a second time
+        logger.propagate = False
+
+    return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background listener"""
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is None:
+            return
+
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger(LOGGER_NAME).removeHandler(_queue_handler)
+
+        _listener = None
+        _queue_handler = None
+
+
+class JobScreeningLogger:
+    def __init__(self, log_dir: Optional[str] = None, log_level: int = logging.INFO):
+        """
+        Initialize a comprehensive logger for job screening system
+
+        Safe to construct many times; handlers are only attached once per process.
+
+        :param log_dir: Directory to store log files
+        :param log_level: Logging level
+        """
+        self.logger = setup_logging(
+            log_dir=log_dir,
+            log_level=log_level,
+            json_lines=Config.LOG_JSON,
+            sample_rate=Config.LOG_SAMPLE_RATE,
+            max_per_second=Config.LOG_MAX_PER_SECOND
+        )
+
     def log_job_description_processing(self, job_id: int, details: Dict[str, Any]):
         """Log job description processing details"""
         self.logger.info(f"Processing Job Description (ID: {job_id})")
         self.logger.debug(f"Job Details: {details}")
-    
+
     def log_candidate_extraction(self, candidate_id: int, skills: list, experience: list):
         """Log candidate resume extraction details"""
-        self.logger.info(f"Extracting Candidate Details (ID: {candidate_id})")
-        self.logger.debug(f"Skills: {skills}")
-        self.logger.debug(f"Experience: {experience}")
-    
+        self.logger.info(f"Extracting Candidate Details (ID: {candidate_id})", extra=PER_ITEM)
+        self.logger.debug(f"Skills: {skills}", extra=PER_ITEM)
+        self.logger.debug(f"Experience: {experience}", extra=PER_ITEM)
+
     def log_matching_result(self, job_id: int, candidate_id: int, match_score: float):
         """Log candidate-job matching result"""
         self.logger.info(
-            f"Matching Result - Job {job_id}, Candidate {candidate_id}: {match_score * 100:.2f}%"
+            f"Matching Result - Job {job_id}, Candidate {candidate_id}: {match_score * 100:.2f}%",
+            extra=PER_ITEM
         )
-    
+
     def log_error(self, component: str, error: Exception):
         """Log errors with detailed traceback"""
         self.logger.error(f"Error in {component}: {str(error)}", exc_info=True)
-    
+
     def log_interview_scheduling(self, candidate_email: str, status: str):
         """Log interview scheduling details"""
         self.logger.info(f"Interview Scheduling - Candidate {candidate_email}: {status}")
         if status.lower() == 'failed':
             self.logger.warning(f"Interview scheduling failed for {candidate_email}")
         elif status.lower() == 'success':
-            self.logger.info(f"Interview successfully scheduled for {candidate_email}")
\ No newline at end of file
+            self.logger.info(f"Interview successfully scheduled for {candidate_email}")
+
+
+# Latency buckets in seconds, from sub-millisecond similarity calls up to slow LLM generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _StageTimer(ContextDecorator):
+    def __init__(self, metrics: 'PipelineMetrics', stage: str, items: int):
+        self.metrics = metrics
+        self.stage = stage
+        self.items = items
+        self.start = 0.0
+
+    def _recreate_cm(self):
+        # Fresh instance per decorated call so nested/threaded calls don't share ``start``
+        return _StageTimer(self.metrics, self.stage, self.items)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, self.items)
+        if exc_type is not None:
+            self.metrics.increment(f'{self.stage}_errors')
+        return False
+
+
+class PipelineMetrics:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Collect per-stage timings, counters and latency histograms
+
+        :param buckets: Upper bounds (seconds) of the histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Discard everything recorded so far"""
+        with self._lock:
+            self.started_at = time.time()
+            self._stages: Dict[str, Dict[str, Any]] = {}
+            self._counters: Dict[str, float] = {}
+
+    def timer(self, stage: str, items: int = 1) -> _StageTimer:
+        """
+        Time a block or function as one observation of ``stage``
+
+        Usable as ``with metrics.timer('encode_text'):`` or ``@metrics.timer('encode_text')``.
+
+        :param stage: Pipeline stage name
+        :param items: Number of items processed by the block, for throughput
+        """
+        return _StageTimer(self, stage, items)
+
+    def observe(self, stage: str, seconds: float, items: int = 1):
+        """Record one timing observation for a stage"""
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {
+                    'count': 0, 'items': 0, 'sum': 0.0, 'min': float('inf'), 'max': 0.0,
+                    'buckets': [0] * (len(self.buckets) + 1)
+                }
+            entry['count'] += 1
+            entry['items'] += items
+            entry['sum'] += seconds
+            entry['min'] = min(entry['min'], seconds)
+            entry['max'] = max(entry['max'], seconds)
+            entry['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def increment(self, name: str, value: float = 1):
+        """Increase a named counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def _quantile(self, entry: Dict[str, Any], q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation
+        rank = q * entry['count']
+        seen = 0
+        for bound, count in zip(self.buckets, entry['buckets']):
+            seen += count
+            if seen >= rank:
+                return min(bound, entry['max'])
+        return entry['max']
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarise the run so far
+
+        :return: Dictionary with wall time, counters and per-stage statistics
+        """
+        with self._lock:
+            stages = {}
+            for stage, entry in self._stages.items():
+                stages[stage] = {
+                    'count': entry['count'],
+                    'items': entry['items'],
+                    'total_seconds': round(entry['sum'], 6),
+                    'mean_seconds': round(entry['sum'] / entry['count'], 6),
+                    'min_seconds': round(entry['min'], 6),
+                    'max_seconds': round(entry['max'], 6),
+                    'p50_seconds': round(self._quantile(entry, 0.5), 6),
+                    'p95_seconds': round(self._quantile(entry, 0.95), 6),
+                    'items_per_second': round(entry['items'] / entry['sum'], 3) if entry['sum'] else None
+                }
+
+            return {
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+                'wall_seconds': round(time.time() - self.started_at, 3),
+                'counters': dict(self._counters),
+                'stages': stages
+            }
+
+    def to_prometheus(self, prefix: str = 'job_screening') -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        lines = [
+            f'# HELP {prefix}_stage_seconds Time spent per pipeline stage',
+            f'# TYPE {prefix}_stage_seconds histogram'
+        ]
+
+        with self._lock:
+            for stage, entry in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry['buckets']):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {entry["count"]}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {entry["sum"]:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+
+            lines.append(f'# HELP {prefix}_stage_items_total Items processed per pipeline stage')
+            lines.append(f'# TYPE {prefix}_stage_items_total counter')
+            for stage, entry in sorted(self._stages.items()):
+                lines.append(f'{prefix}_stage_items_total{{stage="{stage}"}} {entry["items"]}')
+
+            lines.append(f'# HELP {prefix}_events_total Pipeline event counters')
+            lines.append(f'# TYPE {prefix}_events_total counter')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str) -> str:
+        """
+        Write metrics to disk, as Prometheus text for ``.prom`` files and JSON otherwise
+
+        The file is replaced atomically so textfile collectors never read a partial write.
+
+        :param path: Destination file
+        :return: Path written
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.summary(), indent=2)
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+
+# Process-wide metrics registry shared by the agents, models and main.py
+metrics = PipelineMetrics()
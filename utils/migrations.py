@@ -0,0 +1,464 @@
+import json
+import time
+import logging
+import sqlite3
+from typing import Callable, List, Tuple
+
+from models.embedding_store import EMBEDDING_TABLES
+from utils.near_duplicates import DEFAULT_THRESHOLD, MinHasher, find_near_duplicate, store_signature
+from utils.resume_text_store import save_resume_text
+
+logger = logging.getLogger('job_screening_system.migrations')
+
+# Rows rewritten per transaction, so upgrading a large database never holds the write lock for long
+DEFAULT_BATCH_SIZE = 5000
+
+# Job description that candidate_matches rows from old main.py runs are attached to
+IMPORTED_JOB_TITLE = 'Imported screening results'
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _batched(conn: sqlite3.Connection, table: str, batch_size: int, apply: Callable[[int, int], None]):
+    """Call ``apply(low, high)`` over consecutive rowid ranges of a table, committing after each"""
+    last = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+    for low in range(0, last + 1, batch_size):
+        apply(low, low + batch_size)
+        conn.commit()
+
+
+def _baseline(conn: sqlite3.Connection, batch_size: int):
+    """Tables as created before the schema was versioned"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_descriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            company TEXT,
+            summary TEXT,
+            required_skills TEXT,
+            experience_level TEXT,
+            raw_jd TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            email TEXT,
+            resume_path TEXT,
+            skills TEXT,
+            experience TEXT,
+            education TEXT,
+            match_scores TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_matches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER,
+            candidate_id INTEGER,
+            match_score REAL,
+            status TEXT,
+            FOREIGN KEY(job_id) REFERENCES job_descriptions(id),
+            FOREIGN KEY(candidate_id) REFERENCES candidates(id)
+        )
+    ''')
+
+    # Embedding vectors as BLOBs, one row per entity and model version
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS embedding_models (
+            kind TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            dtype TEXT NOT NULL,
+            dim INTEGER NOT NULL,
+            PRIMARY KEY (kind, model_version)
+        )
+    ''')
+    for kind, (table, id_column) in EMBEDDING_TABLES.items():
+        parent = 'candidates' if kind == 'candidate' else 'job_descriptions'
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {id_column} INTEGER NOT NULL,
+                model_version TEXT NOT NULL,
+                scale REAL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model_version, {id_column}),
+                FOREIGN KEY({id_column}) REFERENCES {parent}(id)
+            )
+        ''')
+
+    # Full-text index over candidate text; contentless, rowid = candidates.id
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS candidate_fts USING fts5(
+            resume_text,
+            skills,
+            content='',
+            tokenize='porter unicode61'
+        )
+    ''')
+
+
+def _normalize_candidates_and_matches(conn: sqlite3.Connection, batch_size: int):
+    """
+    One candidates table for every writer, one row per (job, candidate) match,
+    and the indexes the dashboard and agents query by
+    """
+    if 'resume_text' not in _columns(conn, 'candidates'):
+        conn.execute("ALTER TABLE candidates ADD COLUMN resume_text TEXT")
+
+    # Duplicate matches from repeated shortlisting runs: keep the latest score of each pair
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_matches_pair_tmp ON job_matches(job_id, candidate_id)")
+    _batched(conn, 'job_matches', batch_size, lambda low, high: conn.execute('''
+        DELETE FROM job_matches
+        WHERE id >= ? AND id < ? AND EXISTS (
+            SELECT 1 FROM job_matches later
+            WHERE later.job_id IS job_matches.job_id
+              AND later.candidate_id IS job_matches.candidate_id
+              AND later.id > job_matches.id
+        )
+    ''', (low, high)))
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_job_matches_job_candidate ON job_matches(job_id, candidate_id)")
+    conn.execute("DROP INDEX IF EXISTS idx_job_matches_pair_tmp")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_matches_job_score ON job_matches(job_id, match_score DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_matches_candidate ON job_matches(candidate_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_email ON candidates(email)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_resume_path ON candidates(resume_path)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_descriptions_title ON job_descriptions(title)")
+    conn.commit()
+
+    # candidates.match_scores held {job_id: score} JSON; those belong in job_matches
+    if 'match_scores' in _columns(conn, 'candidates'):
+        def move_scores(low: int, high: int):
+            rows = conn.execute(
+                "SELECT id, match_scores FROM candidates WHERE id >= ? AND id < ? "
+                "AND match_scores IS NOT NULL AND match_scores NOT IN ('', '{}')",
+                (low, high)
+            ).fetchall()
+            matches = []
+            for candidate_id, match_scores in rows:
+                try:
+                    scores = json.loads(match_scores)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(scores, dict):
+                    matches.extend(
+                        (int(job_id), candidate_id, float(score))
+                        for job_id, score in scores.items()
+                        if str(job_id).isdigit() and isinstance(score, (int, float))
+                    )
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_matches (job_id, candidate_id, match_score, status) VALUES (?, ?, ?, 'pending')",
+                matches
+            )
+
+        _batched(conn, 'candidates', batch_size, move_scores)
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            conn.execute("ALTER TABLE candidates DROP COLUMN match_scores")
+
+    # Results of old main.py runs pointed at this database
+    if _table_exists(conn, 'candidate_matches'):
+        row = conn.execute("SELECT id FROM job_descriptions WHERE title = ?", (IMPORTED_JOB_TITLE,)).fetchone()
+        job_id = row[0] if row else conn.execute(
+            "INSERT INTO job_descriptions (title, raw_jd) VALUES (?, '')", (IMPORTED_JOB_TITLE,)
+        ).lastrowid
+
+        def import_matches(low: int, high: int):
+            for name, score, cv_path in conn.execute(
+                "SELECT candidate_name, match_score, cv_path FROM candidate_matches WHERE rowid >= ? AND rowid < ?",
+                (low, high)
+            ).fetchall():
+                existing = conn.execute("SELECT id FROM candidates WHERE resume_path = ?", (cv_path,)).fetchone()
+                candidate_id = existing[0] if existing else conn.execute(
+                    "INSERT INTO candidates (name, email, resume_path) VALUES (?, '', ?)", (name, cv_path)
+                ).lastrowid
+                conn.execute(
+                    "INSERT OR IGNORE INTO job_matches (job_id, candidate_id, match_score, status) "
+                    "VALUES (?, ?, ?, 'shortlisted')",
+                    (job_id, candidate_id, score)
+                )
+
+        _batched(conn, 'candidate_matches', batch_size, import_matches)
+        conn.execute("DROP TABLE candidate_matches")
+
+
+def normalize_skill(name) -> str:
+    """
+    Canonical form of a skill name: lower case with single spaces
+
+    :param name: Skill as written in a resume or job description
+    :return: Normalized name ('' for empty values)
+    """
+    return ' '.join(str(name).lower().split()) if name else ''
+
+
+def link_skills(conn: sqlite3.Connection, table: str, id_column: str, owner_id: int, skills) -> int:
+    """
+    Add skills to the dictionary and link them to a candidate or job (caller commits)
+
+    :param conn: Database connection
+    :param table: 'candidate_skills' or 'job_skills'
+    :param id_column: 'candidate_id' or 'job_id'
+    :param owner_id: Candidate or job ID
+    :param skills: Iterable of skill names
+    :return: Number of distinct skills linked
+    """
+    names = list(dict.fromkeys(filter(None, (normalize_skill(skill) for skill in skills))))
+    if not names:
+        return 0
+    conn.executemany("INSERT OR IGNORE INTO skills (name) VALUES (?)", ((name,) for name in names))
+    conn.execute(
+        f"INSERT OR IGNORE INTO {table} ({id_column}, skill_id) "
+        f"SELECT ?, id FROM skills WHERE name IN ({','.join('?' * len(names))})",
+        [owner_id] + names
+    )
+    return len(names)
+
+
+def _skills_tables(conn: sqlite3.Connection, batch_size: int):
+    """Skill dictionary with candidate and job join tables, backfilled from the JSON columns"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS skills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    # Keyed by skill first, so "who has skill X" is a range scan of the primary key
+    for table, id_column, parent in (('candidate_skills', 'candidate_id', 'candidates'),
+                                     ('job_skills', 'job_id', 'job_descriptions')):
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                skill_id INTEGER NOT NULL REFERENCES skills(id),
+                {id_column} INTEGER NOT NULL REFERENCES {parent}(id),
+                PRIMARY KEY (skill_id, {id_column})
+            ) WITHOUT ROWID
+        ''')
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{id_column} ON {table}({id_column})")
+
+    for table, id_column, parent, column in (('candidate_skills', 'candidate_id', 'candidates', 'skills'),
+                                             ('job_skills', 'job_id', 'job_descriptions', 'required_skills')):
+        def backfill(low: int, high: int):
+            for owner_id, skills in conn.execute(
+                f"SELECT id, {column} FROM {parent} WHERE id >= ? AND id < ?", (low, high)
+            ).fetchall():
+                try:
+                    values = json.loads(skills) if skills else []
+                except json.JSONDecodeError:
+                    values = [skills]
+                link_skills(conn, table, id_column, owner_id, values if isinstance(values, list) else [values])
+
+        _batched(conn, parent, batch_size, backfill)
+
+
+def _near_duplicates(conn: sqlite3.Connection, batch_size: int):
+    """Link near-duplicate resumes to a canonical candidate, with a MinHash/LSH index to find them"""
+    if 'canonical_candidate_id' not in _columns(conn, 'candidates'):
+        conn.execute("ALTER TABLE candidates ADD COLUMN canonical_candidate_id INTEGER REFERENCES candidates(id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_candidates_canonical ON candidates(canonical_candidate_id) "
+        "WHERE canonical_candidate_id IS NOT NULL"
+    )
+    # Signatures of canonical candidates only; duplicates are found through their canonical
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_minhash (
+            candidate_id INTEGER PRIMARY KEY REFERENCES candidates(id),
+            signature BLOB NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            candidate_id INTEGER NOT NULL REFERENCES candidates(id),
+            PRIMARY KEY (band, bucket, candidate_id)
+        ) WITHOUT ROWID
+    ''')
+
+    hasher = MinHasher()
+
+    def backfill(low: int, high: int):
+        for candidate_id, resume_text in conn.execute(
+            "SELECT c.id, c.resume_text FROM candidates c "
+            "LEFT JOIN candidate_minhash m ON m.candidate_id = c.id "
+            "WHERE c.id >= ? AND c.id < ? AND c.canonical_candidate_id IS NULL AND m.candidate_id IS NULL "
+            "AND c.resume_text IS NOT NULL AND c.resume_text != '' ORDER BY c.id",
+            (low, high)
+        ).fetchall():
+            signature = hasher.signature(resume_text)
+            canonical_id = find_near_duplicate(conn, hasher, signature, DEFAULT_THRESHOLD)
+            if canonical_id is None:
+                store_signature(conn, hasher, candidate_id, signature)
+            else:
+                conn.execute("UPDATE candidates SET canonical_candidate_id = ? WHERE id = ?",
+                             (canonical_id, candidate_id))
+
+    _batched(conn, 'candidates', batch_size, backfill)
+
+
+def _screening_runs(conn: sqlite3.Connection, batch_size: int):
+    """Checkpoints of main.py screening runs, so an interrupted run can be resumed"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS screening_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cvs_directory TEXT NOT NULL,
+            job_title TEXT,
+            job_description TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            top_n INTEGER NOT NULL,
+            min_score REAL,
+            duplicate_threshold REAL,
+            status TEXT NOT NULL DEFAULT 'running',
+            processed INTEGER NOT NULL DEFAULT 0,
+            top_candidates TEXT NOT NULL DEFAULT '[]',
+            job_id INTEGER REFERENCES job_descriptions(id),
+            started_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            checkpointed_at TEXT,
+            published_at TEXT
+        )
+    ''')
+    # One row per CV a run has finished with; BLOBs keep this a rowid table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS screening_run_files (
+            run_id INTEGER NOT NULL REFERENCES screening_runs(id),
+            path TEXT NOT NULL,
+            status TEXT NOT NULL,
+            match_score REAL,
+            canonical_path TEXT,
+            error TEXT,
+            embedding BLOB,
+            minhash BLOB,
+            PRIMARY KEY (run_id, path)
+        )
+    ''')
+
+
+def _resume_text_blobs(conn: sqlite3.Connection, batch_size: int):
+    """Resume text moves out of candidates into a compressed side table, so scans of candidates stay narrow"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_resume_text (
+            candidate_id INTEGER PRIMARY KEY REFERENCES candidates(id),
+            codec TEXT NOT NULL,
+            length INTEGER NOT NULL,
+            text BLOB NOT NULL
+        )
+    ''')
+    if 'resume_text' not in _columns(conn, 'candidates'):
+        return
+
+    def move(low: int, high: int):
+        for candidate_id, resume_text in conn.execute(
+            "SELECT id, resume_text FROM candidates WHERE id >= ? AND id < ? AND resume_text IS NOT NULL",
+            (low, high)
+        ).fetchall():
+            save_resume_text(conn, candidate_id, resume_text)
+        conn.execute("UPDATE candidates SET resume_text = NULL WHERE id >= ? AND id < ?", (low, high))
+
+    _batched(conn, 'candidates', batch_size, move)
+    # The emptied column goes too where SQLite can drop columns (3.35+); nothing reads it any more
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        conn.execute("ALTER TABLE candidates DROP COLUMN resume_text")
+
+
+def _embedding_versions(conn: sqlite3.Connection, batch_size: int):
+    """Lifecycle of each embedding model version, so a new model is embedded in the background and switched to at once"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS embedding_versions (
+            model_version TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'building',
+            candidates_embedded INTEGER NOT NULL DEFAULT 0,
+            jobs_embedded INTEGER NOT NULL DEFAULT 0,
+            started_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            completed_at TEXT,
+            activated_at TEXT
+        )
+    ''')
+    # At most one active version
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_versions_active ON embedding_versions(status) "
+        "WHERE status = 'active'"
+    )
+
+
+def _embedding_revisions(conn: sqlite3.Connection, batch_size: int):
+    """Each write to a model version's embeddings changes its revision, which keys memory-mapped snapshots"""
+    if 'revision' not in _columns(conn, 'embedding_models'):
+        conn.execute("ALTER TABLE embedding_models ADD COLUMN revision TEXT")
+    conn.execute("UPDATE embedding_models SET revision = lower(hex(randomblob(8))) WHERE revision IS NULL")
+
+
+def _run_file_retries(conn: sqlite3.Connection, batch_size: int):
+    """CVs rejected for a reason that may pass (a worker that did not start, a timeout) are retried on resume"""
+    if 'retryable' not in _columns(conn, 'screening_run_files'):
+        conn.execute("ALTER TABLE screening_run_files ADD COLUMN retryable INTEGER NOT NULL DEFAULT 0")
+
+
+# (version, name, function); append new migrations, never edit applied ones
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection, int], None]]] = [
+    (1, 'baseline', _baseline),
+    (2, 'normalize_candidates_and_matches', _normalize_candidates_and_matches),
+    (3, 'skills_tables', _skills_tables),
+    (4, 'near_duplicates', _near_duplicates),
+    (5, 'screening_runs', _screening_runs),
+    (6, 'resume_text_blobs', _resume_text_blobs),
+    (7, 'embedding_versions', _embedding_versions),
+    (8, 'embedding_revisions', _embedding_revisions),
+    (9, 'run_file_retries', _run_file_retries),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """
+    Schema version of a database
+
+    :param conn: Database connection
+    :return: Highest applied migration, 0 for an unversioned database
+    """
+    if not _table_exists(conn, 'schema_migrations'):
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Upgrade a database in place to the latest schema
+
+    Migrations are idempotent and commit in batches, so an interrupted upgrade
+    simply resumes from the start of the migration it was in.
+
+    :param conn: Database connection
+    :param batch_size: Rows rewritten per transaction
+    :return: Schema version after the upgrade
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            seconds REAL
+        )
+    ''')
+    version = current_version(conn)
+
+    for target, name, upgrade in MIGRATIONS:
+        if target <= version:
+            continue
+        start = time.perf_counter()
+        logger.info(f"Applying schema migration {target} ({name})")
+        upgrade(conn, batch_size)
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_migrations (version, name, seconds) VALUES (?, ?, ?)",
+            (target, name, round(time.perf_counter() - start, 3))
+        )
+        conn.commit()
+        version = target
+
+    return version
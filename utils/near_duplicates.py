@@ -0,0 +1,222 @@
+import re
+import zlib
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import metrics
+
+# Mersenne prime 2^31 - 1: hash values stay below it, so (a * x + b) fits in uint64
+_PRIME = np.uint64((1 << 31) - 1)
+
+SHINGLE_WORDS = 5
+
+# Default minimum estimated Jaccard similarity of two resumes to count as duplicates
+DEFAULT_THRESHOLD = 0.85
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """
+    Hash the overlapping word n-grams of a text
+
+    :param text: Resume text
+    :param size: Words per shingle
+    :return: Unique 31-bit shingle hashes
+    """
+    words = re.findall(r'\w+', (text or '').lower())
+    if len(words) < size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = (' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return np.unique(np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64)) % _PRIME
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, bands: int = 16, seed: int = 1):
+        """
+        MinHash signatures with banded locality-sensitive hashing
+
+        Two texts land in the same bucket of at least one band with high
+        probability once their shingle Jaccard similarity exceeds roughly
+        ``(1 / bands) ** (1 / rows)``; with 128 permutations in 16 bands of 8
+        rows that is about 0.7. Bucket hits are then verified on the full signature.
+
+        :param num_perm: Signature length
+        :param bands: LSH bands (must divide ``num_perm``)
+        :param seed: Seed for the hash permutations; signatures are only comparable under the same seed
+        """
+        if num_perm % bands:
+            raise ValueError(f"{bands} bands do not divide {num_perm} permutations")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+    @metrics.timer('minhash_signature')
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text
+
+        :param text: Resume text
+        :return: uint32 array of length ``num_perm`` (all max values for empty text)
+        """
+        hashes = shingles(text)
+        if not len(hashes):
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        LSH bucket of every band
+
+        :param signature: MinHash signature
+        :return: List of (band, bucket) pairs
+        """
+        return [
+            (band, zlib.crc32(signature[band * self.rows:(band + 1) * self.rows].tobytes()))
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """
+        Estimated Jaccard similarity: the fraction of equal signature positions
+
+        :param signature: MinHash signature
+        :param others: One signature or a 2-D array of them
+        :return: Similarity per signature
+        """
+        return (np.atleast_2d(others) == signature).mean(axis=1)
+
+
+class NearDuplicateDetector:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, hasher: Optional[MinHasher] = None):
+        """
+        In-memory near-duplicate detection for one batch of documents, e.g. a CV folder
+
+        :param threshold: Minimum estimated Jaccard similarity to count as a duplicate
+        :param hasher: MinHasher to use (default 128 permutations, 16 bands)
+        """
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self._buckets: Dict[Tuple[int, int], List[Hashable]] = defaultdict(list)
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self.canonical: Dict[Hashable, Hashable] = {}
+
+    def add(self, key: Hashable, text: str) -> Optional[Hashable]:
+        """
+        Register a document
+
+        :param key: Document key (e.g. the CV path)
+        :param text: Extracted text
+        :return: Key of the canonical document this one duplicates, or None if it is new
+        """
+        return self.add_signature(key, self.hasher.signature(text))
+
+    def add_signature(self, key: Hashable, signature: np.ndarray) -> Optional[Hashable]:
+        """
+        Register a document by its MinHash signature
+
+        :param key: Document key
+        :param signature: Signature from ``hasher``
+        :return: Key of the canonical document this one duplicates, or None if it is new
+        """
+        band_keys = self.hasher.band_keys(signature)
+
+        matches = {other for band_key in band_keys for other in self._buckets.get(band_key, ())}
+        if matches:
+            matches = list(matches)
+            scores = self.hasher.similarity(signature, np.stack([self._signatures[other] for other in matches]))
+            best = int(scores.argmax())
+            if scores[best] >= self.threshold:
+                canonical = self.canonical.get(matches[best], matches[best])
+                self.canonical[key] = canonical
+                metrics.increment('near_duplicates')
+                return canonical
+
+        self.restore(key, signature)
+        return None
+
+    def restore(self, key: Hashable, signature: Optional[np.ndarray] = None, canonical: Optional[Hashable] = None):
+        """
+        Re-register a document classified earlier, e.g. when resuming a run, without matching it again
+
+        :param key: Document key
+        :param signature: Signature of a canonical document, indexed for later matches
+        :param canonical: Key of the canonical document, if this one is a duplicate
+        """
+        if canonical is not None:
+            self.canonical[key] = canonical
+        elif signature is not None:
+            # Only canonical documents are indexed; later copies match them directly
+            self._signatures[key] = signature
+            for band_key in self.hasher.band_keys(signature):
+                self._buckets[band_key].append(key)
+
+    def clusters(self) -> Dict[Hashable, List[Hashable]]:
+        """
+        Duplicate clusters found so far
+
+        :return: Canonical key -> keys of its duplicates
+        """
+        clusters: Dict[Hashable, List[Hashable]] = defaultdict(list)
+        for key, canonical in self.canonical.items():
+            clusters[canonical].append(key)
+        return dict(clusters)
+
+
+def find_near_duplicate(conn: sqlite3.Connection, hasher: MinHasher, signature: np.ndarray,
+                        threshold: float) -> Optional[int]:
+    """
+    Look up a stored candidate whose resume is a near-duplicate of a signature
+
+    :param conn: Database connection
+    :param hasher: MinHasher the stored signatures were made with
+    :param signature: MinHash signature of the new resume
+    :param threshold: Minimum estimated Jaccard similarity
+    :return: Canonical candidate ID, or None
+    """
+    band_keys = hasher.band_keys(signature)
+    rows = conn.execute(
+        f'''
+        SELECT m.candidate_id, m.signature, COALESCE(c.canonical_candidate_id, c.id)
+        FROM candidate_minhash m
+        JOIN candidates c ON c.id = m.candidate_id
+        WHERE m.candidate_id IN (
+            SELECT candidate_id FROM candidate_lsh
+            WHERE {' OR '.join(['(band = ? AND bucket = ?)'] * len(band_keys))}
+        )
+        ''',
+        [value for band_key in band_keys for value in band_key]
+    ).fetchall()
+    if not rows:
+        return None
+
+    signatures = np.frombuffer(b''.join(row[1] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+    scores = hasher.similarity(signature, signatures)
+    best = int(scores.argmax())
+    return rows[best][2] if scores[best] >= threshold else None
+
+
+def store_signature(conn: sqlite3.Connection, hasher: MinHasher, candidate_id: int, signature: np.ndarray):
+    """
+    Index a canonical candidate's signature for later lookups (caller commits)
+
+    :param conn: Database connection
+    :param hasher: MinHasher the signature was made with
+    :param candidate_id: Candidate ID
+    :param signature: MinHash signature
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO candidate_minhash (candidate_id, signature) VALUES (?, ?)",
+        (candidate_id, signature.astype(np.uint32).tobytes())
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO candidate_lsh (band, bucket, candidate_id) VALUES (?, ?, ?)",
+        [(band, bucket, candidate_id) for band, bucket in hasher.band_keys(signature)]
+    )
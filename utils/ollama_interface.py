@@ -1,6 +1,7 @@
 import requests
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from utils.logger import metrics
 
 class OllamaInterface:
     def __init__(self, host: str = 'http://localhost:11434', model: str = 'llama3'):
@@ -13,31 +14,48 @@ class OllamaInterface:
         self.host = host
         self.model = model
 
-    def generate(self, prompt: str, max_tokens: int = 500) -> str:
+    def generate(self, prompt: str, max_tokens: int = 500, timeout: Optional[float] = None) -> str:
         """
         Generate text using Ollama
         
         :param prompt: Input prompt
         :param max_tokens: Maximum tokens to generate
+        :param timeout: Seconds to wait for the answer (no limit if omitted)
         :return: Generated text
         """
+        return self.generate_with_usage(prompt, max_tokens, timeout)[0]
+
+    @metrics.timer('generate')
+    def generate_with_usage(self, prompt: str, max_tokens: int = 500,
+                            timeout: Optional[float] = None) -> Tuple[str, int]:
+        """
+        Generate text using Ollama, reporting the tokens it cost
+        
+        :param prompt: Input prompt
+        :param max_tokens: Maximum tokens to generate
+        :param timeout: Seconds to wait for the answer (no limit if omitted)
+        :return: Tuple of (generated text, prompt and generated tokens; 0 if unknown)
+        """
         url = f'{self.host}/api/generate'
         payload = {
             'model': self.model,
             'prompt': prompt,
             'stream': False,
             'options': {
-                'max_tokens': max_tokens
+                'max_tokens': max_tokens,
+                # Ollama's own name for the generation cap
+                'num_predict': max_tokens
             }
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = requests.post(url, json=payload, timeout=timeout)
             response.raise_for_status()
-            return response.json()['response']
+            body = response.json()
+            return body['response'], body.get('prompt_eval_count', 0) + body.get('eval_count', 0)
         except requests.RequestException as e:
             print(f"Ollama generation error: {e}")
-            return ""
+            return "", 0
 
     def summarize_job_description(self, job_description: str) -> Dict[str, Any]:
         """
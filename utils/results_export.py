@@ -0,0 +1,305 @@
+import os
+import sys
+import argparse
+import datetime
+import logging
+import sqlite3
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from config import Config
+from models.embedding_model import EmbeddingModel
+from models.embedding_versions import active_model_version
+from models.match_scoring import MultiFactorScorer
+from utils.database_manager import DatabaseManager
+from utils.logger import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pads = pafs = pq = None
+
+logger = logging.getLogger('job_screening_system.results_export')
+
+# Datasets written under the export folder, each partitioned as job_id=<id>/run_date=<YYYY-MM-DD>
+MATCHES_DATASET = 'job_matches'
+RUNS_DATASET = 'screening_runs'
+
+# One file per partition, rewritten as a whole when the partition is exported again
+PART_FILE = 'part-0.parquet'
+
+# Factor columns of the multi-factor match score (see models.match_scoring.FEATURES)
+FACTOR_COLUMNS = ('embedding', 'skills', 'experience', 'education')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet export (pip install pyarrow)")
+
+
+def partitioning() -> 'pads.Partitioning':
+    """Hive-style job_id=<id>/run_date=<YYYY-MM-DD> partitioning shared by both datasets"""
+    _require_pyarrow()
+    return pads.partitioning(pa.schema([('job_id', pa.int64()), ('run_date', pa.date32())]), flavor='hive')
+
+
+def matches_schema() -> 'pa.Schema':
+    """Columns of the job_matches dataset (job_id and run_date come from the partition path)"""
+    _require_pyarrow()
+    return pa.schema(
+        [
+            ('job_title', pa.string()),
+            ('candidate_id', pa.int64()),
+            ('candidate_name', pa.string()),
+            ('email', pa.string()),
+            ('resume_path', pa.string()),
+            ('canonical_candidate_id', pa.int64()),
+            ('match_score', pa.float32()),
+            ('status', pa.string()),
+        ] + [(f'factor_{name}', pa.float32()) for name in FACTOR_COLUMNS]
+    )
+
+
+def runs_schema() -> 'pa.Schema':
+    """Columns of the screening_runs dataset (job_id and run_date come from the partition path)"""
+    _require_pyarrow()
+    return pa.schema([
+        ('run_id', pa.int64()),
+        ('job_title', pa.string()),
+        ('model_version', pa.string()),
+        ('cv_path', pa.string()),
+        ('candidate_name', pa.string()),
+        ('status', pa.string()),
+        ('match_score', pa.float32()),
+        ('canonical_path', pa.string()),
+        ('error', pa.string()),
+        ('embedding', pa.list_(pa.float32())),
+    ])
+
+
+def _embedding_array(blobs: List[Optional[bytes]]) -> 'pa.ListArray':
+    """Float32 BLOBs as one list array, without a Python object per value"""
+    lengths = np.fromiter((len(blob) // 4 if blob else 0 for blob in blobs), dtype=np.int32, count=len(blobs))
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int32)])
+    values = np.frombuffer(b''.join(blob for blob in blobs if blob), dtype=np.float32)
+    mask = pa.array([blob is None for blob in blobs])
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values), mask=mask)
+
+
+def write_partition(directory: str, schema: 'pa.Schema', batches: Iterator['pa.RecordBatch']) -> int:
+    """
+    Stream record batches into a partition's Parquet file, replacing it atomically
+
+    Each batch becomes a row group, so only one batch is held in memory at a time.
+
+    :param directory: Partition folder
+    :param schema: Schema of the batches
+    :param batches: Record batches
+    :return: Rows written
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, PART_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+
+def _match_batches(conn: sqlite3.Connection, job_id: int, batch_rows: int,
+                   factors: Optional[Callable[[int, np.ndarray], np.ndarray]]) -> Iterator['pa.RecordBatch']:
+    schema = matches_schema()
+    cursor = conn.execute(
+        '''
+        SELECT jd.title, jm.candidate_id, c.name, c.email, c.resume_path, c.canonical_candidate_id,
+               jm.match_score, jm.status
+        FROM job_matches jm
+        JOIN candidates c ON c.id = jm.candidate_id
+        LEFT JOIN job_descriptions jd ON jd.id = jm.job_id
+        WHERE jm.job_id = ?
+        ORDER BY jm.match_score DESC
+        ''',
+        (job_id,)
+    )
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        candidate_ids = np.asarray(columns[1], dtype=np.int64)
+        factor_matrix = factors(job_id, candidate_ids) if factors is not None else None
+        arrays = [pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+        for index in range(len(FACTOR_COLUMNS)):
+            arrays.append(
+                pa.nulls(len(rows), pa.float32()) if factor_matrix is None
+                else pa.array(factor_matrix[:, index], type=pa.float32(), from_pandas=True)
+            )
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _run_batches(conn: sqlite3.Connection, job_id: int, run_date: str,
+                 batch_rows: int) -> Iterator['pa.RecordBatch']:
+    schema = runs_schema()
+    cursor = conn.execute(
+        '''
+        SELECT r.id, r.job_title, r.model_version, f.path, f.status, f.match_score, f.canonical_path, f.error,
+               f.embedding
+        FROM screening_runs r
+        JOIN screening_run_files f ON f.run_id = r.id
+        WHERE r.job_id = ? AND r.status = 'published' AND date(r.started_at) = ?
+        ORDER BY r.id, f.path
+        ''',
+        (job_id, run_date)
+    )
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        run_ids, titles, models, paths, statuses, scores, canonical_paths, errors, embeddings = zip(*rows)
+        names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+        yield pa.RecordBatch.from_arrays([
+            pa.array(run_ids, type=pa.int64()),
+            pa.array(titles, type=pa.string()),
+            pa.array(models, type=pa.string()),
+            pa.array(paths, type=pa.string()),
+            pa.array(names, type=pa.string()),
+            pa.array(statuses, type=pa.string()),
+            pa.array(scores, type=pa.float32()),
+            pa.array(canonical_paths, type=pa.string()),
+            pa.array(errors, type=pa.string()),
+            _embedding_array(embeddings)
+        ], schema=schema)
+
+
+@metrics.timer('export_results')
+def export_results(conn: sqlite3.Connection, out_dir: str, job_ids: Optional[List[int]] = None,
+                   batch_rows: int = Config.EXPORT_BATCH_ROWS,
+                   factors: Optional[Callable[[int, np.ndarray], np.ndarray]] = None,
+                   snapshot_date: Optional[datetime.date] = None) -> Dict[str, int]:
+    """
+    Export screening results to partitioned Parquet datasets
+
+    Two datasets are written under ``out_dir``, both partitioned by job and
+    date (``job_id=<id>/run_date=<YYYY-MM-DD>``):
+
+    - ``job_matches``: every stored job x candidate score with candidate
+      metadata, as a snapshot dated ``snapshot_date``
+    - ``screening_runs``: every CV of each published ``main.py`` run with its
+      score, outcome and embedding, dated by the day the run started
+
+    Rows are streamed from SQLite in record batches of ``batch_rows``, so
+    memory stays bounded however large the results are.
+
+    :param conn: Database connection
+    :param out_dir: Export folder
+    :param job_ids: Only export these jobs (all jobs if omitted)
+    :param batch_rows: Rows per record batch (and Parquet row group)
+    :param factors: Optional ``(job_id, candidate_ids) -> matrix`` giving the factor columns of the
+        multi-factor score, e.g. from ``MultiFactorScorer``
+    :param snapshot_date: Partition date of the job_matches snapshot (defaults to today)
+    :return: Rows written per dataset
+    """
+    _require_pyarrow()
+    snapshot = (snapshot_date or datetime.date.today()).isoformat()
+    wanted = f"IN ({','.join('?' * len(job_ids))})" if job_ids else "IS NOT NULL"
+    params = list(job_ids or [])
+    written = {MATCHES_DATASET: 0, RUNS_DATASET: 0}
+
+    match_jobs = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT job_id FROM job_matches WHERE job_id {wanted} ORDER BY job_id", params
+    ).fetchall()]
+    for job_id in match_jobs:
+        directory = os.path.join(out_dir, MATCHES_DATASET, f'job_id={job_id}', f'run_date={snapshot}')
+        written[MATCHES_DATASET] += write_partition(
+            directory, matches_schema(), _match_batches(conn, job_id, batch_rows, factors)
+        )
+
+    run_partitions = conn.execute(
+        f"SELECT DISTINCT job_id, date(started_at) FROM screening_runs "
+        f"WHERE status = 'published' AND job_id {wanted} ORDER BY 1, 2",
+        params
+    ).fetchall()
+    for job_id, run_date in run_partitions:
+        directory = os.path.join(out_dir, RUNS_DATASET, f'job_id={job_id}', f'run_date={run_date}')
+        written[RUNS_DATASET] += write_partition(directory, runs_schema(), _run_batches(conn, job_id, run_date,
+                                                                                         batch_rows))
+
+    logger.info(f"Exported {written[MATCHES_DATASET]} matches for {len(match_jobs)} jobs and "
+                f"{written[RUNS_DATASET]} screened CVs from {len(run_partitions)} run partitions to {out_dir}")
+    return written
+
+
+def read_results(out_dir: str, dataset: str = MATCHES_DATASET, job_id: Optional[int] = None,
+                 columns: Optional[List[str]] = None) -> 'pa.Table':
+    """
+    Read an exported dataset, memory-mapping its files
+
+    :param out_dir: Export folder
+    :param dataset: ``MATCHES_DATASET`` or ``RUNS_DATASET``
+    :param job_id: Only read this job's partitions
+    :param columns: Columns to read (all if omitted); job_id and run_date are available too
+    :return: Arrow table (``.to_pandas()`` for a DataFrame)
+    """
+    _require_pyarrow()
+    source = pads.dataset(
+        os.path.join(out_dir, dataset),
+        format='parquet',
+        partitioning=partitioning(),
+        # Column chunks are mapped from the page cache rather than read into fresh buffers
+        filesystem=pafs.LocalFileSystem(use_mmap=True)
+    )
+    return source.to_table(
+        columns=columns,
+        filter=(pads.field('job_id') == job_id) if job_id is not None else None
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export screening results to partitioned Parquet")
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help="Screening database")
+    parser.add_argument('--out', default=Config.EXPORT_DIR, help="Export folder")
+    parser.add_argument('--job-id', type=int, action='append', dest='job_ids',
+                        help="Only export this job (repeatable)")
+    parser.add_argument('--batch-rows', type=int, default=Config.EXPORT_BATCH_ROWS)
+    parser.add_argument('--factors', action='store_true',
+                        help="Add the multi-factor score columns (loads the embedding model)")
+    args = parser.parse_args()
+
+    # Opening through DatabaseManager upgrades older databases to the current schema
+    db = DatabaseManager(args.db)
+
+    factors = None
+    if args.factors:
+        scorer = MultiFactorScorer(EmbeddingModel(active_model_version(db.conn)))
+
+        def factors(job_id: int, candidate_ids: np.ndarray) -> np.ndarray:
+            ids, _, matrix = scorer.score(db.conn, job_id, candidate_ids)
+            # Candidates the scorer does not know keep NaN factors
+            aligned = np.full((len(candidate_ids), matrix.shape[1]), np.nan, dtype=np.float32)
+            rows = {candidate_id: row for row, candidate_id in enumerate(ids.tolist())}
+            for index, candidate_id in enumerate(candidate_ids.tolist()):
+                if candidate_id in rows:
+                    aligned[index] = matrix[rows[candidate_id]]
+            return aligned
+
+    try:
+        written = export_results(db.conn, args.out, args.job_ids, args.batch_rows, factors)
+    finally:
+        db.close()
+    print(f"Wrote {written[MATCHES_DATASET]} matches and {written[RUNS_DATASET]} screened CVs to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
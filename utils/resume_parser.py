@@ -0,0 +1,106 @@
+import io
+import os
+import warnings
+from typing import BinaryIO, Iterator, Optional, Union
+
+# Suppress warnings about python-docx
+warnings.filterwarnings("ignore", category=UserWarning)
+
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf', '.docx', '.doc')
+
+# Characters read per chunk from plain-text resumes
+TEXT_CHUNK_CHARS = 1 << 16
+
+
+class ResumeTooLongError(ValueError):
+    """Raised when a resume has more pages than the extraction limit allows"""
+
+
+def _load_docx():
+    """python-docx, or None if it is not installed"""
+    try:
+        import python_docx as docx
+    except ImportError:
+        try:
+            import docx
+        except ImportError:
+            docx = None
+    return docx
+
+
+# The parser libraries are imported on first use: together they take a quarter of a second to import,
+# which every process importing this module (the web app, the CLI) would otherwise pay up front
+def _iter_pdf(source: BinaryIO, max_pages: Optional[int]) -> Iterator[str]:
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(source)
+    pages = len(pdf_reader.pages)
+    if max_pages is not None and pages > max_pages:
+        raise ResumeTooLongError(f"{pages} pages exceeds the limit of {max_pages}")
+    for number, page in enumerate(pdf_reader.pages):
+        if number:
+            yield ' '
+        yield page.extract_text() or ''
+
+
+def iter_text(source: Union[str, BinaryIO], extension: Optional[str] = None,
+              max_pages: Optional[int] = None) -> Iterator[str]:
+    """
+    Stream the text of a resume page by page (paragraph by paragraph for Word files)
+
+    :param source: Path to the resume, or a binary file-like object (e.g. an upload)
+    :param extension: File extension, required when ``source`` is not a path
+    :param max_pages: Refuse PDFs with more pages than this
+    :return: Iterator of text pieces that concatenate to the full text
+    """
+    if extension is None:
+        extension = os.path.splitext(source)[1]
+    extension = extension.lower()
+
+    if extension == '.pdf':
+        # PDF text extraction
+        if isinstance(source, str):
+            with open(source, 'rb') as file:
+                yield from _iter_pdf(file, max_pages)
+        else:
+            yield from _iter_pdf(source, max_pages)
+        return
+
+    if extension in ('.docx', '.doc'):
+        docx = _load_docx()
+        if docx is None:
+            raise ImportError('python-docx library not installed')
+
+        # Word document text extraction
+        doc = docx.Document(source)
+        for para in doc.paragraphs:
+            yield para.text + '\n'
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    yield cell.text + '\n'
+        return
+
+    # Plain text or unsupported format
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8', errors='replace') as file:
+            yield from iter(lambda: file.read(TEXT_CHUNK_CHARS), '')
+    else:
+        file = io.TextIOWrapper(source, encoding='utf-8', errors='replace')
+        yield from iter(lambda: file.read(TEXT_CHUNK_CHARS), '')
+
+
+def extract_text(source: Union[str, BinaryIO], extension: Optional[str] = None,
+                 max_pages: Optional[int] = None) -> str:
+    """
+    Extract text from a resume on disk or in memory
+
+    :param source: Path to the resume, or a binary file-like object (e.g. an upload)
+    :param extension: File extension, required when ``source`` is not a path
+    :param max_pages: Refuse PDFs with more pages than this
+    :return: Extracted text
+    """
+    buffer = io.StringIO()
+    for piece in iter_text(source, extension, max_pages):
+        buffer.write(piece)
+    return buffer.getvalue()
\ No newline at end of file
@@ -0,0 +1,94 @@
+import zlib
+import sqlite3
+from typing import Optional, Tuple
+
+from config import Config
+from utils.logger import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+RESUME_TEXT_CODECS = ('zstd', 'zlib')
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def default_codec() -> str:
+    """
+    Codec new resume text is compressed with
+
+    :return: ``RESUME_TEXT_CODEC``, or 'zlib' when zstandard is not installed
+    """
+    if Config.RESUME_TEXT_CODEC not in RESUME_TEXT_CODECS:
+        raise ValueError(f"Unsupported resume text codec '{Config.RESUME_TEXT_CODEC}', "
+                         f"expected one of {RESUME_TEXT_CODECS}")
+    return 'zstd' if Config.RESUME_TEXT_CODEC == 'zstd' and zstandard is not None else 'zlib'
+
+
+def compress_text(text: str, codec: Optional[str] = None) -> Tuple[str, bytes]:
+    """
+    Compress resume text for storage
+
+    :param text: Resume text
+    :param codec: 'zstd' or 'zlib' (``default_codec()`` if omitted)
+    :return: Tuple of (codec used, compressed bytes)
+    """
+    codec = codec or default_codec()
+    data = text.encode('utf-8')
+    if codec == 'zstd':
+        return codec, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return codec, zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_text(codec: str, blob: bytes) -> str:
+    """
+    Restore stored resume text
+
+    :param codec: Codec the text was compressed with
+    :param blob: Compressed bytes
+    :return: Resume text
+    """
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read resume text stored with zstd")
+        return zstandard.ZstdDecompressor().decompress(blob).decode('utf-8')
+    if codec == 'zlib':
+        return zlib.decompress(blob).decode('utf-8')
+    raise ValueError(f"Unsupported resume text codec '{codec}'")
+
+
+def save_resume_text(conn: sqlite3.Connection, candidate_id: int, text: str, codec: Optional[str] = None):
+    """
+    Store a candidate's resume text, compressed (caller commits)
+
+    :param conn: Database connection
+    :param candidate_id: ID of the candidate
+    :param text: Resume text (nothing is stored if empty)
+    :param codec: 'zstd' or 'zlib' (``default_codec()`` if omitted)
+    """
+    if not text:
+        return
+    codec, blob = compress_text(text, codec)
+    conn.execute(
+        "INSERT OR REPLACE INTO candidate_resume_text (candidate_id, codec, length, text) VALUES (?, ?, ?, ?)",
+        (candidate_id, codec, len(text), blob)
+    )
+
+
+@metrics.timer('load_resume_text')
+def load_resume_text(conn: sqlite3.Connection, candidate_id: int) -> Optional[str]:
+    """
+    Read one candidate's resume text
+
+    :param conn: Database connection
+    :param candidate_id: ID of the candidate
+    :return: Resume text, or None if none was stored
+    """
+    row = conn.execute(
+        "SELECT codec, text FROM candidate_resume_text WHERE candidate_id = ?", (candidate_id,)
+    ).fetchone()
+    return decompress_text(*row) if row else None
+
@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from utils.database_manager import DatabaseManager
+from utils.near_duplicates import NearDuplicateDetector
+from utils.top_k import TopKSelector
+from utils.logger import metrics
+
+logger = logging.getLogger('job_screening_system.screening_runs')
+
+# Run statuses; a run that is still 'running' after its process died is resumable like a failed one
+RUNNING = 'running'
+FAILED = 'failed'
+PUBLISHED = 'published'
+
+# Outcomes of one CV in a run
+SCORED = 'scored'
+DUPLICATE = 'duplicate'
+REJECTED = 'rejected'
+
+_INSERT_FILES = '''
+    INSERT OR REPLACE INTO screening_run_files
+    (run_id, path, status, match_score, canonical_path, error, embedding, minhash, retryable)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def run_file_row(run_id: int, path: str, status: str, match_score: Optional[float] = None,
+                 embedding: Optional[np.ndarray] = None, minhash: Optional[np.ndarray] = None,
+                 canonical_path: Optional[str] = None, error: Optional[str] = None,
+                 retryable: bool = False) -> tuple:
+    """
+    One CV's outcome as a ``screening_run_files`` row, see ``ScreeningRun.record``
+
+    :return: Row for ``store_run_files``
+    """
+    return (
+        run_id, path, status, match_score, canonical_path, error,
+        None if embedding is None else np.asarray(embedding, dtype=np.float32).tobytes(),
+        None if minhash is None else np.asarray(minhash, dtype=np.uint32).tobytes(), int(retryable)
+    )
+
+
+def store_run_files(conn: sqlite3.Connection, rows: List[tuple]):
+    """
+    Write CV outcome rows of a run (caller commits)
+
+    :param conn: Database connection
+    :param rows: Rows from ``run_file_row``
+    """
+    conn.executemany(_INSERT_FILES, rows)
+
+
+def _candidate(path: str, match_score: float) -> Dict[str, Any]:
+    return {
+        'candidate_name': os.path.splitext(os.path.basename(path))[0],
+        'match_score': match_score,
+        'cv_path': path
+    }
+
+
+class ScreeningRun:
+    def __init__(self, db: DatabaseManager, row: Dict[str, Any], checkpoint_files: int = Config.RUN_CHECKPOINT_FILES,
+                 checkpoint_seconds: float = Config.RUN_CHECKPOINT_SECONDS):
+        """
+        Checkpointed state of one screening run (use ``start`` or ``resume``)
+
+        Every CV's outcome, with its embedding and MinHash signature, is
+        buffered and written to ``screening_run_files`` together with the
+        partial top-k every ``checkpoint_files`` CVs or ``checkpoint_seconds``
+        seconds, in one transaction. A resumed run skips the CVs it already
+        finished, so a crash costs at most one checkpoint interval. Sharded
+        scoring workers write their CVs' rows themselves, so embeddings never
+        travel back to this process; the top-k of a resumed run is therefore
+        rebuilt from the stored rows rather than the checkpointed list. CVs
+        rejected for a retryable reason (a worker that did not start, a
+        timeout, a scoring error) are not finished and are tried again.
+
+        :param db: Database holding the run tables
+        :param row: The run's ``screening_runs`` row
+        :param checkpoint_files: Checkpoint after this many CVs
+        :param checkpoint_seconds: Checkpoint after this many seconds, whichever comes first
+        """
+        self.db = db
+        self.run_id: int = row['id']
+        self.cvs_directory: str = row['cvs_directory']
+        self.job_title: str = row['job_title']
+        self.job_description: str = row['job_description']
+        self.model_version: str = row['model_version']
+        self.top_n: int = row['top_n']
+        self.min_score: Optional[float] = row['min_score']
+        self.duplicate_threshold: Optional[float] = row['duplicate_threshold']
+        self.status: str = row['status']
+        self.checkpoint_files = checkpoint_files
+        self.checkpoint_seconds = checkpoint_seconds
+
+        self.selector = TopKSelector(self.top_n, threshold=self.min_score)
+        self.processed = set()
+        # CVs rejected for a reason that may pass, tried again if they are still in the folder
+        self.retryable = set()
+        for path, status, match_score, retryable in db.conn.execute(
+            "SELECT path, status, match_score, retryable FROM screening_run_files WHERE run_id = ?", (self.run_id,)
+        ):
+            if status == REJECTED and retryable:
+                self.retryable.add(path)
+                continue
+            self.processed.add(path)
+            if status == SCORED:
+                self.selector.push(_candidate(path, match_score))
+
+        # Outcomes recorded since the last checkpoint; extraction failures may arrive from another thread
+        self._pending: List[tuple] = []
+        self._since_checkpoint = 0
+        self._lock = threading.Lock()
+        self._last_checkpoint = time.monotonic()
+
+    @property
+    def db_path(self) -> Optional[str]:
+        """File of the run's database, for other processes that write its rows (None if in memory)"""
+        for _, name, path in self.db.conn.execute("PRAGMA database_list"):
+            if name == 'main':
+                return path or None
+        return None
+
+    @staticmethod
+    def _load(db: DatabaseManager, run_id: int) -> Optional[Dict[str, Any]]:
+        cursor = db.conn.execute("SELECT * FROM screening_runs WHERE id = ?", (run_id,))
+        row = cursor.fetchone()
+        return None if row is None else dict(zip([column[0] for column in cursor.description], row))
+
+    @classmethod
+    def start(cls, db: DatabaseManager, cvs_directory: str, job_title: str, job_description: str, model_version: str,
+              top_n: int, min_score: Optional[float] = None, duplicate_threshold: Optional[float] = None,
+              **kwargs) -> 'ScreeningRun':
+        """
+        Register a new run
+
+        :param db: Database holding the run tables
+        :param cvs_directory: Folder of CVs being screened
+        :param job_title: Title of the job description
+        :param job_description: Job description text, kept so a resumed run scores against the same text
+        :param model_version: Embedding model the CVs are scored with
+        :param top_n: Number of top candidates to keep
+        :param min_score: Drop candidates scoring below this
+        :param duplicate_threshold: Near-duplicate threshold (None scores every CV)
+        :param kwargs: Checkpoint intervals, see ``ScreeningRun``
+        :return: The new run
+        """
+        cursor = db.conn.execute(
+            '''
+            INSERT INTO screening_runs
+            (cvs_directory, job_title, job_description, model_version, top_n, min_score, duplicate_threshold)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (os.path.abspath(cvs_directory), job_title, job_description, model_version, top_n, min_score,
+             duplicate_threshold)
+        )
+        db.conn.commit()
+        return cls(db, cls._load(db, cursor.lastrowid), **kwargs)
+
+    @classmethod
+    def resume(cls, db: DatabaseManager, run_id: int, **kwargs) -> 'ScreeningRun':
+        """
+        Reopen an interrupted run at its last checkpoint
+
+        :param db: Database holding the run tables
+        :param run_id: ID of the run
+        :param kwargs: Checkpoint intervals, see ``ScreeningRun``
+        :return: The run
+        :raises LookupError: If there is no such run
+        :raises ValueError: If the run was already published
+        """
+        row = cls._load(db, run_id)
+        if row is None:
+            raise LookupError(f"No screening run {run_id}")
+        if row['status'] == PUBLISHED:
+            raise ValueError(f"Screening run {run_id} was already published")
+        db.conn.execute("UPDATE screening_runs SET status = ? WHERE id = ?", (RUNNING, run_id))
+        db.conn.commit()
+        row['status'] = RUNNING
+        return cls(db, row, **kwargs)
+
+    def restore_detector(self, detector: NearDuplicateDetector):
+        """
+        Give a near-duplicate detector the CVs this run already classified
+
+        :param detector: Empty detector for the resumed run
+        """
+        for path, status, canonical_path, minhash in self.db.conn.execute(
+            "SELECT path, status, canonical_path, minhash FROM screening_run_files "
+            "WHERE run_id = ? AND status IN (?, ?) ORDER BY rowid",
+            (self.run_id, SCORED, DUPLICATE)
+        ):
+            if status == DUPLICATE:
+                detector.restore(path, canonical=canonical_path)
+            elif minhash is not None:
+                detector.restore(path, np.frombuffer(minhash, dtype=np.uint32))
+
+    def record(self, path: str, status: str, match_score: Optional[float] = None,
+               embedding: Optional[np.ndarray] = None, minhash: Optional[np.ndarray] = None,
+               canonical_path: Optional[str] = None, error: Optional[str] = None, retryable: bool = False,
+               stored: bool = False):
+        """
+        Record the outcome of one CV; it is persisted at the next checkpoint
+
+        :param path: CV path
+        :param status: ``SCORED``, ``DUPLICATE`` or ``REJECTED``
+        :param match_score: Score of a scored CV
+        :param embedding: Embedding of a scored CV
+        :param minhash: MinHash signature of a scored CV, to find its duplicates after a resume
+        :param canonical_path: CV that a duplicate copies
+        :param error: Why a CV was rejected
+        :param retryable: The rejection may not happen again, so a resumed run tries the CV again
+        :param stored: The row was already written (by a sharded scoring worker); only track it here
+        """
+        with self._lock:
+            self.processed.add(path)
+            self._since_checkpoint += 1
+            if not stored:
+                self._pending.append(run_file_row(self.run_id, path, status, match_score, embedding, minhash,
+                                                  canonical_path, error, retryable))
+            if status == SCORED:
+                self.selector.push(_candidate(path, match_score))
+
+    def maybe_checkpoint(self) -> bool:
+        """
+        Checkpoint if enough CVs or time have passed since the last one
+
+        :return: Whether a checkpoint was written
+        """
+        if self._since_checkpoint < self.checkpoint_files and \
+                time.monotonic() - self._last_checkpoint < self.checkpoint_seconds:
+            return False
+        self.checkpoint()
+        return True
+
+    @metrics.timer('run_checkpoint')
+    def checkpoint(self):
+        """Persist the outcomes recorded since the last checkpoint together with the partial top-k"""
+        with self._lock:
+            try:
+                store_run_files(self.db.conn, self._pending)
+                self.db.conn.execute(
+                    "UPDATE screening_runs SET processed = ?, top_candidates = ?, checkpointed_at = CURRENT_TIMESTAMP "
+                    "WHERE id = ?",
+                    (len(self.processed), json.dumps(self.selector.results()), self.run_id)
+                )
+                self.db.conn.commit()
+            except sqlite3.Error:
+                self.db.conn.rollback()
+                raise
+            self._pending = []
+            self._since_checkpoint = 0
+            self._last_checkpoint = time.monotonic()
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        """
+        Near-duplicate clusters found by this run (checkpoints first)
+
+        :return: Canonical CV path -> paths of its duplicates
+        """
+        self.checkpoint()
+        clusters: Dict[str, List[str]] = {}
+        for canonical_path, path in self.db.conn.execute(
+            "SELECT canonical_path, path FROM screening_run_files WHERE run_id = ? AND status = ? ORDER BY rowid",
+            (self.run_id, DUPLICATE)
+        ):
+            clusters.setdefault(canonical_path, []).append(path)
+        return clusters
+
+    def fail(self):
+        """Checkpoint what was done and mark the run failed, so it can be resumed"""
+        try:
+            self.checkpoint()
+            self.db.conn.execute("UPDATE screening_runs SET status = ? WHERE id = ?", (FAILED, self.run_id))
+            self.db.conn.commit()
+            self.status = FAILED
+        except sqlite3.Error as e:
+            logger.error(f"Could not checkpoint screening run {self.run_id}: {e}")
+
+    def publish(self, top_candidates: List[Dict[str, Any]]) -> int:
+        """
+        Make the run's shortlist the job's shortlist in one transaction
+
+        The job, its candidates and their matches are written, earlier
+        shortlisted matches of the job that did not make this shortlist go
+        back to 'pending' and the run is marked published, all in a single
+        commit. Readers see either the previous shortlist or this one.
+
+        :param top_candidates: Top candidates, best first, each with the paths of its 'duplicates'
+        :return: ID of the job description
+        """
+        self.checkpoint()
+        db = self.db
+        try:
+            job_id = db.get_or_create_job_description({
+                'title': self.job_title,
+                'raw_jd': self.job_description
+            }, commit=False)
+            shortlisted = []
+            for candidate in top_candidates:
+                candidate_id = db.get_or_create_candidate({
+                    'name': candidate['candidate_name'],
+                    'resume_path': candidate['cv_path']
+                }, commit=False)
+                db.insert_job_match(job_id, candidate_id, float(candidate['match_score']),
+                                    status='shortlisted', commit=False)
+                shortlisted.append(candidate_id)
+                # Record the copies as duplicates of the shortlisted candidate
+                for duplicate_path in candidate.get('duplicates', []):
+                    db.get_or_create_candidate({
+                        'name': os.path.splitext(os.path.basename(duplicate_path))[0],
+                        'resume_path': duplicate_path,
+                        'canonical_candidate_id': candidate_id
+                    }, commit=False)
+
+            placeholders = ','.join('?' * len(shortlisted))
+            db.conn.execute(
+                f'''
+                UPDATE job_matches
+                SET status = CASE WHEN candidate_id IN ({placeholders}) THEN 'shortlisted' ELSE 'pending' END
+                WHERE job_id = ? AND (status = 'shortlisted' OR (status = 'pending' AND candidate_id IN ({placeholders})))
+                ''',
+                shortlisted + [job_id] + shortlisted
+            )
+            db.conn.execute(
+                "UPDATE screening_runs SET status = ?, job_id = ?, published_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (PUBLISHED, job_id, self.run_id)
+            )
+            db.conn.commit()
+        except Exception:
+            db.conn.rollback()
+            raise
+        self.status = PUBLISHED
+        return job_id
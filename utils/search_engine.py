@@ -0,0 +1,126 @@
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+from models.embedding_model import EmbeddingModel
+from models.vector_index import VectorIndex
+from utils.database_manager import candidates_with_all_skills
+from utils.logger import metrics
+
+
+class CandidateSearchEngine:
+    def __init__(self, embedding_model: EmbeddingModel, index: VectorIndex,
+                 prefilter_limit: int = 1000, max_ranked_matches: int = 5000, rrf_k: int = 60):
+        """
+        Hybrid lexical + semantic candidate search
+
+        SQLite FTS5 (BM25) prefilters the candidate pool, the vector index scores
+        only that subset, and the two rankings are fused with reciprocal rank fusion.
+
+        :param embedding_model: Model used to embed queries
+        :param index: Vector index of candidate embeddings
+        :param prefilter_limit: Maximum FTS hits passed to the vector stage
+        :param max_ranked_matches: Skip BM25 ranking for queries matching more rows than this
+        :param rrf_k: Reciprocal rank fusion damping constant
+        """
+        self.embedding_model = embedding_model
+        self.index = index
+        self.prefilter_limit = prefilter_limit
+        self.max_ranked_matches = max_ranked_matches
+        self.rrf_k = rrf_k
+
+    @staticmethod
+    def to_fts_query(query: str, operator: str = 'OR') -> str:
+        """
+        Turn free recruiter text into a safe FTS5 query
+
+        Terms are quoted so punctuation like ``C++`` or a literal ``AND`` can't
+        break the syntax. With OR, BM25 ranks documents matching more terms higher.
+
+        :param query: Free-text query
+        :param operator: 'OR' or 'AND'
+        :return: FTS5 MATCH expression
+        """
+        terms = dict.fromkeys(term for term in re.findall(r'\w+', query.lower()) if len(term) > 1)
+        return f' {operator} '.join(f'"{term}"' for term in terms)
+
+    def lexical_search(self, conn: sqlite3.Connection, query: str) -> Optional[List[int]]:
+        """
+        Rank candidates with the FTS5 index
+
+        BM25 ordering costs time proportional to the number of matches, so an
+        unordered probe first checks the query is selective. If neither the OR
+        nor the AND form narrows the pool, ``None`` is returned and the caller
+        should rank on vectors alone.
+
+        :param conn: Database connection
+        :param query: Free-text query
+        :return: Candidate IDs, best match first (empty if nothing matches), or None if even the AND
+            form matches more than ``max_ranked_matches`` candidates, i.e. the text gives no usable prefilter
+        """
+        with metrics.timer('search_lexical'):
+            for operator in ('OR', 'AND'):
+                fts_query = self.to_fts_query(query, operator)
+                if not fts_query:
+                    return []
+
+                probe = conn.execute(
+                    "SELECT COUNT(*) FROM (SELECT rowid FROM candidate_fts WHERE candidate_fts MATCH ? LIMIT ?)",
+                    (fts_query, self.max_ranked_matches + 1)
+                ).fetchone()[0]
+                if probe <= self.max_ranked_matches:
+                    rows = conn.execute(
+                        "SELECT rowid FROM candidate_fts WHERE candidate_fts MATCH ? "
+                        "ORDER BY bm25(candidate_fts) LIMIT ?",
+                        (fts_query, self.prefilter_limit)
+                    ).fetchall()
+                    return [row[0] for row in rows]
+
+        metrics.increment('search_lexical_unselective')
+        return None
+
+    def search(self, conn: sqlite3.Connection, query: str, k: int = 20,
+               required_skills: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Return the top ``k`` candidates for a free-text query
+
+        :param conn: Database connection
+        :param query: Free-text recruiter query
+        :param k: Number of results
+        :param required_skills: Only candidates with all of these skills
+        :return: Results with fused score and the lexical/vector ranks behind it
+        """
+        with metrics.timer('search_candidates'):
+            # Hard skill requirements are an indexed SQL intersection, applied before any scoring
+            allowed = None
+            if required_skills:
+                allowed = candidates_with_all_skills(conn, required_skills)
+                if not allowed:
+                    return []
+
+            lexical_ids = self.lexical_search(conn, query)
+            if allowed is not None and lexical_ids is not None:
+                allowed_set = set(allowed)
+                lexical_ids = [candidate_id for candidate_id in lexical_ids if candidate_id in allowed_set]
+
+            with metrics.timer('search_vector'):
+                query_vector = self.embedding_model.encode_text(query)
+                if lexical_ids is not None and len(lexical_ids) >= k:
+                    vector_hits = self.index.search(query_vector, len(lexical_ids), restrict_to=lexical_ids)
+                else:
+                    # Too few keyword hits, or terms too common to narrow anything: use every allowed candidate
+                    vector_hits = self.index.search(query_vector, max(k, self.prefilter_limit), restrict_to=allowed)
+                    lexical_ids = lexical_ids or []
+
+            fused: Dict[int, Dict[str, Any]] = {}
+            for rank, candidate_id in enumerate(lexical_ids, start=1):
+                entry = fused.setdefault(candidate_id, {'candidate_id': candidate_id, 'score': 0.0})
+                entry['lexical_rank'] = rank
+                entry['score'] += 1.0 / (self.rrf_k + rank)
+            for rank, (candidate_id, similarity) in enumerate(vector_hits, start=1):
+                entry = fused.setdefault(candidate_id, {'candidate_id': candidate_id, 'score': 0.0})
+                entry['vector_rank'] = rank
+                entry['vector_score'] = similarity
+                entry['score'] += 1.0 / (self.rrf_k + rank)
+
+            return sorted(fused.values(), key=lambda x: x['score'], reverse=True)[:k]
\ No newline at end of file
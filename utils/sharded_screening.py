@@ -0,0 +1,260 @@
+import os
+import math
+import time
+import logging
+import sqlite3
+import multiprocessing
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from models.embedding_model import EmbeddingModel
+from utils.extraction_pool import ExtractionPool
+from utils.top_k import TopKSelector
+from utils.near_duplicates import NearDuplicateDetector
+from utils.screening_runs import ScreeningRun, SCORED, DUPLICATE, REJECTED, run_file_row, store_run_files
+from utils.logger import metrics
+
+logger = logging.getLogger('job_screening_system.sharded_screening')
+
+CV_EXTENSIONS = ('.txt', '.pdf', '.docx')
+
+# Shards per worker; smaller shards keep cores busy when CV sizes are uneven
+SHARDS_PER_WORKER = 4
+
+# Seconds a worker waits for the database while the parent or another worker writes to it
+RUN_WRITE_TIMEOUT = 60
+
+# Per-process state of a screening worker, set up once by the pool initializer
+_worker_model: Optional[EmbeddingModel] = None
+_worker_job_vector: Optional[np.ndarray] = None
+_worker_duplicate_threshold: Optional[float] = None
+# Connection and ID of the screening run the worker writes its CVs' outcomes to
+_worker_run: Optional[Tuple[sqlite3.Connection, int]] = None
+
+
+def list_cv_files(cvs_directory: str) -> List[str]:
+    """
+    List the CVs in a folder that the screening pipeline can read
+
+    :param cvs_directory: Folder containing CVs
+    :return: Sorted CV paths
+    """
+    return sorted(
+        os.path.join(cvs_directory, name) for name in os.listdir(cvs_directory)
+        if name.lower().endswith(CV_EXTENSIONS)
+    )
+
+
+def limit_threads(threads: int):
+    """
+    Cap the intra-op thread pools of the numeric libraries in this process
+
+    Without a cap every worker starts one thread per core and N workers
+    oversubscribe the machine N times over.
+
+    :param threads: Threads this process may use
+    """
+    for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+    # Tokenizer threads would compete with the worker processes too
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def score_cv(model: EmbeddingModel, cv_text: str, job_vector: np.ndarray) -> Tuple[float, np.ndarray]:
+    """
+    Embed a CV and score it against the job description's embedding
+
+    :param model: Embedding model
+    :param cv_text: CV text
+    :param job_vector: Embedding of the job description, computed once per run
+    :return: Tuple of (cosine similarity, CV embedding)
+    """
+    vector = np.asarray(model.encode_text(cv_text), dtype=np.float32)
+    norms = float(np.linalg.norm(vector) * np.linalg.norm(job_vector))
+    return (float(vector @ job_vector) / norms if norms else 0.0), vector
+
+
+def _init_worker(model_name: str, job_description_text: str, torch_threads: int,
+                 duplicate_threshold: Optional[float], run_db_path: Optional[str] = None,
+                 run_id: Optional[int] = None):
+    global _worker_model, _worker_job_vector, _worker_duplicate_threshold, _worker_run
+    limit_threads(torch_threads)
+    _worker_model = EmbeddingModel(model_name)
+    _worker_job_vector = np.asarray(_worker_model.encode_text(job_description_text), dtype=np.float32)
+    _worker_duplicate_threshold = duplicate_threshold
+    if run_db_path is not None:
+        _worker_run = (sqlite3.connect(run_db_path, timeout=RUN_WRITE_TIMEOUT), run_id)
+
+
+def _screen_shard(cvs: List[Tuple[str, str]], top_n: int, min_score: Optional[float]) -> Dict[str, Any]:
+    """
+    Score one shard of extracted ``(path, text)`` CVs in a worker and keep only its top ``top_n``
+
+    The outcome of every CV, with its embedding, is written to the run by the
+    worker itself; only ``(path, status, score, canonical path)`` goes back to
+    the parent, so what crosses processes does not grow with the embeddings.
+    """
+    start = time.perf_counter()
+    selector = TopKSelector(top_n, threshold=min_score)
+    # Duplicates are only detected within a shard; shards are contiguous runs of sorted paths
+    detector = NearDuplicateDetector(_worker_duplicate_threshold) if _worker_duplicate_threshold else None
+    # Outcome of every CV as (path, status, score, canonical path), with the rows written to the run
+    processed, failed, files, rows = 0, [], [], []
+    run_id = _worker_run[1] if _worker_run is not None else None
+    for resume_path, cv_text in cvs:
+        try:
+            canonical_path = detector.add(resume_path, cv_text) if detector is not None else None
+            if canonical_path is not None:
+                if run_id is not None:
+                    files.append((resume_path, DUPLICATE, None, canonical_path))
+                    rows.append(run_file_row(run_id, resume_path, DUPLICATE, canonical_path=canonical_path))
+                processed += 1
+                continue
+            match_score, vector = score_cv(_worker_model, cv_text, _worker_job_vector)
+            selector.push({
+                'candidate_name': os.path.splitext(os.path.basename(resume_path))[0],
+                'match_score': match_score,
+                'cv_path': resume_path
+            })
+            if run_id is not None:
+                files.append((resume_path, SCORED, match_score, None))
+                rows.append(run_file_row(run_id, resume_path, SCORED, match_score, vector))
+            processed += 1
+        except Exception as e:
+            failed.append((resume_path, str(e)))
+
+    if rows:
+        conn = _worker_run[0]
+        store_run_files(conn, rows)
+        conn.commit()
+
+    return {
+        'top': selector.results(),
+        'processed': processed,
+        'failed': failed,
+        'files': files,
+        'duplicates': detector.clusters() if detector is not None else {},
+        'seconds': time.perf_counter() - start,
+        'items': len(cvs)
+    }
+
+
+def shard_size(count: int, workers: int) -> int:
+    """
+    Number of CVs per shard, so every worker gets several shards
+
+    :param count: Number of CVs
+    :param workers: Number of worker processes
+    :return: Shard size
+    """
+    return max(1, math.ceil(count / (workers * SHARDS_PER_WORKER)))
+
+
+def extracted_shards(cv_paths: List[str], size: int, extractor: ExtractionPool,
+                     run: Optional[ScreeningRun] = None) -> Iterator[List[Tuple[str, str]]]:
+    """
+    Extract CVs in the sandboxed extraction pool and group them into contiguous shards
+
+    Files that fail extraction are logged, counted and left out.
+
+    :param cv_paths: CV paths
+    :param size: CVs per shard
+    :param extractor: Extraction pool
+    :param run: Screening run the failures are recorded in
+    :return: Iterator of shards of ``(path, text)`` pairs
+    """
+    shard = []
+    for extracted in extractor.imap(cv_paths):
+        if extracted.error is not None:
+            metrics.increment('cvs_failed')
+            logger.error(f"Error processing {os.path.basename(extracted.path)}: {extracted.error}")
+            if run is not None:
+                run.record(extracted.path, REJECTED, error=extracted.error, retryable=extracted.transient)
+            continue
+        shard.append((extracted.path, extracted.text))
+        if len(shard) == size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def screen_sharded(cv_paths: List[str], job_description_text: str, model_name: str,
+                   workers: Optional[int] = None, torch_threads: Optional[int] = None,
+                   top_n: int = 3, min_score: Optional[float] = None,
+                   duplicate_threshold: Optional[float] = None,
+                   duplicates: Optional[Dict[str, List[str]]] = None,
+                   extractor: Optional[ExtractionPool] = None,
+                   run: Optional[ScreeningRun] = None) -> List[Dict[str, Any]]:
+    """
+    Score CVs against a job description across several worker processes
+
+    CVs are extracted in the sandboxed extraction pool and streamed to the
+    scoring workers in shards. Each worker loads its own model once and
+    returns only the top ``top_n`` of every shard it scores; the partial
+    results are merged here. With a ``run``, workers write each CV's
+    outcome and embedding to the run's database themselves.
+
+    :param cv_paths: CV paths to score
+    :param job_description_text: Job description text
+    :param model_name: Embedding model each worker loads
+    :param workers: Number of worker processes (defaults to the CPU count)
+    :param torch_threads: Threads per worker (defaults to cores / workers)
+    :param top_n: Number of top candidates to return
+    :param min_score: Drop candidates scoring below this
+    :param duplicate_threshold: Skip CVs that near-duplicate an earlier CV of the same shard (None scores all)
+    :param duplicates: Filled with the duplicate clusters found, canonical path -> duplicate paths
+    :param extractor: Extraction pool to parse the CVs in (a default pool is created if omitted)
+    :param run: Screening run every CV's outcome is recorded and checkpointed in
+    :return: Top candidates sorted by match score
+    """
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, len(cv_paths) or 1))
+    torch_threads = torch_threads or max(1, cores // workers)
+    size = shard_size(len(cv_paths), workers)
+    logger.info(f"Screening {len(cv_paths)} CVs in shards of {size} across {workers} workers "
+                f"({torch_threads} threads each)")
+
+    # Spawn rather than fork: forking a process that already holds torch thread pools can deadlock
+    context = multiprocessing.get_context('spawn')
+    selector = TopKSelector(top_n, threshold=min_score)
+    owns_extractor = extractor is None
+    extractor = extractor or ExtractionPool()
+    try:
+        run_db_path = run.db_path if run is not None else None
+        if run is not None and run_db_path is None:
+            raise ValueError("Sharded screening runs need a database file that the workers can write to")
+        with context.Pool(workers, initializer=_init_worker,
+                          initargs=(model_name, job_description_text, torch_threads, duplicate_threshold,
+                                    run_db_path, run.run_id if run is not None else None)) as pool:
+            shards = extracted_shards(cv_paths, size, extractor, run)
+            for shard in pool.imap_unordered(partial(_screen_shard, top_n=top_n, min_score=min_score), shards):
+                metrics.observe('screen_shard', shard['seconds'], shard['items'])
+                metrics.increment('cvs_processed', shard['processed'])
+                metrics.increment('cvs_failed', len(shard['failed']))
+                metrics.increment('near_duplicates', sum(map(len, shard['duplicates'].values())))
+                if duplicates is not None:
+                    duplicates.update(shard['duplicates'])
+                for resume_path, error in shard['failed']:
+                    logger.error(f"Error processing {os.path.basename(resume_path)}: {error}")
+                selector.extend(shard['top'])
+                if run is not None:
+                    # The worker already stored these rows, embeddings included
+                    for resume_path, status, match_score, canonical_path in shard['files']:
+                        run.record(resume_path, status, match_score, canonical_path=canonical_path, stored=True)
+                    for resume_path, error in shard['failed']:
+                        run.record(resume_path, REJECTED, error=error, retryable=True)
+                    run.maybe_checkpoint()
+    finally:
+        if owns_extractor:
+            extractor.close()
+
+    return selector.results()
@@ -0,0 +1,169 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from utils.logger import metrics
+from utils.migrations import normalize_skill
+
+
+class SkillMatch(NamedTuple):
+    """One occurrence of a taxonomy skill in a text"""
+    skill_id: str
+    name: str
+    path: Tuple[str, ...]
+    start: int
+    end: int
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def iter_taxonomy(hierarchy: Mapping, path: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], str]]:
+    """
+    Walk a nested taxonomy of categories whose leaves are lists of skills
+
+    :param hierarchy: Nested dict of categories, with lists of skill names at the leaves
+    :param path: Categories above ``hierarchy``
+    :return: Iterator of (category path, skill name)
+    """
+    for category, children in hierarchy.items():
+        if isinstance(children, Mapping):
+            yield from iter_taxonomy(children, path + (category,))
+        else:
+            for name in children:
+                yield path + (category,), name
+
+
+class SkillExtractor:
+    def __init__(self, hierarchy: Mapping, synonyms: Optional[Mapping[str, Iterable[str]]] = None):
+        """
+        Find taxonomy skills in text with an Aho-Corasick automaton
+
+        Every skill name and synonym is compiled into one automaton, so a text
+        is scanned once, in time linear in its length plus the matches found,
+        however many terms the taxonomy has. Matching is case-insensitive,
+        treats any run of whitespace as one space and only accepts matches on
+        word boundaries ("Java" does not match inside "JavaScript").
+
+        :param hierarchy: Nested dict of categories, with lists of skill names at the leaves
+        :param synonyms: Skill name -> alternative spellings that map to it
+        """
+        # Skill ID (normalized name) -> (display name, category path)
+        self.skills: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: terms ending there as (skill ID, term length, left boundary needed), split by
+        # whether the term ends in a word character and so may only match at the end of a word
+        self._out_word: List[List[Tuple[str, int, bool]]] = [[]]
+        self._out_other: List[List[Tuple[str, int, bool]]] = [[]]
+
+        for path, name in iter_taxonomy(hierarchy):
+            skill_id = normalize_skill(name)
+            self.skills.setdefault(skill_id, (name, path + (name,)))
+            self._add_term(skill_id, name)
+        for name, aliases in (synonyms or {}).items():
+            skill_id = normalize_skill(name)
+            if skill_id not in self.skills:
+                raise ValueError(f"Synonyms given for '{name}', which is not in the taxonomy")
+            for alias in aliases:
+                self._add_term(skill_id, alias)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def _add_term(self, skill_id: str, term: str):
+        term = normalize_skill(term)
+        if not term:
+            return
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out_word.append([])
+                self._out_other.append([])
+            state = next_state
+        out = self._out_word if _is_word(term[-1]) else self._out_other
+        out[state].append((skill_id, len(term), _is_word(term[0])))
+
+    def _link(self):
+        """Breadth-first pass setting failure links and merging the outputs of suffix states"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out_word[child] = self._out_word[child] + self._out_word[self._fail[child]]
+                self._out_other[child] = self._out_other[child] + self._out_other[self._fail[child]]
+                queue.append(child)
+
+    def find_all(self, text: str) -> List[SkillMatch]:
+        """
+        Every skill occurrence in a text, leftmost-longest
+
+        Where terms overlap, the one starting first wins and, among those
+        starting at the same place, the longest, so "React.js" is React and
+        not also JavaScript for its "js".
+
+        :param text: Resume or job description text
+        :return: Non-overlapping matches in order of position (offsets into ``text``)
+        """
+        goto, fail = self._goto, self._fail
+        matches = []
+        # Original offset of every character fed to the automaton
+        offsets = []
+        state = 0
+        previous_space = True
+        for index, char in enumerate(text or ''):
+            if char.isspace():
+                if previous_space:
+                    continue
+                char, previous_space = ' ', True
+            else:
+                lowered = char.lower()
+                char, previous_space = (lowered if len(lowered) == 1 else char), False
+            offsets.append(index)
+
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            if not state:
+                continue
+            candidates = self._out_other[state]
+            # Terms ending in a word character only count where the word ends too
+            if index + 1 == len(text) or not _is_word(text[index + 1]):
+                candidates = candidates + self._out_word[state] if candidates else self._out_word[state]
+            for skill_id, length, left in candidates:
+                start = offsets[len(offsets) - length]
+                if left and start > 0 and _is_word(text[start - 1]):
+                    continue
+                name, path = self.skills[skill_id]
+                matches.append(SkillMatch(skill_id, name, path, start, index + 1))
+
+        accepted = []
+        for match in sorted(matches, key=lambda match: (match.start, -match.end)):
+            if not accepted or match.start >= accepted[-1].end:
+                accepted.append(match)
+        return accepted
+
+    @metrics.timer('skill_extraction')
+    def extract(self, text: str) -> List[SkillMatch]:
+        """
+        Distinct skills mentioned in a text
+
+        :param text: Resume or job description text
+        :return: First occurrence of each skill, in order of appearance
+        """
+        seen = {}
+        for match in self.find_all(text):
+            if match.skill_id not in seen or match.start < seen[match.skill_id].start:
+                seen[match.skill_id] = match
+        return sorted(seen.values(), key=lambda match: match.start)
@@ -0,0 +1,102 @@
+import heapq
+import itertools
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+class TopKSelector:
+    def __init__(self, k: Optional[int] = None, threshold: Optional[float] = None,
+                 key: Callable[[Any], float] = lambda item: item['match_score']):
+        """
+        Keep the ``k`` best-scoring items of a stream in O(k) memory
+
+        Items go into a bounded min-heap, so each push is O(log k) and the worst
+        kept item is evicted once the heap is full. Blocks of scores can be
+        pushed as NumPy arrays, in which case ``np.argpartition`` preselects the
+        block's top ``k`` before anything touches the heap.
+
+        :param k: Number of items to keep (None keeps every item above the threshold)
+        :param threshold: Drop items scoring below this
+        :param key: Function returning an item's score
+        """
+        self.k = k
+        self.threshold = threshold
+        self.key = key
+        self.seen = 0
+        self._heap: List[tuple] = []
+        # Ties are broken in favour of the item pushed first
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def min_score(self) -> Optional[float]:
+        """Score an item must beat to be kept, or None while the selector isn't full"""
+        if self.k is None or len(self._heap) < self.k:
+            return self.threshold
+        return self._heap[0][0]
+
+    def push(self, item: Any, score: Optional[float] = None) -> bool:
+        """
+        Offer one item
+
+        :param item: Item to keep
+        :param score: Item score (computed with ``key`` if omitted)
+        :return: Whether the item is currently kept
+        """
+        self.seen += 1
+        return self._offer(item, self.key(item) if score is None else float(score))
+
+    def _offer(self, item: Any, score: float) -> bool:
+        if self.threshold is not None and score < self.threshold:
+            return False
+
+        entry = (score, -next(self._counter), item)
+        if self.k is None or len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if self.k and entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def extend(self, items: Iterable[Any]) -> 'TopKSelector':
+        """
+        Offer many items, e.g. the partial results of another selector
+
+        :param items: Items to keep
+        :return: The selector, for chaining
+        """
+        for item in items:
+            self.push(item)
+        return self
+
+    def push_scores(self, scores: np.ndarray, items: Sequence[Any]) -> int:
+        """
+        Offer a block of items with precomputed scores
+
+        :param scores: 1-D array of scores
+        :param items: Items aligned with ``scores`` (any indexable, e.g. an ID array)
+        :return: Number of items kept from the block
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        self.seen += len(scores)
+        candidates = np.arange(len(scores))
+        if self.threshold is not None:
+            candidates = candidates[scores >= self.threshold]
+        if self.k is not None and len(candidates) > self.k:
+            top = np.argpartition(-scores[candidates], self.k - 1)[:self.k] if self.k else []
+            candidates = candidates[top]
+
+        # Offering in stream order keeps the first-pushed tie-break consistent with push()
+        return sum(self._offer(items[i], float(scores[i])) for i in np.sort(candidates))
+
+    def results(self) -> List[Any]:
+        """
+        Kept items, best first
+
+        :return: Sorted items
+        """
+        return [item for _, _, item in sorted(self._heap, reverse=True)]
@@ -1,40 +1,47 @@
 # File: c:\Users\megha\Downloads\hack\utils\view_job_description_csv.py
-import pandas as pd
+import os
+import sys
 
-def view_csv_details(file_path, encodings=None):
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.jd_loader import iter_job_description_chunks, sniff_encoding
+
+def view_csv_details(file_path, encoding=None, chunksize=10000):
     """
-    View details of a CSV file with multiple encoding attempts
+    View details of a CSV file, streaming it in chunks so large exports stay in constant memory
     """
-    if encodings is None:
-        encodings = ['utf-8', 'latin-1', 'windows-1252', 'iso-8859-1']
-    
-    for encoding in encodings:
-        try:
-            # Read the CSV file
-            df = pd.read_csv(file_path, encoding=encoding)
-            
-            # Print file details
-            print(f"Successfully read with {encoding} encoding")
-            print("\n--- CSV File Details ---")
-            print(f"Total Rows: {len(df)}")
-            print(f"Columns: {list(df.columns)}")
-            
-            # Print first few rows
-            print("\n--- First Few Rows ---")
-            print(df.head())
-            
-            # Print column types
-            print("\n--- Column Types ---")
-            print(df.dtypes)
-            
+    try:
+        encoding = encoding or sniff_encoding(file_path)
+        total_rows = 0
+        first_chunk = None
+
+        for chunk in iter_job_description_chunks(file_path, chunksize=chunksize, encoding=encoding):
+            if first_chunk is None:
+                first_chunk = chunk.head()
+            total_rows += len(chunk)
+
+        if first_chunk is None:
+            print("The file contains no rows")
             return
-        except Exception as e:
-            print(f"Failed with {encoding} encoding: {e}")
-    
-    print("Could not read the file with any encoding")
+
+        # Print file details
+        print(f"Successfully read with {encoding} encoding")
+        print("\n--- CSV File Details ---")
+        print(f"Total Rows: {total_rows}")
+        print(f"Columns: {list(first_chunk.columns)}")
+
+        # Print first few rows
+        print("\n--- First Few Rows ---")
+        print(first_chunk)
+
+        # Print column types (as inferred from the first chunk)
+        print("\n--- Column Types ---")
+        print(first_chunk.dtypes)
+    except Exception as e:
+        print(f"Failed with {encoding} encoding: {e}")
 
 def main():
-    file_path = r'c:\Users\megha\Downloads\hack\database\job_description.csv'
+    file_path = sys.argv[1] if len(sys.argv) > 1 else r'c:\Users\megha\Downloads\hack\database\job_description.csv'
     view_csv_details(file_path)
 
 if __name__ == "__main__":
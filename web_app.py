@@ -0,0 +1,523 @@
+import os
+import math
+import time
+import hashlib
+import tempfile
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+from flask import Flask, abort, current_app, jsonify, make_response, render_template, request
+
+from config import Config
+from models.embedding_model import EmbeddingModel
+from models.encoding_scheduler import EncodingScheduler
+from models.embedding_store import (EMBEDDING_TABLES, save_embeddings, load_embeddings, fetch_embeddings,
+                                    copy_canonical_embeddings)
+from models.embedding_versions import active_model_version, register_served_version
+from models.quantization import make_vector_index
+from models.vector_index import VectorIndex, profile_text, job_text
+from utils.database_manager import DatabaseManager, ConnectionPool
+from utils.search_engine import CandidateSearchEngine
+from utils.resume_parser import SUPPORTED_EXTENSIONS
+from utils.extraction_pool import ExtractionPool, ExtractionError
+from utils.resume_text_store import load_resume_text
+from utils.logger import setup_logging, metrics
+
+setup_logging(
+    json_lines=Config.LOG_JSON,
+    sample_rate=Config.LOG_SAMPLE_RATE,
+    max_per_second=Config.LOG_MAX_PER_SECOND
+)
+logger = logging.getLogger('job_screening_system.web_app')
+
+# Highest page number accepted by the paged listings
+MAX_PAGE = 1000000
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256):
+        """
+        LRU cache of rendered responses, invalidated whenever the database changes
+
+        :param max_entries: Maximum number of cached responses
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, version: tuple, body: bytes, mimetype: str) -> Dict[str, Any]:
+        entry = {
+            'version': version,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'body': body,
+            'mimetype': mimetype
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+class ServingModel(NamedTuple):
+    """Embedding model version and everything built with it, swapped as one when the active version changes"""
+    model_version: str
+    embedding_model: EmbeddingModel
+    encoder: EncodingScheduler
+    index: Any
+    job_index: VectorIndex
+    job_titles: Dict[int, str]
+    search_engine: CandidateSearchEngine
+
+
+class ServingState:
+    def __init__(self, db_path: str, embedding_model: Optional[EmbeddingModel] = None):
+        """
+        Resources kept warm for the lifetime of the serving process
+
+        The active embedding model version is followed: once another version
+        is activated, its model and indexes are built in the background while
+        requests are still served from the current ones, then swapped in. The
+        replaced model's encoder is closed once the last request using it
+        (see ``serving_model``) has finished.
+
+        :param db_path: Path to SQLite database
+        :param embedding_model: Preloaded embedding model (created if omitted); its version is
+            served while none was activated
+        """
+        # Make sure the schema and full-text index exist before the pool starts reading
+        db = DatabaseManager(db_path)
+        if db.cursor.execute("SELECT COUNT(*) FROM candidate_fts").fetchone()[0] == 0:
+            db.rebuild_search_index()
+        self._default_version = getattr(embedding_model, 'model_name', None)
+        model_version = active_model_version(db.conn, self._default_version)
+        # Record what is served, so activating another version elsewhere can switch back to it
+        register_served_version(db.conn, model_version)
+        db.conn.close()
+
+        self.pool = ConnectionPool(db_path, Config.SERVING_POOL_SIZE)
+        self.cache = ResponseCache(Config.SERVING_CACHE_SIZE)
+        # Uploads are parsed in sandboxed worker processes, so a hostile file cannot stall a request thread.
+        # Failed uploads are only logged and then deleted with the other temporary files, never kept.
+        self.extractor = ExtractionPool(quarantine_dir=None).start()
+        self._index_version = None
+        self._index_lock = threading.Lock()
+        self._switching_to: Optional[str] = None
+        # Requests using each served model, by id(), so a replaced one is closed only once they finish
+        self._in_flight: Dict[int, int] = {}
+        self._in_flight_changed = threading.Condition()
+        self.serving = self._serving_model(
+            model_version,
+            embedding_model if getattr(embedding_model, 'model_name', None) == model_version else None
+        )
+        self.refresh_index()
+
+    def _serving_model(self, model_version: str, embedding_model: Optional[EmbeddingModel] = None) -> ServingModel:
+        """Load a model version with empty indexes"""
+        embedding_model = embedding_model or EmbeddingModel(model_version)
+        encoder = EncodingScheduler(embedding_model, Config.ENCODER_MAX_BATCH, Config.ENCODER_MAX_WAIT_MS)
+        # Quantized indexes re-rank their shortlist with the stored float vectors
+        index = make_vector_index(
+            Config.VECTOR_QUANTIZATION,
+            rerank_vectors=lambda ids: self.fetch_vectors('candidate', ids, model_version),
+            rerank_factor=Config.RERANK_FACTOR,
+            pq_subspaces=Config.PQ_SUBSPACES
+        )
+        return ServingModel(model_version, embedding_model, encoder, index, VectorIndex(), {},
+                            CandidateSearchEngine(encoder, index, Config.SEARCH_PREFILTER_LIMIT))
+
+    @property
+    def model_version(self) -> str:
+        """Embedding model version being served"""
+        return self.serving.model_version
+
+    @contextmanager
+    def serving_model(self) -> Iterator[ServingModel]:
+        """Borrow the served model version for one request; it stays open until the ``with`` block ends"""
+        with self._in_flight_changed:
+            serving = self.serving
+            self._in_flight[id(serving)] = self._in_flight.get(id(serving), 0) + 1
+        try:
+            yield serving
+        finally:
+            with self._in_flight_changed:
+                self._in_flight[id(serving)] -= 1
+                if not self._in_flight[id(serving)]:
+                    del self._in_flight[id(serving)]
+                self._in_flight_changed.notify_all()
+
+    def _close_when_idle(self, serving: ServingModel):
+        """Close a replaced model's encoder once no request is using it"""
+        with self._in_flight_changed:
+            while self._in_flight.get(id(serving)):
+                self._in_flight_changed.wait()
+        serving.encoder.close()
+
+    def fetch_vectors(self, kind: str, ids, model_version: Optional[str] = None) -> np.ndarray:
+        """
+        Read stored float vectors for specific rows
+        
+        :param kind: 'candidate' or 'job'
+        :param ids: Row IDs
+        :param model_version: Version to read (the served one if omitted)
+        :return: 2-D float32 array aligned with ``ids``
+        """
+        with self.pool.connection() as conn:
+            return fetch_embeddings(conn, kind, model_version or self.model_version, ids)
+
+    def _load_vectors(self, serving: ServingModel, kind: str, index: VectorIndex, query: str, to_text) -> int:
+        """
+        Add rows newer than the index to it, embedding only rows without a stored vector
+
+        Near-duplicate candidates are left out of ``query`` and get a copy of
+        their canonical candidate's vector instead.
+
+        :param serving: Model version the index belongs to
+        :param kind: 'candidate' or 'job'
+        :param index: Index to extend
+        :param query: Select for rows to embed; takes the model version and minimum ID
+        :param to_text: Builds the embedded text from a row
+        :return: Number of rows added to the index
+        """
+        with self.pool.connection() as conn:
+            missing = conn.execute(query, (serving.model_version, index.max_id)).fetchall()
+            if missing:
+                vectors = serving.embedding_model.encode_batch([to_text(row) for row in missing])
+                save_embeddings(conn, kind, [row['id'] for row in missing], vectors,
+                                serving.model_version, Config.EMBEDDING_DTYPE)
+            if kind == 'candidate':
+                copy_canonical_embeddings(conn, serving.model_version, index.max_id)
+            # Even a copy of nothing opened a write transaction, which would lock out the other pooled connections
+            conn.commit()
+            stored = load_embeddings(conn, kind, serving.model_version, index.max_id)
+        index.add(stored.ids, stored.to_float32())
+        return len(stored.ids)
+
+    def _extend(self, serving: ServingModel):
+        """Index candidates and job descriptions newer than a model version's indexes"""
+        table, id_column = EMBEDDING_TABLES['candidate']
+        added = self._load_vectors(serving, 'candidate', serving.index, f'''
+            SELECT c.id, c.skills, c.experience, c.education FROM candidates c
+            LEFT JOIN {table} e ON e.{id_column} = c.id AND e.model_version = ?
+            WHERE c.id > ? AND e.{id_column} IS NULL AND c.canonical_candidate_id IS NULL ORDER BY c.id
+        ''', lambda row: profile_text(row['skills'], row['experience'], row['education']))
+        if added:
+            logger.info(f"Indexed {added} new candidates ({len(serving.index)} total, {serving.model_version})")
+
+        previous_max = serving.job_index.max_id
+        table, id_column = EMBEDDING_TABLES['job']
+        added = self._load_vectors(serving, 'job', serving.job_index, f'''
+            SELECT j.id, j.title, j.summary, j.required_skills, j.raw_jd FROM job_descriptions j
+            LEFT JOIN {table} e ON e.{id_column} = j.id AND e.model_version = ?
+            WHERE j.id > ? AND e.{id_column} IS NULL ORDER BY j.id
+        ''', lambda job: job_text(job['title'], job['summary'], job['required_skills'], job['raw_jd']))
+        if added:
+            with self.pool.connection() as conn:
+                serving.job_titles.update(conn.execute(
+                    "SELECT id, title FROM job_descriptions WHERE id > ?", (previous_max,)
+                ).fetchall())
+            logger.info(f"Indexed {added} new job descriptions ({len(serving.job_index)} total)")
+
+    def _switch(self, model_version: str):
+        """Build a model version's indexes off the request path, then serve from them"""
+        try:
+            serving = self._serving_model(model_version)
+            self._extend(serving)
+        except Exception as e:
+            logger.error(f"Could not switch to embedding model version {model_version}: {e}")
+            with self._index_lock:
+                self._switching_to = None
+            return
+        with self._index_lock:
+            previous, self.serving = self.serving, serving
+            self._switching_to = None
+            # Rows written while the indexes were built are picked up by the next refresh
+            self._index_version = None
+        logger.info(f"Serving embedding model version {model_version} ({len(serving.index)} candidates) "
+                    f"instead of {previous.model_version}")
+        # Requests that picked up the previous model just before the swap still get their vectors
+        self._close_when_idle(previous)
+
+    def refresh_index(self):
+        """Index candidates and job descriptions added since the last refresh, and follow version switches"""
+        version = self.pool.data_version()
+        if version == self._index_version:
+            return
+
+        with self._index_lock:
+            if version == self._index_version:
+                return
+
+            with self.pool.connection() as conn:
+                active = active_model_version(conn, self._default_version)
+            if active != self.model_version and active != self._switching_to:
+                self._switching_to = active
+                logger.info(f"Embedding model version {active} was activated; building its indexes")
+                threading.Thread(target=self._switch, args=(active,), name='embedding-switch', daemon=True).start()
+
+            self._extend(self.serving)
+            # Storing new vectors changes the version again; the next refresh finds nothing to embed
+            self._index_version = version
+
+
+def cached_response(view):
+    """Serve a view from the response cache and answer conditional requests with 304"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        state: ServingState = current_app.extensions['serving_state']
+        version = state.pool.data_version()
+        key = request.full_path
+
+        entry = state.cache.get(key, version)
+        if entry is None:
+            result = make_response(view(*args, **kwargs))
+            if result.status_code != 200:
+                return result
+            # Search views store vectors of new rows first, which changes the version they answered at
+            entry = state.cache.put(key, state.pool.data_version(), result.get_data(), result.mimetype)
+            metrics.increment('response_cache_misses')
+        else:
+            metrics.increment('response_cache_hits')
+
+        response = make_response(entry['body'])
+        response.mimetype = entry['mimetype']
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    return wrapper
+
+
+def _skills_arg() -> List[str]:
+    """Comma-separated must-have skills from ``?skills=python,aws``"""
+    return [skill.strip() for skill in request.args.get('skills', '').split(',') if skill.strip()]
+
+
+def _k_arg(default: int, limit: int, name: str = 'k') -> Optional[int]:
+    """Number of results from ``?k=`` (or ``name``), capped at ``limit``; None if it is not positive"""
+    k = request.args.get(name, default, type=int)
+    return max(1, min(k, limit)) if k > 0 else None
+
+
+def _page_args() -> Dict[str, int]:
+    # Capped so the row offset stays far below SQLite's 64-bit limit; later pages are empty anyway
+    page = min(max(request.args.get('page', 1, type=int), 1), MAX_PAGE)
+    per_page = min(max(request.args.get('per_page', Config.CANDIDATES_PER_PAGE, type=int), 1), 500)
+    return {'page': page, 'per_page': per_page}
+
+
+def create_app(db_path: Optional[str] = None, embedding_model: Optional[EmbeddingModel] = None) -> Flask:
+    """
+    Build the Flask serving app
+
+    :param db_path: Path to SQLite database (defaults to ``Config.DATABASE_PATH``)
+    :param embedding_model: Preloaded embedding model
+    :return: Flask application
+    """
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = Config.MAX_UPLOAD_BYTES
+    state = ServingState(db_path or Config.DATABASE_PATH, embedding_model)
+    app.extensions['serving_state'] = state
+
+    def top_candidates(limit: int) -> List[Dict[str, Any]]:
+        with state.pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT c.id, c.name, c.email, MAX(jm.match_score) AS match_score
+                FROM job_matches jm
+                JOIN candidates c ON c.id = jm.candidate_id
+                GROUP BY c.id
+                ORDER BY match_score DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def candidate_page(page: int, per_page: int) -> Dict[str, Any]:
+        with state.pool.connection() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+            rows = conn.execute(
+                "SELECT id, name, email FROM candidates ORDER BY id LIMIT ? OFFSET ?",
+                (per_page, (page - 1) * per_page)
+            ).fetchall()
+        return {
+            'candidates': [dict(row) for row in rows],
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': max(1, math.ceil(total / per_page))
+        }
+
+    def candidate_details(candidate_id: int, with_text: bool = False) -> Optional[Dict[str, Any]]:
+        with state.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT id, name, email, resume_path, skills, experience, education FROM candidates WHERE id = ?",
+                (candidate_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            # The compressed resume text is only read when it is shown
+            resume_text = load_resume_text(conn, candidate_id) if with_text else None
+            matches = conn.execute('''
+                SELECT jm.job_id, jd.title, jm.match_score, jm.status
+                FROM job_matches jm
+                LEFT JOIN job_descriptions jd ON jd.id = jm.job_id
+                WHERE jm.candidate_id = ?
+                ORDER BY jm.match_score DESC
+            ''', (candidate_id,)).fetchall()
+        candidate = dict(row)
+        candidate['matches'] = [dict(match) for match in matches]
+        if with_text:
+            candidate['resume_text'] = resume_text
+        return candidate
+
+    def search(query: str, k: int, skills: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        if not query:
+            return []
+        state.refresh_index()
+        with state.serving_model() as serving, state.pool.connection() as conn:
+            hits = serving.search_engine.search(conn, query, k, required_skills=skills)
+            if not hits:
+                return []
+            rows = conn.execute(
+                f"SELECT id, name, email FROM candidates WHERE id IN ({','.join('?' * len(hits))})",
+                [hit['candidate_id'] for hit in hits]
+            ).fetchall()
+        details = {row['id']: dict(row) for row in rows}
+        return [dict(details[hit['candidate_id']], **hit) for hit in hits if hit['candidate_id'] in details]
+
+    @app.route('/')
+    @cached_response
+    def index():
+        return render_template('index.html', candidates=top_candidates(Config.CANDIDATES_PER_PAGE))
+
+    @app.route('/candidates')
+    @cached_response
+    def candidates():
+        return render_template('candidates.html', **candidate_page(**_page_args()))
+
+    @app.route('/candidates/<int:candidate_id>')
+    @cached_response
+    def candidate_detail(candidate_id: int):
+        candidate = candidate_details(candidate_id, with_text=True)
+        if candidate is None:
+            abort(404)
+        return render_template('candidate_detail.html', candidate=candidate)
+
+    @app.route('/search')
+    @cached_response
+    def search_candidates():
+        query = request.args.get('q', '').strip()
+        k = _k_arg(20, 200)
+        if k is None:
+            abort(400, description="k must be a positive integer")
+        skills = _skills_arg()
+        return render_template('search.html', query=query, skills=', '.join(skills),
+                               candidates=search(query, k, skills))
+
+    @app.route('/api/candidates')
+    @cached_response
+    def api_candidates():
+        return jsonify(candidate_page(**_page_args()))
+
+    @app.route('/api/candidates/<int:candidate_id>')
+    @cached_response
+    def api_candidate_detail(candidate_id: int):
+        candidate = candidate_details(candidate_id, with_text=request.args.get('text') == '1')
+        if candidate is None:
+            abort(404)
+        return jsonify(candidate)
+
+    @app.route('/api/top')
+    @cached_response
+    def api_top_candidates():
+        limit = _k_arg(10, 500, 'limit')
+        if limit is None:
+            return jsonify({'error': "limit must be a positive integer"}), 400
+        return jsonify(top_candidates(limit))
+
+    @app.route('/api/search')
+    @cached_response
+    def api_search():
+        query = request.args.get('q', '').strip()
+        k = _k_arg(20, 200)
+        if k is None:
+            return jsonify({'error': "k must be a positive integer"}), 400
+        skills = _skills_arg()
+        return jsonify({'query': query, 'skills': skills, 'results': search(query, k, skills)})
+
+    @app.route('/api/score', methods=['POST'])
+    def api_score_resume():
+        """Rank every job description against one uploaded resume (or posted text)"""
+        start = time.perf_counter()
+        k = _k_arg(10, 1000)
+        if k is None:
+            return jsonify({'error': "k must be a positive integer"}), 400
+
+        upload = request.files.get('resume')
+        if upload is not None:
+            extension = os.path.splitext(upload.filename or '')[1].lower()
+            if extension not in SUPPORTED_EXTENSIONS:
+                return jsonify({'error': f"Unsupported resume type '{extension}'"}), 415
+            with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as upload_file:
+                upload.save(upload_file)
+            try:
+                text = state.extractor.extract(upload_file.name)
+            except ExtractionError as e:
+                return jsonify({'error': f"Could not read resume: {e.reason}"}), 422
+            finally:
+                if os.path.exists(upload_file.name):
+                    os.remove(upload_file.name)
+        else:
+            text = request.form.get('text') or (request.get_json(silent=True) or {}).get('text', '')
+        if not text or not text.strip():
+            return jsonify({'error': "Provide a 'resume' file or non-empty 'text'"}), 400
+        extracted = time.perf_counter()
+
+        state.refresh_index()
+        # One model version for the resume and the jobs, even if a switch lands meanwhile
+        with state.serving_model() as serving:
+            # Concurrent uploads share encoder batches
+            vector = serving.encoder.encode_text(text)
+            encoded = time.perf_counter()
+
+            with metrics.timer('score_resume_against_jobs'):
+                hits = serving.job_index.search(vector, k)
+            scored = time.perf_counter()
+
+        return jsonify({
+            'jobs': [
+                {'job_id': job_id, 'title': serving.job_titles.get(job_id), 'match_score': score}
+                for job_id, score in hits
+            ],
+            'timings_ms': {
+                'extract': round((extracted - start) * 1000, 2),
+                'encode': round((encoded - extracted) * 1000, 2),
+                'score': round((scored - encoded) * 1000, 2),
+                'total': round((scored - start) * 1000, 2)
+            }
+        })
+
+    @app.route('/api/metrics')
+    def api_metrics():
+        return jsonify(metrics.summary())
+
+    logger.info(f"Serving app ready with {len(state.serving.index)} indexed candidates ({state.model_version})")
+    return app
+
+
+if __name__ == "__main__":
+    create_app().run(host=Config.FLASK_HOST, port=Config.FLASK_PORT, threaded=True)
\ No newline at end of file